@@ -1,16 +1,45 @@
 #!/usr/bin/env python3
 
+import argparse
+import csv
+import functools
+import glob
+import hashlib
+import heapq
+import io
 import json
+import math
+import mmap
+import os
 import re
 import sys
+import tempfile
+import time
+import zlib
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from itertools import accumulate
+from pathlib import Path
+
+try:
+    import numpy as np
+except ImportError:  # optional: RequestTable falls back to plain array reductions
+    np = None
+
+try:
+    import orjson
+except ImportError:  # optional: faster whole-export decoding, see JSON_BACKENDS
+    orjson = None
+
+try:
+    import simdjson
+except ImportError:  # optional: faster whole-export decoding, see JSON_BACKENDS
+    simdjson = None
 
 # Retrospective Analysis Tool
 # Suggested Improvements for Workflow Engineer:
-# 1. Add "Detail-Slip" detection: Count repeated edits to the same file within a single agent's turn.
-# 2. Add "Approval Latency" calculation: Measure time between agent handoff and user approval.
-# 3. Add "Tool Failure" analysis: Parse tool results to identify flaky commands or permission issues.
-# 4. Add "Context Bloat" detection: Monitor the size of attachments/context over time.
-# 5. Export results to Markdown: Generate the "Session Overview" and "Agent Analysis" tables directly.
+# 1. Add "Approval Latency" calculation: Measure time between agent handoff and user approval.
 
 def _get_message_text(req: dict) -> str:
     message_obj = req.get('message', {})
@@ -22,201 +51,1558 @@ def _get_message_text(req: dict) -> str:
     return ''
 
 
+USER_REQUEST_OPEN = '<userRequest>\n'
+USER_REQUEST_CLOSE = '\n</userRequest>'
+# Fallback for tag layouts the str.find fast path does not cover (e.g. CRLF line endings).
+USER_REQUEST_PATTERN = re.compile(r'<userRequest>[ \t]*\r?\n(.*?)\r?\n[ \t]*</userRequest>', re.DOTALL)
+
+DEFAULT_FEEDBACK_KEYWORDS = ('retro', 'retrospective')
+
+
 def _extract_user_request(message_text: str) -> str:
-    user_request_match = re.search(r'<userRequest>\n(.*?)\n</userRequest>', message_text, re.DOTALL)
-    if user_request_match:
-        return user_request_match.group(1).strip()
+    # Messages can be hundreds of KB of rendered context; locate the tags with str.find and
+    # only run the regex when a tag is present but not in the canonical layout.
+    start = message_text.find(USER_REQUEST_OPEN)
+    if start >= 0:
+        body_start = start + len(USER_REQUEST_OPEN)
+        end = message_text.find(USER_REQUEST_CLOSE, body_start)
+        if end >= 0:
+            return message_text[body_start:end].strip()
+    if '<userRequest>' in message_text:
+        user_request_match = USER_REQUEST_PATTERN.search(message_text)
+        if user_request_match:
+            return user_request_match.group(1).strip()
     return message_text.strip()
 
-def _is_retro_feedback(user_request: str) -> bool:
+
+@functools.lru_cache(maxsize=None)
+def build_feedback_pattern(keywords: tuple):
+    # All keywords compile into one alternation, so each message is scanned once no matter
+    # how many keywords are configured. Longer keywords come first so they win over prefixes.
+    alternatives = '|'.join(re.escape(keyword) for keyword in sorted(set(keywords), key=lambda k: (-len(k), k)))
+    return re.compile(rf'\b(?:{alternatives})\b', re.IGNORECASE)
+
+
+def _is_retro_feedback(user_request: str, keywords: tuple = DEFAULT_FEEDBACK_KEYWORDS) -> bool:
     # Captures feedback provided during retrospectives and any chat message that explicitly
     # references the retrospective (e.g. "note for retro: ...").
-    return re.search(r'\b(retro|retrospective)\b', user_request, re.IGNORECASE) is not None
+    return build_feedback_pattern(keywords).search(user_request) is not None
 
 
-def analyze_chat(file_path: str) -> int:
-    try:
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-    except Exception as e:
-        print(f"Error reading {file_path}: {e}")
-        return 2
+# File name patterns picked up when a directory is passed in batch mode.
+CHAT_EXPORT_PATTERNS = ('*chat.json', '*chat-redacted.json')
 
-    requests = data.get('requests', [])
-    
+OUTPUT_FORMATS = ('text', 'markdown', 'json', 'ndjson')
+
+# Per-file metrics cache. Entries are keyed on a hash of this script's source (see
+# _source_digest()), so any change to the metrics invalidates them without a manual version.
+DEFAULT_CACHE_DIR = Path(__file__).resolve().parent.parent / '.tmp' / 'analyze-chat-cache'
+DEFAULT_CACHE_MAX_BYTES = 64 * 1024 * 1024
+
+# Latency distributions: quantiles come from a mergeable log-bucket sketch with this relative
+# accuracy, so corpus-wide percentiles need bounded memory regardless of request count.
+LATENCY_SKETCH_ACCURACY = 0.01
+LATENCY_HISTOGRAM_BOUNDS_MS = (1000, 5000, 15000, 60000, 300000, 900000)
+LATENCY_PERCENTILES = (50, 90, 99)
+SLOWEST_REQUESTS = 5
+LATENCY_METRICS = (
+    ('elapsed', 'Agent Work Time (totalElapsed)'),
+    ('first_progress', 'Time to First Progress (firstProgress)'),
+    ('wait', 'User Wait (timeSpentWaiting)'),
+)
+
+# Tool profiler: distinct error messages kept per tool, and how many are reported.
+TOOL_ERROR_MESSAGE_LIMIT = 50
+TOOL_ERRORS_REPORTED = 3
+TOOL_ERROR_MESSAGE_LENGTH = 160
+ANSI_ESCAPE_PATTERN = re.compile(r'\x1b\[[0-9;:?]*[A-Za-z]')
+
+# Context bloat: requests whose prompt-side payload (message + attachments + rendered context)
+# exceeds this many characters are flagged; growth curves are reported in this many buckets.
+# Prompt-side sizes are counted in characters, response text in UTF-8 bytes.
+DEFAULT_CONTEXT_THRESHOLD_CHARS = 200_000
+CONTEXT_CURVE_POINTS = 10
+CONTEXT_FLAGGED_REPORTED = 10
+CONTEXT_SIZES = (
+    ('message_chars', 'Message Text (message.text)'),
+    ('attachment_chars', 'Attachments (variableData)'),
+    ('context_chars', 'Rendered Context (prompt + tool results)'),
+    ('response_bytes', 'Response Text (UTF-8 bytes)'),
+)
+
+# Detail slips: a file edited at least this many times within one request counts as a slip.
+# Hot-spot files, slips and undone files are reported up to EDIT_CHURN_REPORTED entries each.
+DEFAULT_SLIP_THRESHOLD = 2
+EDIT_CHURN_REPORTED = 5
+
+# Timeline: wall-clock time is bucketed into windows of this size, aligned to the epoch so
+# windows from several exports line up. Idle stretches at least DEFAULT_IDLE_GAP_MS long are
+# reported as gaps.
+DEFAULT_TIMELINE_WINDOW_MS = 15 * 60 * 1000
+DEFAULT_IDLE_GAP_MS = 5 * 60 * 1000
+TIMELINE_GAPS_REPORTED = 5
+TIMELINE_STATES = (
+    ('busy', 'Agent Busy'),
+    ('wait', 'User Wait'),
+    ('idle', 'Idle'),
+)
+
+# Whole-export decoders, fastest first; 'auto' picks the first one installed. Whatever a
+# fast backend rejects (NaN, lone surrogates, numbers beyond double range) is decoded again
+# with json, so metrics do not depend on the backend. orjson turns integers wider than 64
+# bits into floats; no field the metrics read holds one.
+JSON_BACKENDS = {
+    'orjson': orjson.loads if orjson else None,
+    'simdjson': simdjson.loads if simdjson else None,
+    'json': json.loads,
+}
+
+# Streaming mode reads the export in chunks of this many characters and grows the read size
+# geometrically while a single requests[] element is larger than the buffered text.
+STREAM_CHUNK_SIZE = 1 << 16
+
+# --watch polls the export this often (seconds) and re-checks the already processed prefix
+# in blocks of this many bytes.
+DEFAULT_WATCH_INTERVAL = 1.0
+WATCH_CHECK_BLOCK_SIZE = 1 << 20
+
+
+@dataclass(frozen=True)
+class AnalysisOptions:
+    stream: bool = False
+    scan: bool = False
+    json_backend: str = 'auto'
+    context_threshold: int = DEFAULT_CONTEXT_THRESHOLD_CHARS
+    feedback_keywords: tuple = DEFAULT_FEEDBACK_KEYWORDS
+    timeline_window: int = DEFAULT_TIMELINE_WINDOW_MS
+    idle_gap: int = DEFAULT_IDLE_GAP_MS
+    slip_threshold: int = DEFAULT_SLIP_THRESHOLD
+
+    def cache_salt(self) -> str:
+        # Only options that change compute_metrics() output belong in the cache key.
+        return (f"context_threshold={self.context_threshold};feedback_keywords={sorted(self.feedback_keywords)};"
+                f"timeline_window={self.timeline_window};idle_gap={self.idle_gap};slip_threshold={self.slip_threshold}")
+
+    def iter_requests(self, file_path: str):
+        # requests[] elements of file_path in the configured parse mode.
+        return iter_requests(file_path, stream=self.stream, scan=self.scan, json_backend=self.json_backend)
+
+
+class _JsonStreamReader:
+    # Incremental tokenizer over a text file object. Holds at most one top-level value
+    # (e.g. one requests[] element) plus one chunk of look-ahead in memory.
+
+    def __init__(self, f, chunk_size: int = STREAM_CHUNK_SIZE, track_bytes: bool = False):
+        self._f = f
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buf = ''
+        self._pos = 0
+        self._eof = False
+        # UTF-8 size of the consumed text, counted lazily up to _counted in the buffer.
+        self._track_bytes = track_bytes
+        self._bytes = 0
+        self._counted = 0
+
+    def _read_more(self) -> bool:
+        if self._eof:
+            return False
+        if self._pos:
+            if self._track_bytes:
+                self.byte_offset()
+                self._counted = 0
+            self._buf = self._buf[self._pos:]
+            self._pos = 0
+        chunk = self._f.read(max(self._chunk_size, len(self._buf)))
+        if not chunk:
+            self._eof = True
+            return False
+        self._buf += chunk
+        return True
+
+    def peek(self) -> str:
+        while True:
+            while self._pos < len(self._buf) and self._buf[self._pos] in ' \t\r\n':
+                self._pos += 1
+            if self._pos < len(self._buf):
+                return self._buf[self._pos]
+            if not self._read_more():
+                raise ValueError('Unexpected end of JSON input')
+
+    def expect(self, token: str) -> None:
+        ch = self.peek()
+        if ch != token:
+            raise ValueError(f"Expected '{token}' but found '{ch}'")
+        self._pos += 1
+
+    def byte_offset(self) -> int:
+        # Bytes consumed since the reader started; requires track_bytes=True.
+        self._bytes += len(self._buf[self._counted:self._pos].encode('utf-8'))
+        self._counted = self._pos
+        return self._bytes
+
+    def decode(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buf, self._pos)
+                # A value ending exactly at the buffer boundary may be a truncated number/literal.
+                if end < len(self._buf) or self._eof:
+                    self._pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self._eof:
+                    raise
+            self._read_more()
+
+
+def _advance_to_requests(reader: _JsonStreamReader) -> bool:
+    # Skips top-level members up to and including the '[' of the next requests array.
+    # Other top-level values are small metadata and are decoded and discarded. Returns
+    # False once the closing '}' of the top-level object is reached.
+    while reader.peek() != '}':
+        if reader.peek() == ',':
+            reader.expect(',')
+            continue
+        key = reader.decode()
+        reader.expect(':')
+        if key != 'requests' or reader.peek() != '[':
+            reader.decode()
+            continue
+        reader.expect('[')
+        return True
+    return False
+
+
+def _iter_requests_streaming(f):
+    # Walks the top-level object and yields requests[] elements one at a time.
+    reader = _JsonStreamReader(f)
+    reader.expect('{')
+    while _advance_to_requests(reader):
+        while reader.peek() != ']':
+            if reader.peek() == ',':
+                reader.expect(',')
+                continue
+            yield reader.decode()
+        reader.expect(']')
+
+
+class MeasuredText:
+    # Stands in for JSON content the mmap scanner measured but did not decode: a string, or
+    # all string values of a subtree. Only the character count is kept, plus the UTF-8 size
+    # for a single string (None for a subtree).
+    __slots__ = ('chars', 'utf8_bytes')
+
+    def __init__(self, chars: int, utf8_bytes: int = None):
+        self.chars = chars
+        self.utf8_bytes = utf8_bytes
+
+    def __len__(self) -> int:
+        return self.chars
+
+
+# Which parts of a requests[] element the metrics read, for the mmap scanner. DECODE keeps
+# the value as json would, SIZE keeps only the character count of its string values, TEXT
+# measures a string (and decodes anything else), a dict descends into an object ('*' covers
+# unlisted keys) and a one-element list applies its spec to every array element. Keys
+# without a spec are skipped unread.
+SCAN_DECODE = 'decode'
+SCAN_SIZE = 'size'
+SCAN_TEXT = 'text'
+REQUEST_SCAN_SPEC = {
+    'requestId': SCAN_DECODE,
+    'timestamp': SCAN_DECODE,
+    'timeSpentWaiting': SCAN_DECODE,
+    'modelId': SCAN_DECODE,
+    'message': SCAN_DECODE,
+    'editedFileEvents': SCAN_DECODE,
+    'vote': SCAN_DECODE,
+    'voteDownReason': SCAN_DECODE,
+    'modelState': SCAN_DECODE,
+    'variableData': SCAN_SIZE,
+    'response': [{'value': SCAN_TEXT, '*': SCAN_DECODE}],
+    'result': {
+        'timings': SCAN_DECODE,
+        'errorDetails': SCAN_DECODE,
+        'metadata': {'renderedUserMessage': SCAN_SIZE, 'toolCallResults': SCAN_SIZE},
+    },
+}
+
+# Selected values are decoded from a window of this many bytes, grown 8x until they fit.
+# Objects under a '*' spec that fit the first window are decoded whole.
+SCAN_DECODE_WINDOW = 1 << 12
+# Skipped containers are crossed bracket by bracket; past SCAN_BRACKET_BUDGET brackets the
+# scanner checks the bracket balance of whole windows (SCAN_WINDOW_SIZE bytes, doubling up
+# to SCAN_WINDOW_MAX) at once.
+SCAN_BRACKET_BUDGET = 64
+SCAN_WINDOW_SIZE = 1 << 14
+SCAN_WINDOW_MAX = 1 << 20
+# Scanned pages are dropped from the resident set in steps of at least this many bytes.
+SCAN_RELEASE_SIZE = 1 << 22
+
+_SCAN_WHITESPACE = re.compile(rb'[ \t\r\n]*')
+_SCAN_STRING = re.compile(rb'"[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_SCAN_MEMBER = re.compile(rb'[ \t\r\n]*("[^"\\]*(?:\\.[^"\\]*)*")[ \t\r\n]*:[ \t\r\n]*', re.DOTALL)
+_SCAN_SEPARATOR = re.compile(rb'[ \t\r\n]*([,\]}])[ \t\r\n]*')
+_SCAN_SCALAR_END = re.compile(rb'[ \t\r\n,\]}]')
+_SCAN_ESCAPE = re.compile(rb'\\(?:u[dD][89abAB][0-9a-fA-F]{2}\\u[dD][c-fC-F][0-9a-fA-F]{2}|u[0-9a-fA-F]{4}|.)', re.DOTALL)
+_SCAN_UTF8_CONTINUATION = bytes(range(0x80, 0xc0))
+# Everything up to the next bracket outside a string literal.
+_SCAN_BRACKET = re.compile(rb'[^"\[\]{}]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"\[\]{}]*)*([\[\]{}])', re.DOTALL)
+# The longest run (within endpos) that does not stop inside a string literal.
+_SCAN_WINDOW = re.compile(rb'[^"]*(?:"[^"\\]*(?:\\.[^"\\]*)*"[^"]*)*', re.DOTALL)
+# Turns what is left of a window without its strings into signed depth steps (+1 / -1).
+_SCAN_NON_BRACKETS = bytes(set(range(256)) - set(b'[]{}'))
+_SCAN_BRACKET_STEPS = bytes.maketrans(b'[{]}', b'\x01\x01\xff\xff')
+
+
+def _escape_utf8_bytes(escape: bytes) -> int:
+    # UTF-8 size of the character a JSON escape stands for; a surrogate pair is one 4-byte
+    # character, a lone surrogate takes 3 bytes as with 'surrogatepass'.
+    if len(escape) == 12:
+        return 4
+    if len(escape) == 6:
+        code = int(escape[2:], 16)
+        return 1 if code < 0x80 else 2 if code < 0x800 else 3
+    return 1
+
+
+class _MmapScanner:
+    # Byte-level walker over a memory-mapped export. Strings are skipped with a regex and
+    # brackets counted, so only the values a spec selects are copied out of the mapping and
+    # decoded; measured strings are sized from their UTF-8 bytes and escapes.
+
+    def __init__(self, buf):
+        self._buf = buf
+        self._decoder = json.JSONDecoder()
+        self._released = 0
+
+    def _at(self, pos: int) -> bytes:
+        return self._buf[pos:pos + 1]
+
+    def _error(self, pos: int, expected: str) -> ValueError:
+        return ValueError(f"Expected {expected} at byte {pos} but found {self._at(pos)!r}")
+
+    def _open(self, pos: int, token: bytes) -> int:
+        pos = _SCAN_WHITESPACE.match(self._buf, pos).end()
+        if self._at(pos) != token:
+            raise self._error(pos, repr(token.decode()))
+        return _SCAN_WHITESPACE.match(self._buf, pos + 1).end()
+
+    def _key(self, pos: int) -> tuple:
+        # Returns the member key at pos and the offset of its value.
+        match = _SCAN_MEMBER.match(self._buf, pos)
+        if not match:
+            raise self._error(pos, 'an object key')
+        literal = match.group(1)
+        key = json.loads(literal) if b'\\' in literal else literal[1:-1].decode('utf-8')
+        return key, match.end()
+
+    def _separator(self, pos: int, close: bytes) -> tuple:
+        # Consumes ',' or the closing bracket after a value; returns (closed, next offset).
+        match = _SCAN_SEPARATOR.match(self._buf, pos)
+        if not match or match.group(1) not in (b',', close):
+            raise self._error(pos, f"',' or '{close.decode()}'")
+        return match.group(1) == close, match.end()
+
+    def _string_end(self, pos: int) -> int:
+        match = _SCAN_STRING.match(self._buf, pos)
+        if not match:
+            raise ValueError(f"Unterminated string at byte {pos}")
+        return match.end()
+
+    def _skip(self, pos: int) -> int:
+        # End offset of the value starting at pos, without decoding any of it.
+        first = self._at(pos)
+        if first == b'"':
+            return self._string_end(pos)
+        if first not in (b'{', b'['):
+            match = _SCAN_SCALAR_END.search(self._buf, pos)
+            return match.start() if match else len(self._buf)
+        # match() rather than finditer(): a truncated export fails here instead of being
+        # re-searched from every later offset.
+        depth = 0
+        budget = SCAN_BRACKET_BUDGET
+        while True:
+            match = _SCAN_BRACKET.match(self._buf, pos)
+            if not match:
+                raise ValueError('Unexpected end of JSON input')
+            pos = match.end()
+            if match.group(1) in (b'{', b'['):
+                depth += 1
+            else:
+                depth -= 1
+                if not depth:
+                    return pos
+            budget -= 1
+            if not budget:
+                pos, depth = self._cross_windows(pos, depth)
+                budget = SCAN_BRACKET_BUDGET
+
+    def _cross_windows(self, pos: int, depth: int) -> tuple:
+        # Moves past whole windows the container at `depth` does not close in and returns
+        # where the bracket-by-bracket walk should resume.
+        size = SCAN_WINDOW_SIZE
+        while pos < len(self._buf):
+            cut = _SCAN_WINDOW.match(self._buf, pos, pos + size).end()
+            if cut == pos:
+                # A string literal longer than the window starts here.
+                cut = self._string_end(pos)
+            outside = _SCAN_STRING.sub(b'', self._buf[pos:cut])
+            steps = array('b', outside.translate(_SCAN_BRACKET_STEPS, _SCAN_NON_BRACKETS))
+            if min(accumulate(steps, initial=depth)) <= 0:
+                break
+            depth += sum(steps)
+            pos = cut
+            size = min(size * 2, SCAN_WINDOW_MAX)
+        return pos, depth
+
+    def _string_size(self, start: int, end: int) -> tuple:
+        # Decoded length and UTF-8 size of the string literal buf[start:end]: one character
+        # per UTF-8 lead byte, minus one per two-byte escape; unescaped bytes are already UTF-8.
+        # Copying the bytes out is cheaper than a regex pass; only \u escapes need the escape
+        # pattern.
+        data = self._buf[start + 1:end - 1]
+        chars = utf8_bytes = len(data)
+        if not data.isascii():
+            chars -= chars - len(data.translate(None, _SCAN_UTF8_CONTINUATION))
+        if b'\\' in data:
+            if b'\\u' in data:
+                escapes = _SCAN_ESCAPE.findall(data)
+                chars -= sum(map(len, escapes)) - len(escapes)
+                utf8_bytes -= sum(len(escape) - _escape_utf8_bytes(escape) for escape in escapes)
+            else:
+                escapes = data.count(b'\\') - data.count(b'\\\\')
+                chars -= escapes
+                utf8_bytes -= escapes
+        return chars, utf8_bytes
+
+    def _decode(self, pos: int, grow: bool = True):
+        # Runs json's decoder over a window of the mapping starting at pos and returns
+        # (value, end). Without grow, returns None when the value does not fit the window.
+        size = SCAN_DECODE_WINDOW
+        while True:
+            stop = min(pos + size, len(self._buf))
+            chunk = self._buf[pos:stop]
+            try:
+                text = chunk.decode('utf-8')
+            except UnicodeDecodeError as error:
+                # Only a character cut at the window edge is expected here.
+                if stop == len(self._buf) or error.start < len(chunk) - 3:
+                    raise
+                text = chunk[:error.start].decode('utf-8')
+            try:
+                value, end = self._decoder.raw_decode(text)
+            except json.JSONDecodeError as error:
+                if stop == len(self._buf):
+                    offset = pos + len(text[:error.pos].encode('utf-8'))
+                    raise ValueError(f"{error.msg}: byte {offset}") from None
+            else:
+                # A value ending exactly at the window edge may be a truncated number/literal.
+                if end < len(text) or stop == len(self._buf):
+                    return value, pos + (end if text.isascii() else len(text[:end].encode('utf-8')))
+            if not grow:
+                return None
+            size *= 8
+
+    def select(self, pos: int, spec) -> tuple:
+        # Returns (value, end) for the value at pos, reduced to what spec asks for.
+        first = self._at(pos)
+        if spec == SCAN_SIZE:
+            # Attachments and rendered context are many short strings under object keys;
+            # decoding the subtree and counting it beats telling keys from values in bytes.
+            value, end = self._decode(pos)
+            return MeasuredText(_payload_chars(value)), end
+        if spec == SCAN_TEXT and first == b'"':
+            end = self._string_end(pos)
+            return MeasuredText(*self._string_size(pos, end)), end
+        if isinstance(spec, dict) and first == b'{':
+            if '*' in spec:
+                decoded = self._decode(pos, grow=False)
+                if decoded:
+                    return decoded
+            return self._select_object(pos, spec)
+        if isinstance(spec, list) and first == b'[':
+            return self._select_array(pos, spec[0])
+        return self._decode(pos)
+
+    def _select_object(self, pos: int, spec: dict) -> tuple:
+        obj = {}
+        pos = self._open(pos, b'{')
+        if self._at(pos) == b'}':
+            return obj, pos + 1
+        default = spec.get('*')
+        while True:
+            key, pos = self._key(pos)
+            child = spec.get(key, default)
+            if child is None:
+                pos = self._skip(pos)
+            else:
+                obj[key], pos = self.select(pos, child)
+            closed, pos = self._separator(pos, b'}')
+            if closed:
+                return obj, pos
+
+    def _select_array(self, pos: int, spec) -> tuple:
+        items = []
+        pos = self._open(pos, b'[')
+        if self._at(pos) == b']':
+            return items, pos + 1
+        while True:
+            value, pos = self.select(pos, spec)
+            items.append(value)
+            closed, pos = self._separator(pos, b']')
+            if closed:
+                return items, pos
+
+    def _release(self, pos: int) -> None:
+        # Drops the already scanned pages from this process's resident set.
+        start = self._released
+        end = pos - pos % mmap.PAGESIZE
+        if end - start >= SCAN_RELEASE_SIZE and hasattr(mmap, 'MADV_DONTNEED'):
+            self._buf.madvise(mmap.MADV_DONTNEED, start, end - start)
+            self._released = end
+
+    def iter_requests(self, spec=REQUEST_SCAN_SPEC):
+        # Yields each requests[] element of the top-level object, reduced to spec.
+        pos = self._open(0, b'{')
+        if self._at(pos) == b'}':
+            return
+        while True:
+            key, pos = self._key(pos)
+            if key == 'requests' and self._at(pos) == b'[':
+                pos = self._open(pos, b'[')
+                closed = self._at(pos) == b']'
+                if closed:
+                    pos += 1
+                while not closed:
+                    request, pos = self.select(pos, spec)
+                    self._release(pos)
+                    yield request
+                    closed, pos = self._separator(pos, b']')
+            else:
+                pos = self._skip(pos)
+            closed, pos = self._separator(pos, b'}')
+            if closed:
+                return
+
+
+def _iter_requests_mmap(file_path: str):
+    with open(file_path, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            raise ValueError('Expecting value: empty file')
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            yield from _MmapScanner(buf).iter_requests()
+
+
+def resolve_json_backend(name: str = 'auto') -> str:
+    # Maps 'auto' to the fastest installed backend; raises ValueError for unknown or
+    # missing ones.
+    if name == 'auto':
+        return next(backend for backend, loads in JSON_BACKENDS.items() if loads)
+    if name not in JSON_BACKENDS:
+        raise ValueError(f"Unknown JSON backend '{name}'")
+    if not JSON_BACKENDS[name]:
+        raise ValueError(f"JSON backend '{name}' is not installed")
+    return name
+
+
+def load_json(file_path: str, backend: str = 'json'):
+    # Fast backends decode the raw bytes; json reads text so the export is held only once.
+    if backend != 'json':
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        try:
+            return JSON_BACKENDS[backend](data)
+        except ValueError:  # orjson.JSONDecodeError and simdjson errors are ValueErrors
+            del data
+    with open(file_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def iter_requests(file_path: str, stream: bool = False, scan: bool = False, json_backend: str = 'auto'):
+    # scan=True reads through mmap and only decodes the fields REQUEST_SCAN_SPEC selects, so
+    # the yielded requests are partial; metrics are identical to the other two modes. Only
+    # whole-export decoding uses json_backend: the other modes need json's raw_decode().
+    if scan:
+        yield from _iter_requests_mmap(file_path)
+    elif stream:
+        with open(file_path, 'r', encoding='utf-8') as f:
+            yield from _iter_requests_streaming(f)
+    else:
+        yield from load_json(file_path, resolve_json_backend(json_backend)).get('requests', [])
+
+
+def _response_item_text(resp: dict) -> str:
+    val = resp.get('value', '')
+    if isinstance(val, (str, MeasuredText)):
+        return val
+    if isinstance(val, list):
+        parts = []
+        for part in val:
+            if isinstance(part, dict) and 'text' in part:
+                parts.append(part['text'])
+            elif isinstance(part, str):
+                parts.append(part)
+        return ''.join(parts)
+    text = resp.get('text', '')
+    return text if isinstance(text, str) else ''
+
+
+class ResponseCollector:
+    # compute_metrics() walks each request's response[] exactly once and hands every item
+    # to all registered collectors. Item text is only assembled when at least one collector
+    # sets needs_text; otherwise add_item() receives text=None.
+    needs_text = False
+
+    def start_request(self, index: int, req: dict, agent: str) -> None:
+        pass
+
+    def add_item(self, resp: dict, kind, text) -> None:
+        pass
+
+    def end_request(self) -> None:
+        pass
+
+    def row_fields(self) -> dict:
+        # Extra RequestTable columns for the request just ended.
+        return {}
+
+    def finish(self, metrics: dict) -> None:
+        pass
+
+
+class ToolCountCollector(ResponseCollector):
+    # Counts tool invocations per toolId; text edit groups are reported as 'edit'.
+
+    def __init__(self):
+        self.tools = {}
+        self.agent_tools = {}
+        self._agent_tools = None
+
+    def start_request(self, index: int, req: dict, agent: str) -> None:
+        self._agent_tools = self.agent_tools.setdefault(agent, {})
+
+    def add_item(self, resp: dict, kind, text) -> None:
+        if kind == 'toolInvocationSerialized':
+            tool_id = resp.get('toolId', 'unknown-tool')
+        elif kind == 'textEditGroup':
+            tool_id = 'edit'
+        else:
+            return
+        self.tools[tool_id] = self.tools.get(tool_id, 0) + 1
+        self._agent_tools[tool_id] = self._agent_tools.get(tool_id, 0) + 1
+
+    def finish(self, metrics: dict) -> None:
+        metrics['tools'] = dict(self.tools)
+        for agent, tools in self.agent_tools.items():
+            metrics['agents'][agent]['tools'] = dict(tools)
+
+
+def _first_error_line(text: str) -> str:
+    for line in ANSI_ESCAPE_PATTERN.sub('', text).splitlines():
+        line = line.strip()
+        if line:
+            return line[:TOOL_ERROR_MESSAGE_LENGTH]
+    return ''
+
+
+def tool_outcome(resp: dict) -> tuple:
+    # Returns (status, duration_ms, error_message) for one toolInvocationSerialized item.
+    # status is 'rejected' (never confirmed), 'failed', or 'ok'. Only terminal commands
+    # record a duration.
+    confirmation = resp.get('isConfirmed')
+    if isinstance(confirmation, dict) and confirmation.get('type') == 0:
+        return 'rejected', None, None
+
+    duration = None
+    specific = resp.get('toolSpecificData')
+    if isinstance(specific, dict):
+        state = specific.get('terminalCommandState')
+        if isinstance(state, dict):
+            if isinstance(state.get('duration'), (int, float)):
+                duration = state['duration']
+            exit_code = state.get('exitCode')
+            if isinstance(exit_code, int) and exit_code != 0:
+                output = specific.get('terminalCommandOutput')
+                text = output.get('text', '') if isinstance(output, dict) else ''
+                message = _first_error_line(text if isinstance(text, str) else '')
+                return 'failed', duration, message or f"exit code {exit_code}"
+
+    details = resp.get('resultDetails')
+    if isinstance(details, dict) and details.get('isError'):
+        message = ''
+        for part in details.get('output') or []:
+            if isinstance(part, dict) and isinstance(part.get('value'), str):
+                message = _first_error_line(part['value'])
+                break
+        return 'failed', duration, message or 'tool reported an error'
+
+    return 'ok', duration, None
+
+
+def _new_tool_profile() -> dict:
+    return {'calls': 0, 'failed': 0, 'rejected': 0, 'timed': 0, 'duration': 0,
+            'max_duration': 0, 'sketch': QuantileSketch(), 'errors': {}}
+
+
+class ToolProfileCollector(ResponseCollector):
+    # Per-tool call counts, failure/rejection rates, duration distribution and the most
+    # frequent error messages, from toolInvocationSerialized results.
+
+    def __init__(self):
+        self.profiles = {}
+
+    def add_item(self, resp: dict, kind, text) -> None:
+        if kind != 'toolInvocationSerialized':
+            return
+        tool_id = resp.get('toolId', 'unknown-tool')
+        profile = self.profiles.get(tool_id)
+        if profile is None:
+            profile = self.profiles[tool_id] = _new_tool_profile()
+        status, duration, message = tool_outcome(resp)
+        profile['calls'] += 1
+        if status == 'rejected':
+            profile['rejected'] += 1
+        elif status == 'failed':
+            profile['failed'] += 1
+            errors = profile['errors']
+            if message in errors or len(errors) < TOOL_ERROR_MESSAGE_LIMIT:
+                errors[message] = errors.get(message, 0) + 1
+        if duration is not None:
+            profile['timed'] += 1
+            profile['duration'] += duration
+            profile['max_duration'] = max(profile['max_duration'], duration)
+            profile['sketch'].add(duration)
+
+    def finish(self, metrics: dict) -> None:
+        metrics['tool_profile'] = {
+            tool_id: {**profile, 'sketch': profile['sketch'].to_dict(), 'errors': dict(profile['errors'])}
+            for tool_id, profile in self.profiles.items()
+        }
+        metrics['rejections']['tool_rejections'] = sum(profile['rejected'] for profile in self.profiles.values())
+
+
+def _merge_tool_profiles(target: dict, source: dict) -> None:
+    for tool_id, profile in source.items():
+        merged = target.get(tool_id)
+        if merged is None:
+            merged = target[tool_id] = {**_new_tool_profile(), 'sketch': QuantileSketch().to_dict()}
+        for key in ('calls', 'failed', 'rejected', 'timed', 'duration'):
+            merged[key] += profile[key]
+        merged['max_duration'] = max(merged['max_duration'], profile['max_duration'])
+        sketch = QuantileSketch.from_dict(merged['sketch'])
+        sketch.merge(QuantileSketch.from_dict(profile['sketch']))
+        merged['sketch'] = sketch.to_dict()
+        _merge_counts(merged['errors'], profile['errors'])
+
+
+def _ranked_tool_profiles(metrics: dict) -> list:
+    # Slowest tools first, then the flakiest.
+    return sorted(metrics['tool_profile'].items(), key=lambda item: (-item[1]['duration'], -item[1]['failed'], item[0]))
+
+
+def _top_errors(profile: dict) -> list:
+    return sorted(profile['errors'].items(), key=lambda item: -item[1])[:TOOL_ERRORS_REPORTED]
+
+
+def _payload_chars(value) -> int:
+    # Characters of string content in a decoded JSON value, without re-serializing it.
+    if isinstance(value, (str, MeasuredText)):
+        return len(value)
+    if isinstance(value, dict):
+        value = value.values()
+    elif not isinstance(value, list):
+        return 0
+    # Leaves are counted inline; only nested containers recurse.
+    total = 0
+    for item in value:
+        if isinstance(item, str):
+            total += len(item)
+        elif isinstance(item, (dict, list, MeasuredText)):
+            total += _payload_chars(item)
+    return total
+
+
+def _utf8_size(text) -> int:
+    if isinstance(text, MeasuredText):
+        return text.utf8_bytes if text.utf8_bytes is not None else text.chars
+    return len(text) if text.isascii() else len(text.encode('utf-8', 'surrogatepass'))
+
+
+def _response_item_bytes(resp: dict) -> int:
+    # UTF-8 size of the text _response_item_text() would assemble, without joining it.
+    val = resp.get('value', '')
+    if isinstance(val, (str, MeasuredText)):
+        return _utf8_size(val)
+    if isinstance(val, list):
+        size = 0
+        for part in val:
+            if isinstance(part, dict) and isinstance(part.get('text'), str):
+                size += _utf8_size(part['text'])
+            elif isinstance(part, str):
+                size += _utf8_size(part)
+        return size
+    text = resp.get('text', '')
+    return _utf8_size(text) if isinstance(text, str) else 0
+
+
+class ContextSizeCollector(ResponseCollector):
+    # Measures per-request payload sizes for the context-bloat report. Response text is
+    # sized item by item from its parts, so no text is assembled.
+
+    def __init__(self):
+        self._sizes = {}
+
+    def start_request(self, index: int, req: dict, agent: str) -> None:
+        result = req.get('result')
+        metadata = result.get('metadata') if isinstance(result, dict) else None
+        context_chars = 0
+        if isinstance(metadata, dict):
+            context_chars = _payload_chars(metadata.get('renderedUserMessage')) + _payload_chars(metadata.get('toolCallResults'))
+        self._sizes = {
+            'message_chars': len(_get_message_text(req)),
+            'attachment_chars': _payload_chars(req.get('variableData')),
+            'context_chars': context_chars,
+            'response_bytes': 0,
+        }
+
+    def add_item(self, resp: dict, kind, text) -> None:
+        self._sizes['response_bytes'] += _response_item_bytes(resp)
+
+    def row_fields(self) -> dict:
+        return self._sizes
+
+
+def uri_path(uri) -> str:
+    if isinstance(uri, str):
+        return uri
+    if isinstance(uri, dict):
+        for key in ('path', 'fsPath', 'external'):
+            if isinstance(uri.get(key), str) and uri[key]:
+                return uri[key]
+    return ''
+
+
+def _new_file_churn() -> dict:
+    return {'edits': 0, 'requests': 0, 'max_per_request': 0, 'undone': 0}
+
+
+class EditChurnCollector(ResponseCollector):
+    # Detail-slip detection: indexes textEditGroup items by file per request and across the
+    # session, and attributes undo events (editedFileEvents eventKind 2) to the files they
+    # revert. Those events arrive with the request after the one that made the edit.
+
+    def __init__(self, slip_threshold: int = DEFAULT_SLIP_THRESHOLD):
+        self.slip_threshold = slip_threshold
+        self.files = {}
+        self.slips = []
+        self._index = 0
+        self._timestamp = None
+        self._edits = {}
+
+    def _file(self, path: str) -> dict:
+        churn = self.files.get(path)
+        if churn is None:
+            churn = self.files[path] = _new_file_churn()
+        return churn
+
+    def start_request(self, index: int, req: dict, agent: str) -> None:
+        self._index = index
+        self._timestamp = req.get('timestamp') if isinstance(req.get('timestamp'), int) else None
+        self._edits = {}
+        for evt in req.get('editedFileEvents', []) or []:
+            if isinstance(evt, dict) and evt.get('eventKind') == 2:
+                path = uri_path(evt.get('uri'))
+                if path:
+                    self._file(path)['undone'] += 1
+
+    def add_item(self, resp: dict, kind, text) -> None:
+        if kind == 'textEditGroup':
+            path = uri_path(resp.get('uri'))
+            if path:
+                self._edits[path] = self._edits.get(path, 0) + 1
+
+    def end_request(self) -> None:
+        for path, count in self._edits.items():
+            churn = self._file(path)
+            churn['edits'] += count
+            churn['requests'] += 1
+            churn['max_per_request'] = max(churn['max_per_request'], count)
+            if count >= self.slip_threshold:
+                self.slips.append({'index': self._index, 'timestamp': self._timestamp, 'path': path, 'edits': count})
+
+    def finish(self, metrics: dict) -> None:
+        metrics['edit_churn'] = {
+            'slip_threshold': self.slip_threshold,
+            'files': {path: dict(churn) for path, churn in self.files.items()},
+            'slip_count': len(self.slips),
+            'slips': heapq.nlargest(EDIT_CHURN_REPORTED, self.slips, key=lambda slip: slip['edits']),
+        }
+
+
+def _merge_edit_churn(target: dict, source: dict, file_path: str) -> None:
+    target['slip_threshold'] = source['slip_threshold']
+    for path, churn in source['files'].items():
+        merged = target['files'].setdefault(path, _new_file_churn())
+        for key in ('edits', 'requests', 'undone'):
+            merged[key] += churn[key]
+        merged['max_per_request'] = max(merged['max_per_request'], churn['max_per_request'])
+    target['slip_count'] += source['slip_count']
+    slips = target['slips'] + [{**item, 'file': file_path} for item in source['slips']]
+    target['slips'] = heapq.nlargest(EDIT_CHURN_REPORTED, slips, key=lambda slip: slip['edits'])
+
+
+def _churn_hot_spots(edit_churn: dict, key: str) -> list:
+    ranked = [item for item in edit_churn['files'].items() if item[1][key]]
+    return sorted(ranked, key=lambda item: (-item[1][key], item[0]))[:EDIT_CHURN_REPORTED]
+
+
+def default_collectors(options: AnalysisOptions = None) -> list:
+    options = options or AnalysisOptions()
+    return [ToolCountCollector(), ToolProfileCollector(), ContextSizeCollector(), EditChurnCollector(options.slip_threshold)]
+
+
+# Row flags recorded in RequestTable.flags
+FLAG_MISSING_MODEL = 1
+FLAG_MISSING_MESSAGE = 2
+FLAG_MISSING_RESPONSE = 4
+
+# RequestTable.rejection values
+REJECTION_NONE = 0
+REJECTION_CANCELLED = 1
+REJECTION_FAILED = 2
+REJECTION_NAMES = (None, 'cancelled', 'failed')
+
+
+class RequestTable:
+    # Columnar per-request store: one array per field, one row per request. Strings
+    # (model, agent, vote-down reason) are interned into lists and stored as indexes.
+    # Missing integer values are stored as -1. Reductions use NumPy views over the arrays
+    # when NumPy is installed and plain iteration otherwise.
+
+    INT_COLUMNS = ('timestamp', 'elapsed', 'first_progress', 'wait',
+                   'message_chars', 'attachment_chars', 'context_chars', 'response_bytes')
+    SMALL_COLUMNS = ('vote', 'model_state', 'rejection', 'flags')
+    INDEX_COLUMNS = ('model', 'agent', 'vote_down_reason',
+                     'tool_calls', 'edits', 'edits_kept', 'edits_undone', 'edits_modified')
+
+    def __init__(self):
+        for name in self.INT_COLUMNS:
+            setattr(self, name, array('q'))
+        for name in self.SMALL_COLUMNS:
+            setattr(self, name, array('b'))
+        for name in self.INDEX_COLUMNS:
+            setattr(self, name, array('l'))
+        self.models = []
+        self.agents = []
+        self.vote_down_reasons = []
+        self._positions = {'models': {}, 'agents': {}, 'vote_down_reasons': {}}
+
+    def __len__(self) -> int:
+        return len(self.timestamp)
+
+    def intern(self, labels: str, value: str) -> int:
+        positions = self._positions[labels]
+        index = positions.get(value)
+        if index is None:
+            index = positions[value] = len(positions)
+            getattr(self, labels).append(value)
+        return index
+
+    def append(self, **row) -> None:
+        for name in self.INT_COLUMNS + self.SMALL_COLUMNS + self.INDEX_COLUMNS:
+            getattr(self, name).append(row.get(name, -1))
+
+    def row(self, index: int) -> dict:
+        # One request as a JSON-friendly record; missing values become None.
+        def value(name):
+            item = getattr(self, name)[index]
+            return item if item >= 0 else None
+
+        vote_down_reason = self.vote_down_reason[index]
+        return {
+            'index': index,
+            'timestamp': value('timestamp'),
+            'elapsed': self.elapsed[index] or None,
+            'first_progress': value('first_progress'),
+            'wait': value('wait'),
+            'model': self.models[self.model[index]],
+            'agent': self.agents[self.agent[index]],
+            'vote': value('vote'),
+            'vote_down_reason': self.vote_down_reasons[vote_down_reason] if vote_down_reason >= 0 else None,
+            'model_state': value('model_state'),
+            'rejection': REJECTION_NAMES[self.rejection[index]],
+            'tool_calls': self.tool_calls[index],
+            'edits': self.edits[index],
+            **{name: value(name) for name, _ in CONTEXT_SIZES},
+            'file_edits': {
+                'kept': self.edits_kept[index],
+                'undone': self.edits_undone[index],
+                'modified': self.edits_modified[index],
+            },
+        }
+
+    def column(self, name: str):
+        values = getattr(self, name)
+        if np is not None:
+            return np.frombuffer(values, dtype=np.dtype(values.typecode))
+        return values
+
+    def sum_valid(self, name: str, mask=None) -> int:
+        # Sum of non-negative values, optionally restricted to rows where mask is true.
+        values = self.column(name)
+        if np is not None:
+            selected = values >= 0 if mask is None else (values >= 0) & mask
+            return int(values[selected].sum())
+        if mask is None:
+            return sum(value for value in values if value >= 0)
+        return sum(value for value, keep in zip(values, mask) if keep and value >= 0)
+
+    def count(self, name: str, value: int, mask=None) -> int:
+        values = self.column(name)
+        if np is not None:
+            selected = values == value if mask is None else (values == value) & mask
+            return int(np.count_nonzero(selected))
+        if mask is None:
+            return values.count(value)
+        return sum(1 for item, keep in zip(values, mask) if keep and item == value)
+
+    def count_flag(self, flag: int) -> int:
+        values = self.column('flags')
+        if np is not None:
+            return int(np.count_nonzero(values & flag))
+        return sum(1 for value in values if value & flag)
+
+    def counts_by(self, name: str, labels: list, mask=None) -> dict:
+        # Per-label row counts in first-seen order, skipping labels with no rows.
+        values = self.column(name)
+        if np is not None:
+            if mask is not None:
+                values = values[mask]
+            values = values[values >= 0]
+            totals = np.bincount(values, minlength=len(labels)).tolist() if len(values) else [0] * len(labels)
+        else:
+            totals = [0] * len(labels)
+            for position, value in enumerate(values):
+                if value >= 0 and (mask is None or mask[position]):
+                    totals[value] += 1
+        return {label: total for label, total in zip(labels, totals) if total}
+
+    def largest(self, name: str, n: int) -> list:
+        # Row indexes of the n largest non-negative values, largest first.
+        values = self.column(name)
+        if np is not None:
+            if not len(values):
+                return []
+            candidates = np.argsort(-values, kind='stable')[:n]
+            return [int(index) for index in candidates if values[index] >= 0]
+        ranked = heapq.nlargest(n, ((value, -index) for index, value in enumerate(values) if value >= 0))
+        return [-negative_index for _, negative_index in ranked]
+
+    def mask(self, name: str, value: int):
+        values = self.column(name)
+        if np is not None:
+            return values == value
+        return [item == value for item in values]
+
+
+class QuantileSketch:
+    # Log-bucketed quantile sketch (DDSketch-style). Every value v > 0 lands in bucket
+    # ceil(log_gamma(v)), so any quantile is reported within LATENCY_SKETCH_ACCURACY relative
+    # error. Sketches merge by adding bucket counts and serialize to plain dicts for the cache.
+
+    def __init__(self, accuracy: float = LATENCY_SKETCH_ACCURACY):
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.zero = 0
+        self.bins = {}
+
+    @property
+    def count(self) -> int:
+        return self.zero + sum(self.bins.values())
+
+    def add(self, value) -> None:
+        if value == 0:
+            self.zero += 1
+        elif value > 0:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self.bins[key] = self.bins.get(key, 0) + 1
+
+    def add_many(self, values) -> None:
+        if np is not None:
+            values = np.asarray(values, dtype=np.float64)
+            self.zero += int(np.count_nonzero(values == 0))
+            positive = values[values > 0]
+            if len(positive):
+                keys, counts = np.unique(np.ceil(np.log(positive) / self._log_gamma).astype(np.int64), return_counts=True)
+                for key, count in zip(keys.tolist(), counts.tolist()):
+                    self.bins[key] = self.bins.get(key, 0) + count
+            return
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: 'QuantileSketch') -> None:
+        self.zero += other.zero
+        for key, count in other.bins.items():
+            self.bins[key] = self.bins.get(key, 0) + count
+
+    def _value(self, key: int) -> float:
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def quantile(self, q: float):
+        total = self.count
+        if not total:
+            return None
+        rank = max(math.ceil(q * total) - 1, 0)  # nearest-rank
+        seen = self.zero
+        if rank < seen:
+            return 0.0
+        for key in sorted(self.bins):
+            seen += self.bins[key]
+            if rank < seen:
+                return self._value(key)
+        return self._value(max(self.bins))
+
+    def histogram(self, bounds: tuple) -> list:
+        # Counts per [bound[i-1], bound[i]) range plus an overflow bucket.
+        counts = [0] * (len(bounds) + 1)
+        counts[0] += self.zero
+        for key, count in self.bins.items():
+            value = self._value(key)
+            position = next((i for i, bound in enumerate(bounds) if value < bound), len(bounds))
+            counts[position] += count
+        return counts
+
+    def to_dict(self) -> dict:
+        return {'accuracy': self.accuracy, 'zero': self.zero, 'bins': {str(key): count for key, count in sorted(self.bins.items())}}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'QuantileSketch':
+        sketch = cls(data['accuracy'])
+        sketch.zero = data['zero']
+        sketch.bins = {int(key): count for key, count in data['bins'].items()}
+        return sketch
+
+
+def _latency_metrics(table: 'RequestTable', name: str) -> dict:
+    values = table.column(name)
+    floor = 1 if name == 'elapsed' else 0  # a totalElapsed of 0 means the timing is missing
+    if np is not None:
+        valid = values[values >= floor]
+    else:
+        valid = [value for value in values if value >= floor]
+    sketch = QuantileSketch()
+    sketch.add_many(valid)
+    slowest = []
+    for index in table.largest(name, SLOWEST_REQUESTS):
+        slowest.append({
+            'index': index,
+            'timestamp': table.timestamp[index] if table.timestamp[index] >= 0 else None,
+            'model': table.models[table.model[index]],
+            'value': getattr(table, name)[index],
+        })
+    return {
+        'count': len(valid),
+        'sum': int(sum(valid)),
+        'max': int(max(valid)) if len(valid) else 0,
+        'sketch': sketch.to_dict(),
+        'slowest': slowest,
+    }
+
+
+def _empty_latency() -> dict:
+    return {'count': 0, 'sum': 0, 'max': 0, 'sketch': QuantileSketch().to_dict(), 'slowest': []}
+
+
+def _merge_latency(target: dict, source: dict, file_path: str) -> None:
+    for name, data in source.items():
+        if name not in target:
+            target[name] = _empty_latency()
+        merged = target[name]
+        merged['count'] += data['count']
+        merged['sum'] += data['sum']
+        merged['max'] = max(merged['max'], data['max'])
+        sketch = QuantileSketch.from_dict(merged['sketch'])
+        sketch.merge(QuantileSketch.from_dict(data['sketch']))
+        merged['sketch'] = sketch.to_dict()
+        slowest = merged['slowest'] + [{**item, 'file': file_path} for item in data['slowest']]
+        merged['slowest'] = heapq.nlargest(SLOWEST_REQUESTS, slowest, key=lambda item: item['value'])
+
+
+def _histogram_labels() -> list:
+    labels = []
+    lower = 0
+    for bound in LATENCY_HISTOGRAM_BOUNDS_MS:
+        labels.append(f"{_short_duration(lower)}-{_short_duration(bound)}")
+        lower = bound
+    labels.append(f">={_short_duration(lower)}")
+    return labels
+
+
+def _short_duration(ms) -> str:
+    if ms >= 60000:
+        return f"{ms / 60000:g}m"
+    return f"{ms / 1000:g}s"
+
+
+def _scan_request(index: int, req: dict, table: RequestTable, collectors: list, needs_text: bool) -> None:
+    # Appends one row for req and feeds its response items to the collectors.
+    flags = 0
+
+    timestamp = req.get('timestamp')
+    if not isinstance(timestamp, int):
+        timestamp = -1
+
+    result = req.get('result', {})
+    elapsed = 0
+    first_progress = -1
+    if result:
+        timings = result.get('timings', {})
+        elapsed = timings.get('totalElapsed', 0)
+        elapsed = int(elapsed) if isinstance(elapsed, (int, float)) else 0
+        first_progress = timings.get('firstProgress', -1)
+        if not isinstance(first_progress, int):
+            first_progress = -1
+
+    wait = req.get('timeSpentWaiting')
+    if not isinstance(wait, int):
+        wait = -1
+
+    model_id = req.get('modelId')
+    if not isinstance(model_id, str) or not model_id:
+        model_id = 'Unknown'
+        flags |= FLAG_MISSING_MODEL
+
+    # NOTE: VS Code chat exports do not reliably include which custom agent was selected.
+    # Do not guess. All per-agent metrics must be treated as unavailable.
+    current_agent = 'Unattributed'
+
+    # Single pass over the response items; collectors own tool counts and any text use.
+    response_items = req.get('response')
+    if not isinstance(response_items, list):
+        response_items = []
+        flags |= FLAG_MISSING_RESPONSE
+
+    tool_calls = edits = 0
+    for collector in collectors:
+        collector.start_request(index, req, current_agent)
+    for resp in response_items:
+        kind = resp.get('kind')
+        if kind == 'toolInvocationSerialized':
+            tool_calls += 1
+        elif kind == 'textEditGroup':
+            edits += 1
+        text = _response_item_text(resp) if needs_text else None
+        for collector in collectors:
+            collector.add_item(resp, kind, text)
+    extra_fields = {}
+    for collector in collectors:
+        collector.end_request()
+        extra_fields.update(collector.row_fields())
+
+    if not _get_message_text(req):
+        flags |= FLAG_MISSING_MESSAGE
+
+    # File edit events
+    edits_kept = edits_undone = edits_modified = 0
+    for evt in req.get('editedFileEvents', []) or []:
+        event_kind = evt.get('eventKind')
+        if event_kind == 1:
+            edits_kept += 1
+        elif event_kind == 2:
+            edits_undone += 1
+        elif event_kind == 3:
+            edits_modified += 1
+
+    # Votes / Feedback
+    vote = req.get('vote')
+    vote_down_reason = -1
+    if vote == 0:
+        reason = req.get('voteDownReason')
+        if isinstance(reason, str) and reason:
+            vote_down_reason = table.intern('vote_down_reasons', reason)
+    elif vote != 1:
+        vote = -1
+
+    # Rejections
+    model_state = None
+    model_state_obj = req.get('modelState')
+    if isinstance(model_state_obj, dict):
+        model_state = model_state_obj.get('value')
+
+    rejection = REJECTION_NONE
+    if model_state == 3:
+        rejection = REJECTION_FAILED
+    elif model_state == 2:
+        rejection = REJECTION_CANCELLED
+    elif result:
+        error_details = result.get('errorDetails')
+        if error_details:
+            code = error_details.get('code', 'unknown')
+            rejection = REJECTION_FAILED if code == 'failed' else REJECTION_CANCELLED
+
+    table.append(
+        timestamp=timestamp,
+        elapsed=elapsed,
+        first_progress=first_progress,
+        wait=wait,
+        vote=vote,
+        model_state=model_state if isinstance(model_state, int) and 0 <= model_state < 128 else -1,
+        rejection=rejection,
+        flags=flags,
+        model=table.intern('models', model_id),
+        agent=table.intern('agents', current_agent),
+        vote_down_reason=vote_down_reason,
+        tool_calls=tool_calls,
+        edits=edits,
+        edits_kept=edits_kept,
+        edits_undone=edits_undone,
+        edits_modified=edits_modified,
+        **extra_fields,
+    )
+
+
+def build_request_table(requests, collectors: list, on_row=None, options: AnalysisOptions = None) -> tuple:
+    # Returns the per-request table plus the verbatim retrospective feedback, the only
+    # free-text data the report keeps. on_row(table, index) is called as each row lands.
+    needs_text = any(collector.needs_text for collector in collectors)
+    feedback_keywords = (options or AnalysisOptions()).feedback_keywords
+    table = RequestTable()
+    retro_feedback = []
+    for i, req in enumerate(requests):
+        _scan_request(i, req, table, collectors, needs_text)
+        if on_row:
+            on_row(table, i)
+        _collect_retro_feedback(i, req, feedback_keywords, retro_feedback)
+    return table, retro_feedback
+
+
+def _collect_retro_feedback(index: int, req: dict, keywords: tuple, retro_feedback: list) -> None:
+    user_request = _extract_user_request(_get_message_text(req))
+    if _is_retro_feedback(user_request, keywords):
+        retro_feedback.append({
+            'index': index,
+            'timestamp': req.get('timestamp'),
+            'text': user_request,
+        })
+
+
+def _context_metrics(table: RequestTable, threshold: int) -> dict:
+    total_requests = len(table)
+    if not total_requests or table.context_chars[0] < 0:
+        return {'threshold': threshold, 'sizes': {}, 'curve': [], 'flagged_count': 0, 'flagged': []}
+
+    columns = {name: table.column(name) for name, _ in CONTEXT_SIZES}
+    sizes = {}
+    for name, values in columns.items():
+        sizes[name] = {'total': table.sum_valid(name), 'max': int(values.max() if np is not None else max(values))}
+
+    # Mean sizes per equal slice of the session, in request order.
+    points = min(CONTEXT_CURVE_POINTS, total_requests)
+    bounds = [point * total_requests // points for point in range(points + 1)]
+    if np is not None:
+        slice_sums = {name: np.add.reduceat(values, bounds[:-1]).tolist() for name, values in columns.items()}
+    else:
+        slice_sums = {name: [sum(values[start:end]) for start, end in zip(bounds, bounds[1:])]
+                      for name, values in columns.items()}
+    curve = []
+    for point, (start, end) in enumerate(zip(bounds, bounds[1:])):
+        entry = {'from': start, 'to': end - 1}
+        for name in columns:
+            entry[name] = int(slice_sums[name][point] / (end - start))
+        curve.append(entry)
+
+    if np is not None:
+        prompt = columns['message_chars'] + columns['attachment_chars'] + columns['context_chars']
+        flagged_rows = np.flatnonzero(prompt > threshold)
+        top_rows = flagged_rows[np.argsort(-prompt[flagged_rows], kind='stable')[:CONTEXT_FLAGGED_REPORTED]].tolist()
+    else:
+        prompt = [sum(values) for values in zip(columns['message_chars'], columns['attachment_chars'], columns['context_chars'])]
+        flagged_rows = [index for index, size in enumerate(prompt) if size > threshold]
+        top_rows = heapq.nlargest(CONTEXT_FLAGGED_REPORTED, flagged_rows, key=lambda row: prompt[row])
+    flagged = []
+    for index in top_rows:
+        flagged.append({
+            'index': index,
+            'timestamp': table.timestamp[index] if table.timestamp[index] >= 0 else None,
+            'model': table.models[table.model[index]],
+            'prompt_chars': int(prompt[index]),
+            'context_chars': table.context_chars[index],
+        })
+    return {'threshold': threshold, 'sizes': sizes, 'curve': curve, 'flagged_count': len(flagged_rows), 'flagged': flagged}
+
+
+def _merge_context(target: dict, source: dict, file_path: str) -> None:
+    target['threshold'] = source['threshold']
+    for name, data in source['sizes'].items():
+        merged = target['sizes'].setdefault(name, {'total': 0, 'max': 0})
+        merged['total'] += data['total']
+        merged['max'] = max(merged['max'], data['max'])
+    target['flagged_count'] += source['flagged_count']
+    flagged = target['flagged'] + [{**item, 'file': file_path} for item in source['flagged']]
+    target['flagged'] = heapq.nlargest(CONTEXT_FLAGGED_REPORTED, flagged, key=lambda item: item['prompt_chars'])
+
+
+def _timeline_segments(table: RequestTable) -> list:
+    # Sweep line over each request's busy [timestamp, +totalElapsed) and wait
+    # [busy end, +timeSpentWaiting) intervals. Returns contiguous (start, end, state) segments
+    # from the first request to the last interval end; overlapping intervals are merged, busy
+    # taking precedence over wait, and everything uncovered is idle.
+    events = []
+    for index, timestamp in enumerate(table.timestamp):
+        if timestamp < 0:
+            continue
+        busy_end = timestamp + max(table.elapsed[index], 0)
+        wait_end = busy_end + max(table.wait[index], 0)
+        events.append((timestamp, 1, 0))
+        events.append((busy_end, -1, 0))
+        events.append((busy_end, 0, 1))
+        events.append((wait_end, 0, -1))
+    events.sort()
+
+    segments = []
+    busy = wait = 0
+    for (time_ms, busy_delta, wait_delta), (next_ms, _, _) in zip(events, events[1:]):
+        busy += busy_delta
+        wait += wait_delta
+        if next_ms == time_ms:
+            continue
+        state = 'busy' if busy else 'wait' if wait else 'idle'
+        if segments and segments[-1][2] == state and segments[-1][1] == time_ms:
+            segments[-1] = (segments[-1][0], next_ms, state)
+        else:
+            segments.append((time_ms, next_ms, state))
+    return segments
+
+
+def _timeline_window(windows: dict, start: int) -> dict:
+    window = windows.get(start)
+    if window is None:
+        window = windows[start] = {'start': start, 'busy': 0, 'wait': 0, 'idle': 0, 'requests': 0}
+    return window
+
+
+def _timeline_metrics(table: RequestTable, window_ms: int, idle_gap_ms: int) -> dict:
+    totals = {state: 0 for state, _ in TIMELINE_STATES}
+    windows = {}
+    gaps = []
+    for start, end, state in _timeline_segments(table):
+        totals[state] += end - start
+        if state == 'idle' and end - start >= idle_gap_ms:
+            gaps.append((start, end))
+        while start < end:
+            window_start = start - start % window_ms
+            chunk_end = min(end, window_start + window_ms)
+            _timeline_window(windows, window_start)[state] += chunk_end - start
+            start = chunk_end
+
+    # Gaps end where a request starts; remember which one so the report can point at it.
+    resumed_by = {}
+    for index, timestamp in enumerate(table.timestamp):
+        if timestamp >= 0:
+            _timeline_window(windows, timestamp - timestamp % window_ms)['requests'] += 1
+            resumed_by.setdefault(timestamp, index)
+    reported = []
+    for start, end in heapq.nlargest(TIMELINE_GAPS_REPORTED, gaps, key=lambda gap: gap[1] - gap[0]):
+        reported.append({'index': resumed_by.get(end), 'timestamp': end, 'start': start, 'duration': end - start})
+    return {
+        'window_ms': window_ms,
+        'idle_gap_ms': idle_gap_ms,
+        'totals': totals,
+        'windows': [windows[key] for key in sorted(windows)],
+        'gap_count': len(gaps),
+        'gaps': reported,
+    }
+
+
+def _merge_timeline(target: dict, source: dict, file_path: str) -> None:
+    target['window_ms'] = source['window_ms']
+    target['idle_gap_ms'] = source['idle_gap_ms']
+    _merge_counts(target['totals'], source['totals'])
+    windows = {window['start']: window for window in target['windows']}
+    for window in source['windows']:
+        merged = _timeline_window(windows, window['start'])
+        for key in ('busy', 'wait', 'idle', 'requests'):
+            merged[key] += window[key]
+    target['windows'] = [windows[key] for key in sorted(windows)]
+    target['gap_count'] += source['gap_count']
+    gaps = target['gaps'] + [{**item, 'file': file_path} for item in source['gaps']]
+    target['gaps'] = heapq.nlargest(TIMELINE_GAPS_REPORTED, gaps, key=lambda item: item['duration'])
+
+
+def write_timeline(timeline: dict, path: str) -> None:
+    # CSV (one row per window) when path ends in .csv, otherwise the timeline as JSON.
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        if not path.lower().endswith('.csv'):
+            json.dump(timeline, f, indent=2)
+            f.write('\n')
+            return
+        writer = csv.writer(f, lineterminator='\n')
+        writer.writerow(['window_start', 'window_start_ms', 'window_ms', 'busy_ms', 'wait_ms', 'idle_ms', 'requests'])
+        for window in timeline['windows']:
+            started = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(window['start'] / 1000))
+            writer.writerow([started, window['start'], timeline['window_ms'], window['busy'], window['wait'],
+                             window['idle'], window['requests']])
+
+
+def _format_chars(count) -> str:
+    if count >= 1_000_000:
+        return f"{count / 1_000_000:.1f}M"
+    if count >= 1000:
+        return f"{count / 1000:.1f}k"
+    return str(count)
+
+
+def summarize_table(table: RequestTable, retro_feedback: list, collectors: list, options: AnalysisOptions = None) -> dict:
+    options = options or AnalysisOptions()
+    total_requests = len(table)
     metrics = {
-        'total_requests': len(requests),
+        'total_requests': total_requests,
         'agents': {},
-        'models': {},
+        'models': table.counts_by('model', table.models),
         'tools': {},
-        'file_edits': {'kept': 0, 'undone': 0, 'modified': 0},
-        'votes': {'up': 0, 'down': 0},
-        'vote_down_reasons': {},
-        'retro_feedback': [],
+        'file_edits': {
+            'kept': table.sum_valid('edits_kept'),
+            'undone': table.sum_valid('edits_undone'),
+            'modified': table.sum_valid('edits_modified'),
+        },
+        'votes': {'up': table.count('vote', 1), 'down': table.count('vote', 0)},
+        'vote_down_reasons': table.counts_by('vote_down_reason', table.vote_down_reasons),
+        'retro_feedback': list(retro_feedback),
         'warnings': [],
         'rejections': {
-            'cancelled': 0,
-            'failed': 0,
+            'cancelled': table.count('rejection', REJECTION_CANCELLED),
+            'failed': table.count('rejection', REJECTION_FAILED),
             'tool_rejections': 0
         },
-        'agent_work_time': 0,
-        'user_wait_time': 0,
-        'start_timestamp': requests[0].get('timestamp', 0) if requests else 0,
-        'end_timestamp': requests[-1].get('timestamp', 0) if requests else 0
+        'agent_work_time': table.sum_valid('elapsed'),
+        'user_wait_time': table.sum_valid('wait'),
+        'session_duration': 0,
+        'start_timestamp': max(table.timestamp[0], 0) if total_requests else 0,
+        'end_timestamp': max(table.timestamp[-1], 0) if total_requests else 0,
+        'latency': {name: _latency_metrics(table, name) for name, _ in LATENCY_METRICS},
+        'context': _context_metrics(table, options.context_threshold),
+        'timeline': _timeline_metrics(table, options.timeline_window, options.idle_gap)
     }
 
-    missing_timestamp_count = 0
-    missing_elapsed_count = 0
-    missing_wait_count = 0
-    missing_model_count = 0
-    missing_message_count = 0
-    missing_response_count = 0
+    for agent_index, agent in enumerate(table.agents):
+        in_agent = table.mask('agent', agent_index)
+        metrics['agents'][agent] = {
+            'requests': table.count('agent', agent_index),
+            'models': table.counts_by('model', table.models, mask=in_agent),
+            'tools': {},
+            'rejections': {
+                'cancelled': table.count('rejection', REJECTION_CANCELLED, mask=in_agent),
+                'failed': table.count('rejection', REJECTION_FAILED, mask=in_agent),
+            },
+            'work_time': table.sum_valid('elapsed', mask=in_agent),
+            'wait_time': table.sum_valid('wait', mask=in_agent),
+        }
 
-    for i, req in enumerate(requests):
-        # Timestamps and Work Time
-        result = req.get('result', {})
-        elapsed = 0
-        if result:
-            timings = result.get('timings', {})
-            elapsed = timings.get('totalElapsed', 0)
-            if elapsed:
-                metrics['agent_work_time'] += elapsed
-            else:
-                missing_elapsed_count += 1
-        else:
-            missing_elapsed_count += 1
-
-        wait = req.get('timeSpentWaiting')
-        if isinstance(wait, int):
-            metrics['user_wait_time'] += wait
-        else:
-            missing_wait_count += 1
-        
-        # Model
-        model_id = req.get('modelId')
-        if not isinstance(model_id, str) or not model_id:
-            model_id = 'Unknown'
-            missing_model_count += 1
-        metrics['models'][model_id] = metrics['models'].get(model_id, 0) + 1
-        
-        # Extract all text from response for reporting/plausibility only (no agent attribution).
-        thinking_text = ""
-        response_text = ""
-        response_items = req.get('response')
-        if not isinstance(response_items, list):
-            response_items = []
-            missing_response_count += 1
-
-        for resp in response_items:
-            kind = resp.get('kind')
-            val = resp.get('value', '')
-            text = resp.get('text', '')
-            
-            content = ""
-            if isinstance(val, str):
-                content = val
-            elif isinstance(val, list):
-                for part in val:
-                    if isinstance(part, dict) and 'text' in part:
-                        content += part['text']
-                    elif isinstance(part, str):
-                        content += part
-            elif isinstance(text, str):
-                content = text
-            
-            if kind == 'thinking':
-                thinking_text += content
-            else:
-                response_text += content
-        
-        message_text = _get_message_text(req)
-        if not message_text:
-            missing_message_count += 1
-        user_request = _extract_user_request(message_text)
-
-        # NOTE: VS Code chat exports do not reliably include which custom agent was selected.
-        # Do not guess. All per-agent metrics must be treated as unavailable.
-        current_agent = 'Unattributed'
-
-        if not isinstance(req.get('timestamp'), int):
-            missing_timestamp_count += 1
-
-        if _is_retro_feedback(user_request):
-            metrics['retro_feedback'].append({
-                'index': i,
-                'timestamp': req.get('timestamp'),
-                'text': user_request,
-            })
-
-        if current_agent not in metrics['agents']:
-            metrics['agents'][current_agent] = {
-                'requests': 0,
-                'models': {},
-                'tools': {},
-                'rejections': {'cancelled': 0, 'failed': 0},
-                'work_time': 0,
-                'wait_time': 0,
-            }
-        
-        metrics['agents'][current_agent]['requests'] += 1
-        metrics['agents'][current_agent]['models'][model_id] = metrics['agents'][current_agent]['models'].get(model_id, 0) + 1
-        metrics['agents'][current_agent]['work_time'] += elapsed
-        if isinstance(wait, int):
-            metrics['agents'][current_agent]['wait_time'] += wait
-        
-        # Tools
-        for resp in response_items:
-            kind = resp.get('kind')
-            if kind == 'toolInvocationSerialized':
-                tool_id = resp.get('toolId', 'unknown-tool')
-                metrics['tools'][tool_id] = metrics['tools'].get(tool_id, 0) + 1
-                metrics['agents'][current_agent]['tools'][tool_id] = metrics['agents'][current_agent]['tools'].get(tool_id, 0) + 1
-            elif kind == 'textEditGroup':
-                metrics['tools']['edit'] = metrics['tools'].get('edit', 0) + 1
-                metrics['agents'][current_agent]['tools']['edit'] = metrics['agents'][current_agent]['tools'].get('edit', 0) + 1
-
-        # File edit events
-        for evt in req.get('editedFileEvents', []) or []:
-            event_kind = evt.get('eventKind')
-            if event_kind == 1:
-                metrics['file_edits']['kept'] += 1
-            elif event_kind == 2:
-                metrics['file_edits']['undone'] += 1
-            elif event_kind == 3:
-                metrics['file_edits']['modified'] += 1
-
-        # Votes / Feedback
-        vote = req.get('vote')
-        if vote == 1:
-            metrics['votes']['up'] += 1
-        elif vote == 0:
-            metrics['votes']['down'] += 1
-            reason = req.get('voteDownReason')
-            if isinstance(reason, str) and reason:
-                metrics['vote_down_reasons'][reason] = metrics['vote_down_reasons'].get(reason, 0) + 1
-
-        # Rejections
-        model_state = None
-        model_state_obj = req.get('modelState')
-        if isinstance(model_state_obj, dict):
-            model_state = model_state_obj.get('value')
-
-        if model_state == 3:
-            metrics['rejections']['failed'] += 1
-            metrics['agents'][current_agent]['rejections']['failed'] += 1
-        elif model_state == 2:
-            metrics['rejections']['cancelled'] += 1
-            metrics['agents'][current_agent]['rejections']['cancelled'] += 1
-        elif result:
-            error_details = result.get('errorDetails')
-            if error_details:
-                code = error_details.get('code', 'unknown')
-                if code == 'failed':
-                    metrics['rejections']['failed'] += 1
-                    metrics['agents'][current_agent]['rejections']['failed'] += 1
-                else:
-                    metrics['rejections']['cancelled'] += 1
-                    metrics['agents'][current_agent]['rejections']['cancelled'] += 1
+    for collector in collectors:
+        collector.finish(metrics)
 
     # Plausibility checks
     if metrics['total_requests'] != sum(a['requests'] for a in metrics['agents'].values()):
@@ -231,6 +1617,14 @@ def analyze_chat(file_path: str) -> int:
     session_duration_ms = metrics['end_timestamp'] - metrics['start_timestamp']
     if session_duration_ms < 0:
         session_duration_ms = 0
+    metrics['session_duration'] = session_duration_ms
+
+    missing_timestamp_count = table.count('timestamp', -1)
+    missing_elapsed_count = table.count('elapsed', 0)
+    missing_wait_count = table.count('wait', -1)
+    missing_model_count = table.count_flag(FLAG_MISSING_MODEL)
+    missing_message_count = table.count_flag(FLAG_MISSING_MESSAGE)
+    missing_response_count = table.count_flag(FLAG_MISSING_RESPONSE)
 
     if missing_timestamp_count:
         metrics['warnings'].append(f"{missing_timestamp_count} request(s) missing a valid timestamp")
@@ -256,10 +1650,345 @@ def analyze_chat(file_path: str) -> int:
         if other_time_ms < -int(session_duration_ms * 0.05):
             metrics['warnings'].append('Time breakdown exceeds session duration (agent + user wait > session)')
 
-    # Output summary
+    return metrics
+
+
+def compute_metrics(requests, collectors: list = None, options: AnalysisOptions = None) -> dict:
+    if collectors is None:
+        collectors = default_collectors(options)
+    table, retro_feedback = build_request_table(requests, collectors, options=options)
+    return summarize_table(table, retro_feedback, collectors, options)
+
+
+class IncrementalAnalysis:
+    # Keeps the request table of one export between --watch polls. VS Code rewrites the
+    # whole export on every save but only ever appends to requests[], so after a cheap CRC
+    # check of the already processed bytes only the new tail is parsed. If anything before
+    # the tail changed (a vote on an old request, the last request finishing after it was
+    # exported, a different session), the export is re-parsed from scratch. A re-parse only
+    # replaces the previous state once it reaches the end of requests[], so an export caught
+    # halfway through a rewrite keeps the last good report and is retried on the next poll.
+
+    def __init__(self, file_path: str, options: AnalysisOptions = None, on_row=None):
+        self.file_path = file_path
+        self.options = options or AnalysisOptions()
+        self.on_row = on_row
+        self.reparsed = False
+        self._signature = None
+        self._reset()
+
+    def _reset(self) -> None:
+        self.collectors = default_collectors(self.options)
+        self.table = RequestTable()
+        self.retro_feedback = []
+        self._needs_text = any(collector.needs_text for collector in self.collectors)
+        # Byte offset just past the last processed requests[] element, and CRC-32 of the
+        # bytes before it.
+        self._end = 0
+        self._crc = 0
+
+    def _prefix_crc(self, f, start: int, end: int, crc: int = 0) -> int:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = f.read(min(WATCH_CHECK_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            crc = zlib.crc32(block, crc)
+            remaining -= len(block)
+        return crc
+
+    def update(self):
+        # Returns the number of requests added since the previous call, or None when the
+        # export has not changed. Raises OSError/ValueError for unreadable or incomplete
+        # exports; the previous state is kept and the export is read again on the next call.
+        stat = os.stat(self.file_path)
+        signature = (stat.st_size, stat.st_mtime_ns)
+        if signature == self._signature:
+            return None
+        with open(self.file_path, 'rb') as f:
+            reparse = not (self._end and stat.st_size >= self._end
+                           and self._prefix_crc(f, 0, self._end) == self._crc)
+            if reparse:
+                previous = (self.collectors, self.table, self.retro_feedback, self._end, self._crc)
+                self._reset()
+            start = self._end
+            f.seek(start)
+            try:
+                added, complete = self._parse_tail(f, start)
+                if reparse and not complete:
+                    raise ValueError('export is incomplete (caught mid-write?), keeping the previous report')
+            except (OSError, ValueError):
+                if reparse:
+                    self.collectors, self.table, self.retro_feedback, self._end, self._crc = previous
+                raise
+            self._crc = self._prefix_crc(f, start, self._end, self._crc)
+        self.reparsed = reparse
+        self._signature = signature
+        return added
+
+    def _parse_tail(self, f, start: int) -> tuple:
+        # Returns (requests added, whether the end of requests[] was reached).
+        # newline='' keeps CRLF as two characters so byte_offset() matches the file.
+        text = io.TextIOWrapper(f, encoding='utf-8', newline='')
+        reader = _JsonStreamReader(text, track_bytes=True)
+        added = 0
+        complete = False
+        try:
+            if not start:
+                reader.expect('{')
+                if not _advance_to_requests(reader):
+                    return 0, True
+            while True:
+                try:
+                    if reader.peek() == ',':
+                        reader.expect(',')
+                        continue
+                    if reader.peek() == ']':
+                        complete = True
+                        break
+                    req = reader.decode()
+                except ValueError:
+                    # Export caught mid-write; the rest is picked up on the next change.
+                    break
+                index = len(self.table)
+                _scan_request(index, req, self.table, self.collectors, self._needs_text)
+                if self.on_row:
+                    self.on_row(self.table, index)
+                _collect_retro_feedback(index, req, self.options.feedback_keywords, self.retro_feedback)
+                self._end = start + reader.byte_offset()
+                added += 1
+        finally:
+            text.detach()
+        return added, complete
+
+    def metrics(self) -> dict:
+        return summarize_table(self.table, self.retro_feedback, self.collectors, self.options)
+
+
+def _merge_counts(target: dict, source: dict) -> None:
+    for key, value in source.items():
+        target[key] = target.get(key, 0) + value
+
+
+def merge_metrics(per_file: list) -> dict:
+    # Combines per-file metrics into one corpus report. Durations are summed per session so
+    # idle time between exports does not inflate "Other Time".
+    merged = {
+        'files': len(per_file),
+        'total_requests': 0,
+        'agents': {},
+        'models': {},
+        'tools': {},
+        'file_edits': {'kept': 0, 'undone': 0, 'modified': 0},
+        'votes': {'up': 0, 'down': 0},
+        'vote_down_reasons': {},
+        'retro_feedback': [],
+        'warnings': [],
+        'rejections': {
+            'cancelled': 0,
+            'failed': 0,
+            'tool_rejections': 0
+        },
+        'agent_work_time': 0,
+        'user_wait_time': 0,
+        'session_duration': 0,
+        'start_timestamp': 0,
+        'end_timestamp': 0,
+        'latency': {name: _empty_latency() for name, _ in LATENCY_METRICS},
+        'tool_profile': {},
+        'context': {'threshold': DEFAULT_CONTEXT_THRESHOLD_CHARS, 'sizes': {}, 'curve': [], 'flagged_count': 0, 'flagged': []},
+        'timeline': {'window_ms': DEFAULT_TIMELINE_WINDOW_MS, 'idle_gap_ms': DEFAULT_IDLE_GAP_MS,
+                     'totals': {state: 0 for state, _ in TIMELINE_STATES}, 'windows': [], 'gap_count': 0, 'gaps': []},
+        'edit_churn': {'slip_threshold': DEFAULT_SLIP_THRESHOLD, 'files': {}, 'slip_count': 0, 'slips': []}
+    }
+
+    for file_path, metrics in per_file:
+        for key in ('total_requests', 'agent_work_time', 'user_wait_time', 'session_duration'):
+            merged[key] += metrics[key]
+        for key in ('models', 'tools', 'file_edits', 'votes', 'vote_down_reasons', 'rejections'):
+            _merge_counts(merged[key], metrics[key])
+
+        if metrics['start_timestamp'] and (not merged['start_timestamp'] or metrics['start_timestamp'] < merged['start_timestamp']):
+            merged['start_timestamp'] = metrics['start_timestamp']
+        if metrics['end_timestamp'] > merged['end_timestamp']:
+            merged['end_timestamp'] = metrics['end_timestamp']
+
+        for agent, data in metrics['agents'].items():
+            target = merged['agents'].setdefault(agent, {
+                'requests': 0,
+                'models': {},
+                'tools': {},
+                'rejections': {'cancelled': 0, 'failed': 0},
+                'work_time': 0,
+                'wait_time': 0,
+            })
+            for key in ('requests', 'work_time', 'wait_time'):
+                target[key] += data[key]
+            for key in ('models', 'tools', 'rejections'):
+                _merge_counts(target[key], data[key])
+
+        _merge_latency(merged['latency'], metrics['latency'], file_path)
+        _merge_tool_profiles(merged['tool_profile'], metrics['tool_profile'])
+        _merge_context(merged['context'], metrics['context'], file_path)
+        _merge_timeline(merged['timeline'], metrics['timeline'], file_path)
+        _merge_edit_churn(merged['edit_churn'], metrics['edit_churn'], file_path)
+        for item in metrics['retro_feedback']:
+            merged['retro_feedback'].append({**item, 'file': file_path})
+        for warning in metrics['warnings']:
+            merged['warnings'].append(f"{file_path}: {warning}")
+
+    return merged
+
+
+def _format_duration(ms) -> str:
+    seconds = ms / 1000
+    return f"{seconds:.2f}s ({seconds/3600:.2f}h)"
+
+
+def _markdown_cell(value) -> str:
+    return str(value).replace('|', '\\|').replace('\n', ' ')
+
+
+def print_markdown(metrics: dict) -> None:
+    session_ms = metrics['session_duration']
+    other_ms = max(0, session_ms - metrics['agent_work_time'] - metrics['user_wait_time'])
+
+    print("## Session Overview\n")
+    print("| Metric | Value |")
+    print("| --- | --- |")
+    if 'files' in metrics:
+        print(f"| Files Analyzed | {metrics['files']} |")
+    print(f"| Total Requests | {metrics['total_requests']} |")
+    print(f"| Session Duration | {_format_duration(session_ms)} |")
+    print(f"| Agent Work Time | {_format_duration(metrics['agent_work_time'])} |")
+    print(f"| User Wait Time | {_format_duration(metrics['user_wait_time'])} |")
+    print(f"| Other Time (unattributed) | {_format_duration(other_ms)} |")
+    print(f"| Files Kept / Undone / Modified | {metrics['file_edits']['kept']} / {metrics['file_edits']['undone']} / {metrics['file_edits']['modified']} |")
+    print(f"| Votes Up / Down | {metrics['votes']['up']} / {metrics['votes']['down']} |")
+    print(f"| Cancelled / Failed | {metrics['rejections']['cancelled']} / {metrics['rejections']['failed']} |")
+
+    print("\n## Latency Distribution\n")
+    header = ' | '.join(f"p{p}" for p in LATENCY_PERCENTILES)
+    print(f"| Metric | Count | {header} | Max |")
+    print("| --- | ---: |" + " ---: |" * len(LATENCY_PERCENTILES) + " ---: |")
+    for name, label in LATENCY_METRICS:
+        data = metrics['latency'][name]
+        sketch = QuantileSketch.from_dict(data['sketch'])
+        cells = ' | '.join(
+            f"{sketch.quantile(p / 100) / 1000:.2f}s" if data['count'] else '-' for p in LATENCY_PERCENTILES
+        )
+        print(f"| {label} | {data['count']} | {cells} | {data['max'] / 1000:.2f}s |")
+
+    timeline = metrics['timeline']
+    if timeline['windows']:
+        print("\n## Timeline\n")
+        print(f"{_short_duration(timeline['window_ms'])} windows; overlapping requests are merged.\n")
+        print("| State | Time |")
+        print("| --- | ---: |")
+        for state, label in TIMELINE_STATES:
+            print(f"| {label} | {_format_duration(timeline['totals'][state])} |")
+        print(f"\nIdle gaps >= {_short_duration(timeline['idle_gap_ms'])}: {timeline['gap_count']}")
+        if timeline['gaps']:
+            print("\n| Resumed By | Idle |")
+            print("| --- | ---: |")
+            for item in timeline['gaps']:
+                location = f"{item['file']}, " if 'file' in item else ''
+                print(f"| {_markdown_cell(location)}request {item['index']} | {_format_duration(item['duration'])} |")
+    context = metrics['context']
+    if context['sizes']:
+        print("\n## Context Size\n")
+        print("| Payload | Total | Max |")
+        print("| --- | ---: | ---: |")
+        for name, label in CONTEXT_SIZES:
+            data = context['sizes'][name]
+            print(f"| {label} | {_format_chars(data['total'])} | {_format_chars(data['max'])} |")
+        print(f"\nRequests above {_format_chars(context['threshold'])} prompt chars: {context['flagged_count']}")
+
+    edit_churn = metrics['edit_churn']
+    if edit_churn['files']:
+        print("\n## Edit Churn\n")
+        print(f"Detail slips (same file edited >= {edit_churn['slip_threshold']} times in one request): {edit_churn['slip_count']}\n")
+        print("| File | Edits | Requests | Max per Request | Undone |")
+        print("| --- | ---: | ---: | ---: | ---: |")
+        for path, churn in _churn_hot_spots(edit_churn, 'edits'):
+            print(f"| {_markdown_cell(path)} | {churn['edits']} | {churn['requests']} | {churn['max_per_request']} | {churn['undone']} |")
+    print("\n## Agent Analysis\n")
+    print("Custom agent/role attribution is not available in VS Code chat exports; per-agent metrics are not reported.\n")
+    print("| Agent | Requests | Work Time | Wait Time | Cancelled | Failed |")
+    print("| --- | ---: | ---: | ---: | ---: | ---: |")
+    for agent, data in metrics['agents'].items():
+        print(f"| {_markdown_cell(agent)} | {data['requests']} | {data['work_time'] / 1000:.2f}s | {data['wait_time'] / 1000:.2f}s "
+              f"| {data['rejections']['cancelled']} | {data['rejections']['failed']} |")
+
+    print("\n## Model Usage\n")
+    print("| Model | Requests |")
+    print("| --- | ---: |")
+    for model, count in sorted(metrics['models'].items(), key=lambda item: -item[1]):
+        print(f"| {_markdown_cell(model)} | {count} |")
+
+    print("\n## Tool Usage\n")
+    print("| Tool | Invocations |")
+    print("| --- | ---: |")
+    for tool, count in sorted(metrics['tools'].items(), key=lambda item: -item[1]):
+        print(f"| {_markdown_cell(tool)} | {count} |")
+
+    print("\n## Tool Latency and Failures\n")
+    print("| Tool | Calls | Failed | Failure Rate | Rejected | Total Time | p90 | Max | Top Error |")
+    print("| --- | ---: | ---: | ---: | ---: | ---: | ---: | ---: | --- |")
+    for tool_id, profile in _ranked_tool_profiles(metrics):
+        failure_rate = profile['failed'] / profile['calls'] * 100 if profile['calls'] else 0
+        p90 = '-'
+        if profile['timed']:
+            p90 = f"{QuantileSketch.from_dict(profile['sketch']).quantile(0.9) / 1000:.2f}s"
+        top_error = _top_errors(profile)
+        print(f"| {_markdown_cell(tool_id)} | {profile['calls']} | {profile['failed']} | {failure_rate:.1f}% | {profile['rejected']} "
+              f"| {profile['duration'] / 1000:.2f}s | {p90} | {profile['max_duration'] / 1000:.2f}s "
+              f"| {_markdown_cell(top_error[0][0]) if top_error else ''} |")
+
+    print("\n## Retrospective Feedback\n")
+    if metrics['retro_feedback']:
+        for item in metrics['retro_feedback']:
+            location = f"{item['file']}, " if 'file' in item else ''
+            print(f"- ({location}request {item['index']}) {_markdown_cell(item['text'])}")
+    else:
+        print("(none detected)")
+
+    print("\n## Plausibility Warnings\n")
+    if metrics['warnings']:
+        for warning in metrics['warnings']:
+            print(f"- {warning}")
+    else:
+        print("(none)")
+
+
+def print_report(metrics: dict, output_format: str = 'text') -> None:
+    if output_format == 'json':
+        print(json.dumps(metrics, indent=2))
+    elif output_format == 'ndjson':
+        _emit_record({'type': 'summary', 'metrics': metrics})
+    elif output_format == 'markdown':
+        print_markdown(metrics)
+    else:
+        print_summary(metrics)
+
+
+def _emit_record(record: dict) -> None:
+    # NDJSON records are flushed one by one so downstream tools can consume them live.
+    print(json.dumps(record), flush=True)
+
+
+def _report_error(message: str, output_format: str) -> None:
+    # Keep stdout parseable for machine-readable formats.
+    print(message, file=sys.stderr if output_format in ('json', 'ndjson') else sys.stdout)
+
+
+def print_summary(metrics: dict) -> None:
+    if 'files' in metrics:
+        print(f"Files Analyzed: {metrics['files']}")
     print(f"Total Requests: {metrics['total_requests']}")
 
-    session_duration_s = session_duration_ms / 1000
+    session_duration_s = metrics['session_duration'] / 1000
     agent_work_time_s = metrics['agent_work_time'] / 1000
     user_wait_time_s = metrics['user_wait_time'] / 1000
     other_time_s = max(0.0, session_duration_s - agent_work_time_s - user_wait_time_s)
@@ -269,6 +1998,82 @@ def analyze_chat(file_path: str) -> int:
     print(f"User Wait Time: {user_wait_time_s:.2f}s ({user_wait_time_s/3600:.2f}h)")
     print(f"Other Time (unattributed): {other_time_s:.2f}s ({other_time_s/3600:.2f}h)")
 
+    print("\nLatency Distribution:")
+    for name, label in LATENCY_METRICS:
+        data = metrics['latency'][name]
+        if not data['count']:
+            print(f"  {label}: (no data)")
+            continue
+        sketch = QuantileSketch.from_dict(data['sketch'])
+        percentiles = ', '.join(f"p{p}={sketch.quantile(p / 100) / 1000:.2f}s" for p in LATENCY_PERCENTILES)
+        print(f"  {label}: n={data['count']}, {percentiles}, max={data['max'] / 1000:.2f}s")
+        histogram = sketch.histogram(LATENCY_HISTOGRAM_BOUNDS_MS)
+        print(f"    Histogram: {', '.join(f'{label}: {count}' for label, count in zip(_histogram_labels(), histogram))}")
+        for item in data['slowest']:
+            location = f"{item['file']}; " if 'file' in item else ''
+            ts_display = str(item['timestamp']) if item['timestamp'] is not None else 'unknown-ts'
+            print(f"    Slowest: [{location}{item['index']}; {ts_display}] {item['value'] / 1000:.2f}s ({item['model']})")
+
+    timeline = metrics['timeline']
+    print(f"\nTimeline ({_short_duration(timeline['window_ms'])} windows, overlapping requests merged):")
+    if timeline['windows']:
+        print('  ' + ', '.join(f"{label}: {_format_duration(timeline['totals'][state])}" for state, label in TIMELINE_STATES))
+        print(f"  Idle gaps >= {_short_duration(timeline['idle_gap_ms'])}: {timeline['gap_count']}")
+        for item in timeline['gaps']:
+            location = f"{item['file']}; " if 'file' in item else ''
+            index = item['index'] if item['index'] is not None else '?'
+            print(f"    [{location}{index}; {item['timestamp']}] {_format_duration(item['duration'])} idle before this request")
+    else:
+        print("  (no data)")
+    print("\nTool Profile:")
+    if metrics['tool_profile']:
+        for tool_id, profile in _ranked_tool_profiles(metrics):
+            failure_rate = profile['failed'] / profile['calls'] * 100 if profile['calls'] else 0
+            line = f"  {tool_id}: {profile['calls']} calls, {profile['failed']} failed ({failure_rate:.1f}%), {profile['rejected']} rejected"
+            if profile['timed']:
+                sketch = QuantileSketch.from_dict(profile['sketch'])
+                line += (f", {profile['duration'] / 1000:.2f}s total, p50={sketch.quantile(0.5) / 1000:.2f}s, "
+                         f"p90={sketch.quantile(0.9) / 1000:.2f}s, max={profile['max_duration'] / 1000:.2f}s")
+            print(line)
+            for message, count in _top_errors(profile):
+                print(f"    Error ({count}x): {message}")
+    else:
+        print("  (no tool invocations)")
+
+    context = metrics['context']
+    print("\nContext Size:")
+    if context['sizes']:
+        for name, label in CONTEXT_SIZES:
+            data = context['sizes'][name]
+            unit = 'bytes' if name.endswith('_bytes') else 'chars'
+            print(f"  {label}: total {_format_chars(data['total'])} {unit}, max {_format_chars(data['max'])} {unit}")
+        if context['curve']:
+            print(f"  Growth (mean rendered context per session slice): "
+                  f"{' -> '.join(_format_chars(point['context_chars']) for point in context['curve'])}")
+        print(f"  Requests above {_format_chars(context['threshold'])} prompt chars: {context['flagged_count']}")
+        for item in context['flagged']:
+            location = f"{item['file']}; " if 'file' in item else ''
+            ts_display = str(item['timestamp']) if item['timestamp'] is not None else 'unknown-ts'
+            print(f"    [{location}{item['index']}; {ts_display}] {_format_chars(item['prompt_chars'])} chars ({item['model']})")
+    else:
+        print("  (no data)")
+    edit_churn = metrics['edit_churn']
+    print(f"\nEdit Churn (detail slip = same file edited >= {edit_churn['slip_threshold']} times in one request):")
+    if edit_churn['files']:
+        total_edits = sum(churn['edits'] for churn in edit_churn['files'].values())
+        print(f"  Files edited: {len(edit_churn['files'])}, edit groups: {total_edits}, detail slips: {edit_churn['slip_count']}")
+        for path, churn in _churn_hot_spots(edit_churn, 'edits'):
+            print(f"  Hot spot: {path}: {churn['edits']} edits in {churn['requests']} request(s), "
+                  f"max {churn['max_per_request']} in one request, {churn['undone']} undone")
+        for item in edit_churn['slips']:
+            location = f"{item['file']}; " if 'file' in item else ''
+            ts_display = str(item['timestamp']) if item['timestamp'] is not None else 'unknown-ts'
+            print(f"  Slip: [{location}{item['index']}; {ts_display}] {item['path']}: {item['edits']} edits")
+        for path, churn in _churn_hot_spots(edit_churn, 'undone'):
+            print(f"  Undone: {path}: {churn['undone']} undo event(s) after {churn['edits']} edits")
+    else:
+        print("  (no file edits)")
+
     print(f"\nFile Edits: {metrics['file_edits']}")
     print(f"Votes: {metrics['votes']}")
     if metrics['vote_down_reasons']:
@@ -291,7 +2096,8 @@ def analyze_chat(file_path: str) -> int:
         for item in metrics['retro_feedback']:
             ts = item.get('timestamp')
             ts_display = str(ts) if ts is not None else 'unknown-ts'
-            print(f"  - [{item['index']}; {ts_display}] {item['text']}")
+            location = f"{item['file']}; " if 'file' in item else ''
+            print(f"  - [{location}{item['index']}; {ts_display}] {item['text']}")
     else:
         print("  (none detected)")
 
@@ -309,11 +2115,401 @@ def analyze_chat(file_path: str) -> int:
     else:
         print("  (none)")
 
+
+@functools.lru_cache(maxsize=None)
+def _source_digest() -> str:
+    # The collectors, metrics and parsers all live in this file, so its bytes version the cache.
+    return hashlib.sha256(Path(__file__).read_bytes()).hexdigest()
+
+
+class MetricsCache:
+    # On-disk cache of compute_metrics() results, one JSON file per export version.
+    # Entries are keyed either by path+mtime+size ('stat', no read needed) or by content
+    # hash ('hash', survives touch/copy). Least recently used entries are evicted once the
+    # directory grows beyond max_bytes.
+
+    def __init__(self, cache_dir, key_mode: str = 'stat', max_bytes: int = DEFAULT_CACHE_MAX_BYTES, salt: str = ''):
+        self.cache_dir = Path(cache_dir)
+        self.key_mode = key_mode
+        self.max_bytes = max_bytes
+        self.salt = salt
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, file_path: str) -> str:
+        digest = hashlib.sha256(f"{_source_digest()}:{self.key_mode}:{self.salt}:".encode())
+        if self.key_mode == 'hash':
+            with open(file_path, 'rb') as f:
+                for block in iter(lambda: f.read(1 << 20), b''):
+                    digest.update(block)
+        else:
+            stat = os.stat(file_path)
+            digest.update(f"{os.path.abspath(file_path)}\0{stat.st_size}\0{stat.st_mtime_ns}".encode())
+        return digest.hexdigest()
+
+    def get(self, file_path: str):
+        # A missing or unreadable export is a miss; the normal read path reports the error
+        try:
+            entry = self.cache_dir / f"{self._key(file_path)}.json"
+            with open(entry, 'r', encoding='utf-8') as f:
+                metrics = json.load(f)
+            os.utime(entry)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return metrics
+
+    def put(self, file_path: str, metrics: dict) -> None:
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            ignore_file = self.cache_dir / '.gitignore'
+            if not ignore_file.exists():
+                ignore_file.write_text('*\n', encoding='utf-8')
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(metrics, f)
+            os.replace(tmp_path, self.cache_dir / f"{self._key(file_path)}.json")
+        except OSError as e:
+            print(f"Warning: could not write metrics cache for {file_path}: {e}", file=sys.stderr)
+
+    def evict(self) -> None:
+        try:
+            entries = [(entry.stat(), entry) for entry in self.cache_dir.glob('*.json')]
+        except OSError:
+            return
+        total = sum(stat.st_size for stat, _ in entries)
+        for stat, entry in sorted(entries, key=lambda item: item[0].st_mtime):
+            if total <= self.max_bytes:
+                break
+            try:
+                entry.unlink()
+                total -= stat.st_size
+            except OSError:
+                pass
+
+
+def _write_timeline_file(metrics: dict, timeline_path: str, output_format: str) -> bool:
+    try:
+        write_timeline(metrics['timeline'], timeline_path)
+    except OSError as e:
+        _report_error(f"Error writing timeline {timeline_path}: {e}", output_format)
+        return False
+    return True
+
+
+def analyze_chat(file_path: str, options: AnalysisOptions = None, cache: MetricsCache = None, output_format: str = 'text',
+                 timeline_path: str = None) -> int:
+    options = options or AnalysisOptions()
+    # NDJSON emits one record per request while parsing, so it always reads the export.
+    metrics = cache.get(file_path) if cache and output_format != 'ndjson' else None
+    if metrics is None:
+        on_row = None
+        if output_format == 'ndjson':
+            on_row = lambda table, index: _emit_record({'type': 'request', **table.row(index)})
+        try:
+            collectors = default_collectors(options)
+            table, retro_feedback = build_request_table(
+                options.iter_requests(file_path), collectors, on_row=on_row, options=options
+            )
+            metrics = summarize_table(table, retro_feedback, collectors, options)
+        except Exception as e:
+            _report_error(f"Error reading {file_path}: {e}", output_format)
+            return 2
+        if cache:
+            cache.put(file_path, metrics)
+            cache.evict()
+
+    if timeline_path and not _write_timeline_file(metrics, timeline_path, output_format):
+        return 2
+    print_report(metrics, output_format)
     return 0
 
+
+def watch_chat(file_path: str, options: AnalysisOptions = None, output_format: str = 'text',
+               interval: float = DEFAULT_WATCH_INTERVAL, timeline_path: str = None) -> int:
+    # Re-reports whenever the export changes, parsing only requests appended since the
+    # previous poll. Runs until interrupted.
+    on_row = None
+    if output_format == 'ndjson':
+        on_row = lambda table, index: _emit_record({'type': 'request', **table.row(index)})
+    analysis = IncrementalAnalysis(file_path, options, on_row=on_row)
+    last_error = None
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                added = analysis.update()
+                last_error = None
+            except (OSError, ValueError) as e:
+                added = None
+                if str(e) != last_error:
+                    last_error = str(e)
+                    print(f"Error reading {file_path}: {e}", file=sys.stderr)
+            if added is not None:
+                metrics = analysis.metrics()
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                note = ' (full parse)' if analysis.reparsed else ''
+                print(f"[watch] {file_path}: +{added} request(s), {metrics['total_requests']} total, "
+                      f"updated in {elapsed_ms:.1f} ms{note}", file=sys.stderr, flush=True)
+                if timeline_path:
+                    _write_timeline_file(metrics, timeline_path, output_format)
+                print_report(metrics, output_format)
+                sys.stdout.flush()
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        return 0
+
+
+def find_chat_exports(paths: list) -> list:
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for pattern in CHAT_EXPORT_PATTERNS:
+                files.extend(glob.glob(os.path.join(glob.escape(path), '**', pattern), recursive=True))
+        elif glob.has_magic(path):
+            files.extend(glob.glob(path, recursive=True))
+        else:
+            files.append(path)
+    return sorted(set(files))
+
+
+def _analyze_file(file_path: str, options: AnalysisOptions):
+    # Runs in a worker process; exceptions are returned rather than raised so one broken
+    # export does not abort the whole sweep.
+    try:
+        return file_path, compute_metrics(options.iter_requests(file_path), options=options), None
+    except Exception as e:
+        return file_path, None, str(e)
+
+
+def _iter_analyzed(files: list, options: AnalysisOptions, jobs: int):
+    # Yields (file_path, metrics, error) in completion order.
+    if jobs == 1 or len(files) <= 1:
+        for file_path in files:
+            yield _analyze_file(file_path, options)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = [executor.submit(_analyze_file, file_path, options) for file_path in files]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def _iter_streamed(files: list, options: AnalysisOptions):
+    # Like _iter_analyzed(), but emits an NDJSON record for every request as it is parsed.
+    for file_path in files:
+        on_row = lambda table, index: _emit_record({'type': 'request', 'file': file_path, **table.row(index)})
+        try:
+            collectors = default_collectors(options)
+            table, retro_feedback = build_request_table(
+                options.iter_requests(file_path), collectors, on_row=on_row, options=options
+            )
+            yield file_path, summarize_table(table, retro_feedback, collectors, options), None
+        except Exception as e:
+            yield file_path, None, str(e)
+
+
+def analyze_corpus(paths: list, options: AnalysisOptions = None, jobs: int = None, cache: MetricsCache = None,
+                   output_format: str = 'text', timeline_path: str = None) -> int:
+    options = options or AnalysisOptions()
+    files = find_chat_exports(paths)
+    if not files:
+        _report_error(f"No chat exports found in: {', '.join(paths)}", output_format)
+        return 2
+
+    analyzed = {}
+    # NDJSON streams one record per request while parsing, so it reads every export in this
+    # process, one after the other, and neither uses cached metrics nor worker processes.
+    if cache and output_format != 'ndjson':
+        for file_path in files:
+            metrics = cache.get(file_path)
+            if metrics is not None:
+                analyzed[file_path] = metrics
+    pending = [file_path for file_path in files if file_path not in analyzed]
+    results = _iter_streamed(pending, options) if output_format == 'ndjson' else _iter_analyzed(pending, options, jobs)
+
+    failed = 0
+    for file_path, metrics, error in results:
+        if error is not None:
+            _report_error(f"Error reading {file_path}: {error}", output_format)
+            failed += 1
+            continue
+        analyzed[file_path] = metrics
+        if cache:
+            cache.put(file_path, metrics)
+        if output_format == 'ndjson':
+            _emit_record({'type': 'file', 'file': file_path, 'metrics': metrics})
+    if cache:
+        cache.evict()
+
+    per_file = [(file_path, analyzed[file_path]) for file_path in files if file_path in analyzed]
+    merged = merge_metrics(per_file)
+    if timeline_path and not _write_timeline_file(merged, timeline_path, output_format):
+        failed += 1
+    print_report(merged, output_format)
+    return 2 if failed else 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='scripts/analyze-chat.py',
+        description='Extract retrospective metrics from a VS Code chat export.'
+    )
+    parser.add_argument(
+        'chat_files',
+        metavar='path_to_chat.json',
+        nargs='+',
+        help='VS Code chat export (.json); directories and glob patterns produce a merged corpus report'
+    )
+    parser.add_argument(
+        '--stream',
+        action='store_true',
+        help='Parse requests[] one element at a time so memory stays flat for very large exports'
+    )
+    parser.add_argument(
+        '--mmap',
+        action='store_true',
+        help='Scan the memory-mapped export and decode only the fields the metrics read'
+    )
+    parser.add_argument(
+        '--json-backend',
+        choices=('auto', *JSON_BACKENDS),
+        default='auto',
+        help="Decoder for whole exports; 'auto' prefers orjson, then simdjson, then json (default: auto)"
+    )
+    parser.add_argument(
+        '--verbose',
+        action='store_true',
+        help='Report the JSON decoder in use on stderr'
+    )
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=None,
+        help='Worker processes for corpus analysis (default: CPU count)'
+    )
+    parser.add_argument(
+        '--cache-dir',
+        default=str(DEFAULT_CACHE_DIR),
+        help='Directory for cached per-file metrics (default: .tmp/analyze-chat-cache)'
+    )
+    parser.add_argument(
+        '--cache-key',
+        choices=('stat', 'hash'),
+        default='stat',
+        help="Detect changed exports by path+mtime+size ('stat') or by content hash ('hash')"
+    )
+    parser.add_argument(
+        '--cache-max-bytes',
+        type=int,
+        default=DEFAULT_CACHE_MAX_BYTES,
+        help='Evict least recently used cache entries beyond this total size'
+    )
+    parser.add_argument('--no-cache', action='store_true', help='Always re-parse every export')
+    parser.add_argument(
+        '--context-threshold',
+        type=int,
+        default=DEFAULT_CONTEXT_THRESHOLD_CHARS,
+        help='Flag requests whose message + attachments + rendered context exceed this many characters'
+    )
+    parser.add_argument(
+        '--feedback-keyword',
+        dest='feedback_keywords',
+        action='append',
+        metavar='KEYWORD',
+        help='Word that marks a message as retrospective feedback (repeatable; default: retro, retrospective)'
+    )
+    parser.add_argument(
+        '--slip-threshold',
+        type=int,
+        default=DEFAULT_SLIP_THRESHOLD,
+        help=f'Edits to one file within one request that count as a detail slip (default: {DEFAULT_SLIP_THRESHOLD})'
+    )
+    parser.add_argument(
+        '--timeline',
+        metavar='PATH',
+        help='Write the bucketed session timeline to PATH (.csv for CSV, otherwise JSON)'
+    )
+    parser.add_argument(
+        '--timeline-window',
+        type=float,
+        default=DEFAULT_TIMELINE_WINDOW_MS / 60000,
+        metavar='MINUTES',
+        help=f'Timeline window size (default: {DEFAULT_TIMELINE_WINDOW_MS // 60000} minutes)'
+    )
+    parser.add_argument(
+        '--idle-gap',
+        type=float,
+        default=DEFAULT_IDLE_GAP_MS / 60000,
+        metavar='MINUTES',
+        help=f'Report idle stretches at least this long (default: {DEFAULT_IDLE_GAP_MS // 60000} minutes)'
+    )
+    parser.add_argument(
+        '--watch',
+        action='store_true',
+        help='Keep running and re-report whenever the export changes, parsing only newly appended requests'
+    )
+    parser.add_argument(
+        '--watch-interval',
+        type=float,
+        default=DEFAULT_WATCH_INTERVAL,
+        metavar='SECONDS',
+        help=f'Polling interval for --watch (default: {DEFAULT_WATCH_INTERVAL:g}s)'
+    )
+    parser.add_argument(
+        '--format',
+        choices=OUTPUT_FORMATS,
+        default='text',
+        help="Report format; 'ndjson' streams one record per request (for a corpus, each file's "
+             "requests and then a per-file record, parsed in this process without the cache), "
+             "then a summary record"
+    )
+    args = parser.parse_args(argv)
+    if args.watch and (len(args.chat_files) != 1 or not os.path.isfile(args.chat_files[0])):
+        parser.error('--watch needs exactly one chat export file')
+    if args.watch_interval <= 0:
+        parser.error('--watch-interval must be positive')
+    if args.timeline_window <= 0 or args.idle_gap < 0:
+        parser.error('--timeline-window must be positive and --idle-gap non-negative')
+    if args.slip_threshold < 1:
+        parser.error('--slip-threshold must be at least 1')
+    if args.stream and args.mmap:
+        parser.error('--stream and --mmap are mutually exclusive')
+    try:
+        json_backend = resolve_json_backend(args.json_backend)
+    except ValueError as e:
+        parser.error(str(e))
+
+    options = AnalysisOptions(
+        stream=args.stream,
+        scan=args.mmap,
+        json_backend=json_backend,
+        context_threshold=args.context_threshold,
+        feedback_keywords=tuple(args.feedback_keywords or DEFAULT_FEEDBACK_KEYWORDS),
+        timeline_window=max(1, round(args.timeline_window * 60000)),
+        idle_gap=round(args.idle_gap * 60000),
+        slip_threshold=args.slip_threshold,
+    )
+    if args.verbose:
+        # --stream, --mmap and --watch locate values with json's raw_decode().
+        decoder = 'json' if args.stream or args.mmap or args.watch else json_backend
+        print(f"JSON decoder: {decoder}", file=sys.stderr)
+    if args.watch:
+        return watch_chat(args.chat_files[0], options=options, output_format=args.format, interval=args.watch_interval,
+                          timeline_path=args.timeline)
+    cache = None
+    if not args.no_cache:
+        cache = MetricsCache(args.cache_dir, key_mode=args.cache_key, max_bytes=args.cache_max_bytes, salt=options.cache_salt())
+
+    # A single path that is neither a directory nor a glob is one export, even if it is missing,
+    # so a bad path is reported as "Error reading ..." rather than as an empty corpus.
+    single = args.chat_files[0]
+    if len(args.chat_files) == 1 and not os.path.isdir(single) and not glob.has_magic(single):
+        return analyze_chat(args.chat_files[0], options=options, cache=cache, output_format=args.format,
+                            timeline_path=args.timeline)
+    return analyze_corpus(args.chat_files, options=options, jobs=args.jobs, cache=cache, output_format=args.format,
+                          timeline_path=args.timeline)
+
+
 if __name__ == "__main__":
-    if len(sys.argv) < 2:
-        print("Usage: scripts/analyze-chat.py <path_to_chat.json>")
-        sys.exit(2)
-    else:
-        sys.exit(analyze_chat(sys.argv[1]))
+    sys.exit(main())
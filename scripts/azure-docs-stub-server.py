@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Local stub HTTP server for offline tests and benchmarks of update-azure-api-mappings.py --validate
+
+Answers HEAD (and GET) requests for any path with keep-alive HTTP/1.1 responses, so the
+concurrent URL validator can be exercised without network access. Responses can be taken
+from a fixture recorded with `update-azure-api-mappings.py --validate --record FIXTURE`,
+and latency and failures can be simulated.
+
+Usage:
+    python scripts/azure-docs-stub-server.py [--port PORT] [--fixture FIXTURE] [--latency MS] [--jitter MS]
+                                             [--failure-rate RATE] [--reset-rate RATE] [--flaky N]
+                                             [--missing REGEX] [--seed N]
+
+    python scripts/update-azure-api-mappings.py --validate --validate-against http://127.0.0.1:PORT
+
+Behavior per request, in order:
+    1. Wait --latency milliseconds plus up to --jitter milliseconds
+    2. Drop the connection without answering with probability --reset-rate
+    3. Answer 503 for the first --flaky requests to each path, and with probability --failure-rate
+    4. Answer the recorded status for paths in --fixture, 404 for paths matching --missing,
+       and 200 otherwise; 200 responses carry an ETag and honour If-None-Match with a 304
+
+The server prints "Listening on http://127.0.0.1:PORT" once it accepts connections and runs
+until interrupted.
+"""
+
+import argparse
+import hashlib
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+
+class StubBehavior:
+    """Thread-safe response policy shared by all request handlers."""
+
+    def __init__(self, args):
+        self.latency = args.latency / 1000
+        self.jitter = args.jitter / 1000
+        self.failure_rate = args.failure_rate
+        self.reset_rate = args.reset_rate
+        self.flaky = args.flaky
+        self.missing = re.compile(args.missing) if args.missing else None
+        self.fixture = load_fixture(args.fixture) if args.fixture else {}
+        self.requests = 0
+        self._hits = {}
+        self._random = random.Random(args.seed)
+        self._lock = threading.Lock()
+
+    def respond(self, path: str, if_none_match: str):
+        """Return (status, headers) for a request, or None to drop the connection."""
+        with self._lock:
+            self.requests += 1
+            hits = self._hits[path] = self._hits.get(path, 0) + 1
+            delay = self.latency + self._random.random() * self.jitter
+            reset = self._random.random() < self.reset_rate
+            failed = hits <= self.flaky or self._random.random() < self.failure_rate
+        if delay:
+            time.sleep(delay)
+        if reset:
+            return None
+        if failed:
+            return 503, {'Retry-After': '1'}
+
+        entry = self.fixture.get(path)
+        if entry is not None:
+            status = entry['status']
+            headers = {}
+            if entry.get('etag'):
+                headers['ETag'] = entry['etag']
+            if entry.get('lastModified'):
+                headers['Last-Modified'] = entry['lastModified']
+        elif self.missing and self.missing.search(path):
+            return 404, {}
+        else:
+            status = 200
+            headers = {'ETag': '"' + hashlib.sha1(path.encode('utf-8')).hexdigest()[:16] + '"'}
+        if status == 200 and if_none_match and if_none_match == headers.get('ETag'):
+            return 304, headers
+        return status, headers
+
+
+def load_fixture(path: str) -> dict:
+    """Load recorded HEAD responses, keyed by path and query instead of full URL."""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    responses = {}
+    for url, entry in data.get('responses', {}).items():
+        parts = urlsplit(url)
+        responses[(parts.path or '/') + ('?' + parts.query if parts.query else '')] = entry
+    return responses
+
+
+def make_handler(behavior: StubBehavior):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_HEAD(self):
+            self._answer()
+
+        def do_GET(self):
+            self._answer()
+
+        def _answer(self):
+            result = behavior.respond(self.path, self.headers.get('If-None-Match'))
+            if result is None:
+                self.close_connection = True
+                return
+            status, headers = result
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Local stub HTTP server for offline URL validation tests and benchmarks",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=0, help='Port to listen on (default: any free port)')
+    parser.add_argument('--fixture', help='HEAD responses recorded with update-azure-api-mappings.py --record')
+    parser.add_argument('--latency', type=float, default=0, help='Delay before every response, in milliseconds')
+    parser.add_argument('--jitter', type=float, default=0, help='Additional random delay of up to this many milliseconds')
+    parser.add_argument(
+        '--failure-rate',
+        type=float,
+        default=0,
+        help='Fraction of requests answered with 503 Service Unavailable'
+    )
+    parser.add_argument(
+        '--reset-rate',
+        type=float,
+        default=0,
+        help='Fraction of requests whose connection is dropped without a response'
+    )
+    parser.add_argument('--flaky', type=int, default=0, help='Answer the first N requests to each path with 503')
+    parser.add_argument('--missing', help='Answer 404 for paths matching this regular expression')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed for jitter and simulated failures')
+
+    args = parser.parse_args()
+    for name in ('failure_rate', 'reset_rate'):
+        if not 0 <= getattr(args, name) <= 1:
+            parser.error(f"--{name.replace('_', '-')} must be between 0 and 1")
+
+    try:
+        behavior = StubBehavior(args)
+    except (OSError, ValueError, re.error) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(behavior))
+    server.daemon_threads = True
+    host, port = server.server_address[:2]
+    print(f"Listening on http://{host}:{port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"Served {behavior.requests} request(s)", file=sys.stderr)
+
+
+if __name__ == '__main__':
+    main()
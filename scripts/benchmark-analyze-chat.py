@@ -0,0 +1,578 @@
+#!/usr/bin/env python3
+
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:  # not available on Windows; peak RSS is reported as null there
+    resource = None
+
+# Benchmark harness for scripts/analyze-chat.py.
+# Generates synthetic VS Code chat exports (1 MB .. 1 GB by default), then runs analyze_chat()
+# over them and over the real exports in docs/features, each case in a fresh worker process
+# so peak RSS is measured per case. Results are written as JSON so runs can be compared:
+#
+#   scripts/benchmark-analyze-chat.py --sizes 1MB,10MB --output .tmp/before.json
+#   scripts/benchmark-analyze-chat.py --sizes 1MB,10MB --compare .tmp/before.json
+#
+# The real exports also get a microbenchmark of the userRequest text path: <userRequest>
+# extraction plus the retro-feedback keyword match over every message and rendered user
+# message. --text-baseline times the same path of another analyze-chat.py revision:
+#
+#   git show <commit>:scripts/analyze-chat.py > .tmp/analyze-chat-before.py
+#   scripts/benchmark-analyze-chat.py --sizes '' --modes load --text-baseline .tmp/analyze-chat-before.py
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+ANALYZE_CHAT = Path(__file__).resolve().parent / 'analyze-chat.py'
+DEFAULT_WORK_DIR = REPO_ROOT / '.tmp' / 'analyze-chat-bench'
+DEFAULT_REAL_EXPORTS = REPO_ROOT / 'docs' / 'features'
+DEFAULT_SIZES = '1MB,10MB,100MB,1GB'
+PARSE_MODES = ('load', 'stream', 'mmap')
+DEFAULT_MODES = ','.join(PARSE_MODES)
+# Load mode is measured once per JSON backend; 'installed' expands to every backend the
+# running interpreter can import. The other modes always decode with json.
+DEFAULT_JSON_BACKENDS = 'installed'
+DEFAULT_REPEAT = 3
+DEFAULT_SEED = 2026
+# Passes over all texts per timed run of the userRequest text microbenchmark.
+DEFAULT_TEXT_PASSES = 50
+
+# Bump when synthetic_request() changes so cached exports are regenerated.
+GENERATOR_VERSION = 1
+SIZE_UNITS = {'KB': 1 << 10, 'MB': 1 << 20, 'GB': 1 << 30}
+
+MODELS = ('copilot/gpt-5.1-codex-max', 'copilot/claude-sonnet-4.5', 'copilot/gemini-3-flash-preview', 'copilot/gpt-5-mini')
+# Tool mix roughly follows the docs/features exports.
+TOOLS = (
+    ('run_in_terminal', 50), ('copilot_readFile', 22), ('manage_todo_list', 7), ('copilot_findTextInFiles', 5),
+    ('copilot_listDirectory', 5), ('copilot_replaceString', 4), ('copilot_findFiles', 2), ('copilot_createFile', 2),
+    ('copilot_getErrors', 1), ('copilot_applyPatch', 1),
+)
+TERMINAL_ERRORS = (
+    'error: pathspec did not match any files',
+    'fatal: not a git repository (or any of the parent directories): .git',
+    'error CS1002: ; expected',
+    'Test run failed: 1 test(s) failed',
+)
+WORDS = ('plan', 'terraform', 'resource', 'markdown', 'report', 'azure', 'module', 'change', 'attribute', 'value',
+         'snapshot', 'test', 'render', 'table', 'summary', 'diff', 'provider', 'output', 'variable', 'state')
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().upper()
+    for unit, factor in SIZE_UNITS.items():
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * factor)
+    return int(text)
+
+
+def format_size(size: int) -> str:
+    for unit, factor in sorted(SIZE_UNITS.items(), key=lambda item: -item[1]):
+        if size >= factor and size % factor == 0:
+            return f"{size // factor}{unit}"
+    return f"{size}B"
+
+
+def _text(rng: random.Random, length: int) -> str:
+    # Word salad of roughly the given length; cheap to generate and compresses like prose.
+    words = []
+    total = 0
+    while total < length:
+        word = rng.choice(WORDS)
+        words.append(word)
+        total += len(word) + 1
+    return ' '.join(words)
+
+
+def _file_uri(rng: random.Random) -> dict:
+    path = f"/workspace/src/Oocx.TfPlan2Md/{rng.choice(WORDS).title()}/{rng.choice(WORDS).title()}.cs"
+    return {'$mid': 1, 'fsPath': path, 'external': f"file://{path}", 'path': path, 'scheme': 'file'}
+
+
+def _tool_invocation(rng: random.Random, tool_id: str, timestamp: int) -> dict:
+    item = {
+        'kind': 'toolInvocationSerialized',
+        'invocationMessage': f"Using \"{tool_id}\"",
+        'isConfirmed': {'type': 0 if rng.random() < 0.02 else 1},
+        'isComplete': True,
+        'source': {'type': 'internal', 'label': 'Built-In'},
+        'toolCallId': f"call_{rng.getrandbits(64):016x}",
+        'toolId': tool_id,
+    }
+    if tool_id == 'run_in_terminal':
+        failed = rng.random() < 0.15
+        output = rng.choice(TERMINAL_ERRORS) if failed else _text(rng, rng.randint(40, 2000))
+        item['toolSpecificData'] = {
+            'kind': 'terminal',
+            'commandLine': {'original': f"dotnet test --filter {rng.choice(WORDS)}"},
+            'terminalCommandState': {'exitCode': 1 if failed else 0, 'timestamp': timestamp,
+                                     'duration': int(rng.lognormvariate(7.5, 1.2))},
+            'terminalCommandOutput': {'text': output, 'lineCount': output.count('\n') + 1},
+        }
+    elif rng.random() < 0.03:
+        item['resultDetails'] = {'isError': True, 'input': '{}',
+                                 'output': [{'type': 'embed', 'isText': True, 'value': 'File not found'}]}
+    return item
+
+
+def synthetic_request(rng: random.Random, index: int, timestamp: int) -> dict:
+    # One requests[] element with the response kinds, timings and edit events found in real
+    # exports. Payload sizes are log-normal like in docs/features: most requests are tens of KB,
+    # with a long tail dominated by the rendered prompt and tool results.
+    user_request = _text(rng, rng.randint(20, 400))
+    if rng.random() < 0.05:
+        user_request = f"note for retro: {user_request}"
+    elapsed = int(rng.lognormvariate(10.5, 1.0))
+    response = [{'kind': 'mcpServersStarting', 'didStartServerIds': []}]
+    tool_results = {}
+    edits = []
+    for _ in range(rng.randint(1, 25)):
+        roll = rng.random()
+        if roll < 0.45:
+            tool_id = rng.choices([tool for tool, _ in TOOLS], weights=[weight for _, weight in TOOLS])[0]
+            response.append({'kind': 'prepareToolInvocation', 'toolName': tool_id})
+            invocation = _tool_invocation(rng, tool_id, timestamp)
+            response.append(invocation)
+            tool_results[invocation['toolCallId']] = {
+                '$mid': 20, 'content': [{'$mid': 21, 'value': _text(rng, int(rng.lognormvariate(7.5, 1.3)))}]
+            }
+        elif roll < 0.70:
+            response.append({'kind': 'thinking', 'value': _text(rng, rng.randint(0, 800)), 'id': f"{rng.getrandbits(128):032x}"})
+        elif roll < 0.85:
+            response.append({'value': _text(rng, rng.randint(20, 1500)), 'supportThemeIcons': False, 'supportHtml': False})
+        elif roll < 0.92:
+            response.append({'kind': 'inlineReference', 'inlineReference': _file_uri(rng)})
+        else:
+            uri = _file_uri(rng)
+            edits.append(uri)
+            response.append({'kind': 'codeblockUri', 'uri': uri, 'isEdit': True})
+            response.append({
+                'kind': 'textEditGroup',
+                'uri': uri,
+                'edits': [[{'text': _text(rng, rng.randint(20, 600)),
+                            'range': {'startLineNumber': line, 'startColumn': 1, 'endLineNumber': line + 3, 'endColumn': 1}}]
+                          for line in rng.sample(range(1, 400), rng.randint(1, 3))],
+                'done': True,
+            })
+            response.append({'kind': 'undoStop', 'id': f"{rng.getrandbits(64):016x}"})
+    if rng.random() < 0.01:
+        response.append({'kind': 'progressTaskSerialized', 'content': {'value': 'Summarizing conversation history'}})
+
+    request = {
+        'requestId': f"request_{index:08d}",
+        'timestamp': timestamp,
+        'agent': {'id': 'github.copilot.editsAgent', 'name': 'agent'},
+        'modelId': rng.choice(MODELS),
+        'responseId': f"response_{index:08d}",
+        'timeSpentWaiting': int(rng.lognormvariate(8.0, 1.5)),
+        'message': {'text': user_request, 'parts': [{'kind': 'text', 'text': user_request}]},
+        'variableData': {'variables': [
+            {'kind': 'file', 'name': f"file{n}", 'value': _file_uri(rng), 'modelDescription': _text(rng, 200)}
+            for n in range(rng.randint(0, 3))
+        ]},
+        'response': response,
+        'modelState': {'value': 2 if rng.random() < 0.03 else 1},
+        'result': {
+            'timings': {'firstProgress': int(elapsed * rng.uniform(0.02, 0.3)), 'totalElapsed': elapsed},
+            'metadata': {
+                'renderedUserMessage': [{'type': 1, 'text': (
+                    f"<context>\n{_text(rng, int(rng.lognormvariate(10.0, 0.8)))}\n</context>\n"
+                    f"<userRequest>\n{user_request}\n</userRequest>"
+                )}],
+                'toolCallResults': tool_results,
+                'toolCallRounds': [{'response': _text(rng, 100), 'toolCalls': [{'id': call_id} for call_id in tool_results]}],
+            },
+        },
+        'contentReferences': [],
+        'codeCitations': [],
+        'followups': [],
+    }
+    if rng.random() < 0.1:
+        request['vote'] = 0 if rng.random() < 0.4 else 1
+        if request['vote'] == 0:
+            request['voteDownReason'] = rng.choice(('incorrectCode', 'didNotFollowInstructions', 'other'))
+    if edits:
+        # eventKind 1 = kept, 2 = undone, 3 = modified by the user afterwards
+        request['editedFileEvents'] = [{'eventKind': rng.choices((1, 2, 3), weights=(80, 10, 10))[0], 'uri': uri}
+                                       for uri in edits]
+    return request
+
+
+def generate_export(path: Path, target_bytes: int, seed: int) -> int:
+    # Streams requests into path until it reaches target_bytes; returns the request count.
+    rng = random.Random(seed)
+    timestamp = 1767225600000
+    written = 0
+    count = 0
+    tmp_path = path.with_suffix('.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        header = '{\n  "responderUsername": "GitHub Copilot",\n  "initialLocation": "panel",\n  "requests": [\n'
+        f.write(header)
+        written += len(header)
+        while True:
+            request = synthetic_request(rng, count, timestamp)
+            chunk = ('' if count == 0 else ',\n') + json.dumps(request)
+            # Always emit at least one request, then stop before overshooting the target.
+            if count and written + len(chunk) > target_bytes:
+                break
+            f.write(chunk)
+            written += len(chunk)
+            count += 1
+            timestamp += request['result']['timings']['totalElapsed'] + request['timeSpentWaiting']
+        f.write('\n  ]\n}\n')
+    os.replace(tmp_path, path)
+    return count
+
+
+def ensure_synthetic_export(work_dir: Path, target_bytes: int, seed: int) -> tuple:
+    # Reuses a previously generated export with the same size, seed and generator version.
+    work_dir.mkdir(parents=True, exist_ok=True)
+    ignore_file = work_dir / '.gitignore'
+    if not ignore_file.exists():
+        ignore_file.write_text('*\n', encoding='utf-8')
+    stem = f"synthetic-{format_size(target_bytes)}-s{seed}-g{GENERATOR_VERSION}"
+    path = work_dir / f"{stem}.chat.json"
+    manifest = work_dir / f"{stem}.manifest.json"
+    try:
+        meta = json.loads(manifest.read_text(encoding='utf-8'))
+        if path.stat().st_size == meta['bytes']:
+            return path, meta['requests']
+    except (OSError, ValueError, KeyError):
+        pass
+    started = time.perf_counter()
+    count = generate_export(path, target_bytes, seed)
+    print(f"Generated {path.name}: {count} requests in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    manifest.write_text(json.dumps({'bytes': path.stat().st_size, 'requests': count}), encoding='utf-8')
+    return path, count
+
+
+def load_analyze_chat(path: Path = ANALYZE_CHAT):
+    spec = importlib.util.spec_from_file_location('analyze_chat', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _peak_rss_bytes():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def run_worker(paths: list, mode: str, json_backend: str) -> int:
+    # Runs inside the per-case subprocess: analyze every path once, report timing as JSON.
+    analyze_chat = load_analyze_chat()
+    options = analyze_chat.AnalysisOptions(stream=mode == 'stream', scan=mode == 'mmap', json_backend=json_backend)
+    started = time.perf_counter()
+    failures = 0
+    with open(os.devnull, 'w', encoding='utf-8') as devnull, contextlib.redirect_stdout(devnull):
+        for path in paths:
+            failures += analyze_chat.analyze_chat(path, options, cache=None, output_format='json') != 0
+    wall = time.perf_counter() - started
+    json.dump({'wall_seconds': wall, 'peak_rss_bytes': _peak_rss_bytes(), 'failures': failures}, sys.stdout)
+    return 0
+
+
+def measure(paths: list, mode: str, json_backend: str) -> dict:
+    command = [sys.executable, str(Path(__file__).resolve()), '--worker', '--mode', mode, '--json-backend', json_backend]
+    completed = subprocess.run(command + [str(path) for path in paths], capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"benchmark worker failed: {completed.stderr.strip()}")
+    return json.loads(completed.stdout)
+
+
+def case_variants(modes: list, json_backends: list) -> list:
+    # (mode, backend) pairs to measure; only load mode decodes through the JSON backend.
+    return [(mode, backend) for mode in modes for backend in (json_backends if mode == 'load' else ['json'])]
+
+
+def run_case(name: str, kind: str, paths: list, size: int, requests: int, mode: str, json_backend: str,
+             repeat: int) -> dict:
+    runs = [measure(paths, mode, json_backend) for _ in range(repeat)]
+    walls = [run['wall_seconds'] for run in runs]
+    best = min(walls)
+    rss = [run['peak_rss_bytes'] for run in runs if run['peak_rss_bytes'] is not None]
+    # Stdlib cases keep their plain names so results stay comparable with older runs.
+    variant = mode if json_backend == 'json' else f"{mode}-{json_backend}"
+    return {
+        'name': f"{name}/{variant}",
+        'kind': kind,
+        'mode': mode,
+        'json_backend': json_backend,
+        'files': len(paths),
+        'bytes': size,
+        'requests': requests,
+        'runs': walls,
+        'wall_seconds_best': best,
+        'wall_seconds_median': statistics.median(walls),
+        'peak_rss_bytes': max(rss) if rss else None,
+        'requests_per_second': requests / best if best else None,
+        'megabytes_per_second': size / (1 << 20) / best if best else None,
+        'failures': max(run['failures'] for run in runs),
+    }
+
+
+def user_request_texts(analyze_chat, paths: list) -> list:
+    # The texts the userRequest path sees: each message.text, plus the rendered user messages,
+    # which carry the same tags inside up to hundreds of KB of context.
+    texts = []
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            requests = json.load(f).get('requests', [])
+        for req in requests:
+            texts.append(analyze_chat._get_message_text(req))
+            result = req.get('result')
+            metadata = result.get('metadata') if isinstance(result, dict) else None
+            rendered = metadata.get('renderedUserMessage') if isinstance(metadata, dict) else None
+            if isinstance(rendered, list):
+                texts.extend(part['text'] for part in rendered if isinstance(part, dict) and isinstance(part.get('text'), str))
+    return texts
+
+
+def run_text_case(name: str, analyze_chat, texts: list, files: int, passes: int, repeat: int) -> dict:
+    # Times _extract_user_request() plus _is_retro_feedback() in this process; wall times are
+    # per pass over all texts, and texts are reported in the requests column.
+    extract = analyze_chat._extract_user_request
+    is_retro_feedback = analyze_chat._is_retro_feedback
+    walls = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(passes):
+            for text in texts:
+                is_retro_feedback(extract(text))
+        walls.append((time.perf_counter() - started) / passes)
+    best = min(walls)
+    size = sum(len(text.encode('utf-8', 'surrogatepass')) for text in texts)
+    return {
+        'name': name,
+        'kind': 'text',
+        'mode': 'text',
+        'json_backend': None,
+        'files': files,
+        'bytes': size,
+        'requests': len(texts),
+        'passes': passes,
+        'runs': walls,
+        'wall_seconds_best': best,
+        'wall_seconds_median': statistics.median(walls),
+        'peak_rss_bytes': None,
+        'requests_per_second': len(texts) / best if best else None,
+        'megabytes_per_second': size / (1 << 20) / best if best else None,
+        'failures': 0,
+    }
+
+
+def _count_requests(path) -> int:
+    with open(path, 'r', encoding='utf-8') as f:
+        return len(json.load(f).get('requests', []))
+
+
+def _git_commit():
+    try:
+        completed = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True, text=True)
+    except OSError:
+        return None
+    return completed.stdout.strip() or None
+
+
+def _format_seconds(value: float) -> str:
+    # Microbenchmark passes take well under a second, so they are shown in milliseconds.
+    return f"{value:.3f}s" if value >= 0.1 else f"{value * 1000:.3f}ms"
+
+
+def _format_rss(value) -> str:
+    return f"{value / (1 << 20):.0f} MB" if value is not None else 'n/a'
+
+
+def print_results(results: dict, baseline: dict = None) -> None:
+    previous = {case['name']: case for case in (baseline or {}).get('cases', [])}
+    header = f"{'Case':<40} {'Size':>9} {'Requests':>9} {'Best':>9} {'Median':>9} {'Req/s':>10} {'Peak RSS':>10}"
+    if baseline:
+        header += f" {'vs base':>9}"
+    print(header)
+    print('-' * len(header))
+    for case in results['cases']:
+        line = (f"{case['name']:<40} {case['bytes'] / (1 << 20):>7.1f}MB {case['requests']:>9} "
+                f"{_format_seconds(case['wall_seconds_best']):>9} {_format_seconds(case['wall_seconds_median']):>9} "
+                f"{case['requests_per_second'] or 0:>10.1f} {_format_rss(case['peak_rss_bytes']):>10}")
+        base = previous.get(case['name'])
+        if baseline:
+            if base and base['wall_seconds_best']:
+                change = (case['wall_seconds_best'] - base['wall_seconds_best']) / base['wall_seconds_best'] * 100
+                line += f" {change:>+8.1f}%"
+            else:
+                line += f" {'new':>9}"
+        print(line)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='scripts/benchmark-analyze-chat.py',
+        description='Measure wall time, peak RSS and requests/sec of analyze-chat.py on synthetic and real exports.'
+    )
+    parser.add_argument(
+        '--sizes',
+        default=DEFAULT_SIZES,
+        help=f"Comma-separated synthetic export sizes, e.g. 1MB,10MB (default: {DEFAULT_SIZES}; empty to skip)"
+    )
+    parser.add_argument(
+        '--modes',
+        default=DEFAULT_MODES,
+        help=f"Comma-separated parse modes to measure: {', '.join(PARSE_MODES)} (default: {DEFAULT_MODES})"
+    )
+    parser.add_argument(
+        '--json-backends',
+        default=DEFAULT_JSON_BACKENDS,
+        help="Comma-separated JSON backends for load mode, e.g. json,orjson (default: every installed backend)"
+    )
+    parser.add_argument(
+        '--repeat',
+        type=int,
+        default=DEFAULT_REPEAT,
+        help=f"Runs per case; best and median wall time are reported (default: {DEFAULT_REPEAT})"
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=DEFAULT_SEED,
+        help='Seed for the synthetic export generator'
+    )
+    parser.add_argument(
+        '--real',
+        default=str(DEFAULT_REAL_EXPORTS),
+        help='Real chat exports (directory, glob or file) to benchmark as one corpus (default: docs/features; empty to skip)'
+    )
+    parser.add_argument(
+        '--text-passes',
+        type=int,
+        default=DEFAULT_TEXT_PASSES,
+        help=f"Passes per run of the userRequest text microbenchmark on the real exports (default: {DEFAULT_TEXT_PASSES}; 0 to skip)"
+    )
+    parser.add_argument(
+        '--text-baseline',
+        default=None,
+        help='Another analyze-chat.py (e.g. an older revision) whose userRequest text path is timed as well'
+    )
+    parser.add_argument(
+        '--work-dir',
+        default=str(DEFAULT_WORK_DIR),
+        help='Directory for generated exports and results (default: .tmp/analyze-chat-bench)'
+    )
+    parser.add_argument(
+        '--output',
+        default=None,
+        help='Results JSON file (default: <work-dir>/results.json)'
+    )
+    parser.add_argument(
+        '--compare',
+        default=None,
+        help='Previous results JSON file to compare wall times against'
+    )
+    parser.add_argument('--worker', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--mode', choices=PARSE_MODES, default='load', help=argparse.SUPPRESS)
+    parser.add_argument('--json-backend', default='json', help=argparse.SUPPRESS)
+    parser.add_argument('paths', nargs='*', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        return run_worker(args.paths, args.mode, args.json_backend)
+
+    modes = [mode.strip() for mode in args.modes.split(',') if mode.strip()]
+    unknown = set(modes) - set(PARSE_MODES)
+    if unknown or not modes:
+        parser.error(f"--modes must list some of {', '.join(PARSE_MODES)}, got: {args.modes}")
+    if args.repeat < 1:
+        parser.error('--repeat must be at least 1')
+    if args.text_passes < 0:
+        parser.error('--text-passes must not be negative')
+    installed = [name for name, loads in load_analyze_chat().JSON_BACKENDS.items() if loads]
+    if args.json_backends == 'installed':
+        json_backends = installed
+    else:
+        json_backends = [name.strip() for name in args.json_backends.split(',') if name.strip()]
+        missing = set(json_backends) - set(installed)
+        if missing or not json_backends:
+            parser.error(f"--json-backends must list some of {', '.join(installed)}, got: {args.json_backends}")
+    variants = case_variants(modes, json_backends)
+    try:
+        sizes = [parse_size(size) for size in args.sizes.split(',') if size.strip()]
+    except ValueError:
+        parser.error(f"invalid --sizes value: {args.sizes}")
+
+    baseline = None
+    if args.compare:
+        try:
+            with open(args.compare, 'r', encoding='utf-8') as f:
+                baseline = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error reading {args.compare}: {e}", file=sys.stderr)
+            return 2
+
+    work_dir = Path(args.work_dir)
+    cases = []
+    for size in sizes:
+        path, requests = ensure_synthetic_export(work_dir, size, args.seed)
+        for mode, backend in variants:
+            cases.append(run_case(f"synthetic-{format_size(size)}", 'synthetic', [path], path.stat().st_size,
+                                  requests, mode, backend, args.repeat))
+
+    if args.real:
+        files = load_analyze_chat().find_chat_exports([args.real])
+        if files:
+            size = sum(os.path.getsize(path) for path in files)
+            requests = sum(_count_requests(path) for path in files)
+            for mode, backend in variants:
+                cases.append(run_case('real-exports', 'real', files, size, requests, mode, backend, args.repeat))
+            if args.text_passes:
+                analyze_chat = load_analyze_chat()
+                texts = user_request_texts(analyze_chat, files)
+                cases.append(run_text_case('real-exports/user-request-text', analyze_chat, texts, len(files),
+                                           args.text_passes, args.repeat))
+                if args.text_baseline:
+                    try:
+                        baseline_module = load_analyze_chat(Path(args.text_baseline))
+                    except (OSError, SyntaxError) as e:
+                        print(f"Error loading {args.text_baseline}: {e}", file=sys.stderr)
+                        return 2
+                    cases.append(run_text_case('real-exports/user-request-text-baseline', baseline_module, texts,
+                                               len(files), args.text_passes, args.repeat))
+        else:
+            print(f"Warning: no chat exports found in {args.real}", file=sys.stderr)
+
+    results = {
+        'generated_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'generator_version': GENERATOR_VERSION,
+        'seed': args.seed,
+        'json_backends_installed': installed,
+        'cases': cases,
+    }
+    output = Path(args.output) if args.output else work_dir / 'results.json'
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+        f.write('\n')
+
+    print_results(results, baseline)
+    print(f"\nResults written to {output}")
+    return 2 if any(case['failures'] for case in cases) else 0
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,443 @@
+#!/usr/bin/env python3
+
+import argparse
+import calendar
+import csv
+import hashlib
+import importlib.util
+import json
+import os
+import re
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+# Chat Analytics Store
+# Loads VS Code chat exports into a local SQLite database so cross-session questions
+# ("failure rate of run_in_terminal per model over the last month") are answered by an
+# indexed query instead of re-running analyze-chat.py over every export:
+#
+#   scripts/chat-store.py ingest docs/features
+#   scripts/chat-store.py query tool-failures --since 30d
+#
+# Ingest is idempotent and incremental per file: unchanged exports are skipped, changed
+# ones are replaced in a single transaction, and rows of exports deleted from disk are
+# pruned. Parsing is shared with analyze-chat.py.
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+ANALYZE_CHAT = Path(__file__).resolve().parent / 'analyze-chat.py'
+DEFAULT_DB = REPO_ROOT / '.tmp' / 'chat-store' / 'chat-analytics.sqlite'
+DEFAULT_LIMIT = 20
+OUTPUT_FORMATS = ('text', 'json', 'csv')
+
+# The database is a derived cache of the exports; a schema change simply rebuilds it.
+SCHEMA_VERSION = 2
+SCHEMA = '''
+CREATE TABLE files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    sha256 TEXT NOT NULL,
+    requests INTEGER NOT NULL,
+    ingested_at INTEGER NOT NULL
+);
+CREATE TABLE requests (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    idx INTEGER NOT NULL,
+    request_id TEXT,
+    timestamp INTEGER,
+    model TEXT NOT NULL,
+    elapsed INTEGER,
+    first_progress INTEGER,
+    wait INTEGER,
+    vote INTEGER,
+    vote_down_reason TEXT,
+    model_state INTEGER,
+    rejection TEXT,
+    tool_calls INTEGER NOT NULL,
+    edits INTEGER NOT NULL,
+    message_chars INTEGER,
+    attachment_chars INTEGER,
+    context_chars INTEGER,
+    response_bytes INTEGER,
+    PRIMARY KEY (file_id, idx)
+) WITHOUT ROWID;
+CREATE TABLE tool_calls (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    request_idx INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    tool_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    duration INTEGER,
+    error TEXT,
+    PRIMARY KEY (file_id, request_idx, seq)
+) WITHOUT ROWID;
+CREATE TABLE edits (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    request_idx INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    edits INTEGER NOT NULL,
+    PRIMARY KEY (file_id, request_idx, path)
+) WITHOUT ROWID;
+CREATE TABLE file_events (
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    request_idx INTEGER NOT NULL,
+    seq INTEGER NOT NULL,
+    event_kind INTEGER,
+    path TEXT NOT NULL,
+    PRIMARY KEY (file_id, request_idx, seq)
+) WITHOUT ROWID;
+CREATE INDEX requests_timestamp ON requests(timestamp);
+CREATE INDEX requests_model ON requests(model, timestamp);
+CREATE INDEX tool_calls_tool ON tool_calls(tool_id, status);
+CREATE INDEX edits_path ON edits(path);
+CREATE INDEX file_events_path ON file_events(path, event_kind);
+'''
+
+# Canned reports. Each query filters requests aliased as r through {where}; tables joined to
+# requests use (file_id, request_idx). Undo events arrive with the request after the one whose
+# edits they revert, so churn attributes them to request_idx - 1.
+REPORTS = {
+    'tool-failures': (
+        'Tool failure and rejection rate per tool and model',
+        '''SELECT t.tool_id AS tool, r.model AS model, COUNT(*) AS calls,
+                  SUM(t.status = 'failed') AS failed, SUM(t.status = 'rejected') AS rejected,
+                  ROUND(100.0 * SUM(t.status = 'failed') / COUNT(*), 1) AS failure_rate
+           FROM tool_calls t JOIN requests r ON r.file_id = t.file_id AND r.idx = t.request_idx
+           WHERE {where}
+           GROUP BY t.tool_id, r.model
+           ORDER BY failed DESC, calls DESC, tool, model
+           LIMIT :limit''',
+    ),
+    'tool-errors': (
+        'Most frequent tool error messages',
+        '''SELECT t.tool_id AS tool, t.error AS error, COUNT(*) AS occurrences, COUNT(DISTINCT t.file_id) AS files
+           FROM tool_calls t JOIN requests r ON r.file_id = t.file_id AND r.idx = t.request_idx
+           WHERE {where} AND t.status = 'failed'
+           GROUP BY t.tool_id, t.error
+           ORDER BY occurrences DESC, tool, error
+           LIMIT :limit''',
+    ),
+    'tool-latency': (
+        'Terminal tool durations per tool',
+        '''SELECT t.tool_id AS tool, COUNT(t.duration) AS timed,
+                  ROUND(AVG(t.duration) / 1000.0, 2) AS avg_s, ROUND(MAX(t.duration) / 1000.0, 2) AS max_s,
+                  ROUND(SUM(t.duration) / 1000.0, 2) AS total_s
+           FROM tool_calls t JOIN requests r ON r.file_id = t.file_id AND r.idx = t.request_idx
+           WHERE {where} AND t.duration IS NOT NULL
+           GROUP BY t.tool_id
+           ORDER BY total_s DESC, tool
+           LIMIT :limit''',
+    ),
+    'models': (
+        'Requests, work time and outcomes per model',
+        '''SELECT r.model AS model, COUNT(*) AS requests, COUNT(DISTINCT r.file_id) AS files,
+                  ROUND(SUM(r.elapsed) / 1000.0, 2) AS work_s, ROUND(AVG(r.elapsed) / 1000.0, 2) AS avg_s,
+                  SUM(r.rejection IS 'cancelled') AS cancelled, SUM(r.rejection IS 'failed') AS failed,
+                  SUM(r.tool_calls) AS tool_calls
+           FROM requests r
+           WHERE {where}
+           GROUP BY r.model
+           ORDER BY requests DESC, model
+           LIMIT :limit''',
+    ),
+    'votes': (
+        'Up/down votes and vote-down reasons per model',
+        '''SELECT r.model AS model, SUM(r.vote = 1) AS up, SUM(r.vote = 0) AS down,
+                  GROUP_CONCAT(DISTINCT r.vote_down_reason) AS reasons
+           FROM requests r
+           WHERE {where} AND r.vote IS NOT NULL
+           GROUP BY r.model
+           ORDER BY down DESC, up DESC, model
+           LIMIT :limit''',
+    ),
+    'churn': (
+        'Most edited files, detail slips and undo events',
+        '''SELECT e.path AS path, SUM(e.edits) AS edits, COUNT(*) AS requests, MAX(e.edits) AS max_per_request,
+                  SUM(e.edits >= :slip_threshold) AS slips,
+                  (SELECT COUNT(*)
+                   FROM file_events v LEFT JOIN requests r ON r.file_id = v.file_id AND r.idx = v.request_idx - 1
+                   WHERE {where} AND v.path = e.path AND v.event_kind = 2) AS undone
+           FROM edits e JOIN requests r ON r.file_id = e.file_id AND r.idx = e.request_idx
+           WHERE {where}
+           GROUP BY e.path
+           ORDER BY edits DESC, path
+           LIMIT :limit''',
+    ),
+    'files': (
+        'Ingested exports',
+        '''SELECT f.path AS path, f.requests AS requests, MIN(r.timestamp) AS first_timestamp,
+                  MAX(r.timestamp) AS last_timestamp
+           FROM files f LEFT JOIN requests r ON r.file_id = f.id AND {where}
+           GROUP BY f.id
+           ORDER BY f.path
+           LIMIT :limit''',
+    ),
+}
+
+
+# Reports that join tool_calls as t and therefore accept --tool.
+TOOL_REPORTS = ('tool-failures', 'tool-errors', 'tool-latency')
+
+
+def load_analyze_chat():
+    spec = importlib.util.spec_from_file_location('analyze_chat', ANALYZE_CHAT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+analyze_chat = load_analyze_chat()
+
+
+class StoreCollector(analyze_chat.ResponseCollector):
+    # Buffers the tool calls, per-file edit counts and file events of the current request;
+    # ingest_file() flushes them into the database as each request row lands.
+
+    def __init__(self):
+        self.request_id = None
+        self.tool_calls = []
+        self.edits = {}
+        self.file_events = []
+
+    def start_request(self, index: int, req: dict, agent: str) -> None:
+        self.request_id = req.get('requestId') if isinstance(req.get('requestId'), str) else None
+        self.tool_calls = []
+        self.edits = {}
+        self.file_events = []
+        for evt in req.get('editedFileEvents', []) or []:
+            if isinstance(evt, dict):
+                path = analyze_chat.uri_path(evt.get('uri'))
+                if path:
+                    event_kind = evt.get('eventKind')
+                    self.file_events.append((event_kind if isinstance(event_kind, int) else None, path))
+
+    def add_item(self, resp: dict, kind, text) -> None:
+        if kind == 'toolInvocationSerialized':
+            status, duration, message = analyze_chat.tool_outcome(resp)
+            tool_id = resp.get('toolId', 'unknown-tool')
+            self.tool_calls.append((tool_id, status, int(duration) if duration is not None else None, message))
+        elif kind == 'textEditGroup':
+            path = analyze_chat.uri_path(resp.get('uri'))
+            if path:
+                self.edits[path] = self.edits.get(path, 0) + 1
+
+
+def connect(db_path) -> sqlite3.Connection:
+    db_path = Path(db_path)
+    if not db_path.parent.exists():
+        db_path.parent.mkdir(parents=True)
+        (db_path.parent / '.gitignore').write_text('*\n', encoding='utf-8')
+    conn = sqlite3.connect(db_path)
+    conn.execute('PRAGMA foreign_keys = ON')
+    conn.execute('PRAGMA journal_mode = WAL')
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    if version != SCHEMA_VERSION:
+        with conn:
+            for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall():
+                conn.execute(f'DROP TABLE IF EXISTS "{name}"')
+            conn.executescript(SCHEMA)
+            conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+    return conn
+
+
+def _sha256(file_path: str) -> str:
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def ingest_file(conn: sqlite3.Connection, file_path: str, stream: bool = False, force: bool = False) -> str:
+    # Returns 'unchanged', 'touched' (same content, new mtime) or 'ingested'.
+    path = os.path.abspath(file_path)
+    stat = os.stat(path)
+    known = conn.execute('SELECT id, size, mtime_ns, sha256 FROM files WHERE path = ?', (path,)).fetchone()
+    if known and not force and (known[1], known[2]) == (stat.st_size, stat.st_mtime_ns):
+        return 'unchanged'
+    sha256 = _sha256(path)
+    if known and not force and known[3] == sha256:
+        with conn:
+            conn.execute('UPDATE files SET size = ?, mtime_ns = ? WHERE id = ?', (stat.st_size, stat.st_mtime_ns, known[0]))
+        return 'touched'
+
+    store = StoreCollector()
+    collectors = [analyze_chat.ContextSizeCollector(), store]
+    with conn:
+        conn.execute('DELETE FROM files WHERE path = ?', (path,))
+        file_id = conn.execute(
+            'INSERT INTO files (path, size, mtime_ns, sha256, requests, ingested_at) VALUES (?, ?, ?, ?, 0, ?)',
+            (path, stat.st_size, stat.st_mtime_ns, sha256, int(time.time() * 1000))
+        ).lastrowid
+
+        def on_row(table, index):
+            row = table.row(index)
+            conn.execute(
+                'INSERT INTO requests VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (file_id, index, store.request_id, row['timestamp'], row['model'], row['elapsed'],
+                 row['first_progress'], row['wait'], row['vote'], row['vote_down_reason'], row['model_state'],
+                 row['rejection'], row['tool_calls'], row['edits'], row['message_chars'], row['attachment_chars'],
+                 row['context_chars'], row['response_bytes'])
+            )
+            conn.executemany('INSERT INTO tool_calls VALUES (?, ?, ?, ?, ?, ?, ?)',
+                             [(file_id, index, seq, *call) for seq, call in enumerate(store.tool_calls)])
+            conn.executemany('INSERT INTO edits VALUES (?, ?, ?, ?)',
+                             [(file_id, index, edited, count) for edited, count in store.edits.items()])
+            conn.executemany('INSERT INTO file_events VALUES (?, ?, ?, ?, ?)',
+                             [(file_id, index, seq, *event) for seq, event in enumerate(store.file_events)])
+
+        table, _ = analyze_chat.build_request_table(
+            analyze_chat.iter_requests(path, stream=stream), collectors, on_row=on_row
+        )
+        conn.execute('UPDATE files SET requests = ? WHERE id = ?', (len(table), file_id))
+    return 'ingested'
+
+
+def prune_missing(conn: sqlite3.Connection) -> int:
+    # Drops exports that were deleted from disk; their requests and events cascade.
+    missing = [(file_id,) for file_id, path in conn.execute('SELECT id, path FROM files') if not os.path.exists(path)]
+    with conn:
+        conn.executemany('DELETE FROM files WHERE id = ?', missing)
+    return len(missing)
+
+
+def parse_since(value: str) -> int:
+    # '30d', '12h' or an ISO date (YYYY-MM-DD, UTC) -> epoch milliseconds.
+    match = re.fullmatch(r'(\d+)([dh])', value.strip())
+    if match:
+        hours = int(match.group(1)) * (24 if match.group(2) == 'd' else 1)
+        return int((time.time() - hours * 3600) * 1000)
+    return calendar.timegm(time.strptime(value.strip(), '%Y-%m-%d')) * 1000
+
+
+def run_report(conn: sqlite3.Connection, report: str, since: int = None, model: str = None, tool: str = None,
+               limit: int = DEFAULT_LIMIT, slip_threshold: int = analyze_chat.DEFAULT_SLIP_THRESHOLD) -> tuple:
+    # Returns (column names, rows).
+    conditions = ['1 = 1']
+    if since is not None:
+        conditions.append('r.timestamp >= :since')
+    if model:
+        conditions.append('r.model = :model')
+    if tool:
+        conditions.append('t.tool_id = :tool')
+    sql = REPORTS[report][1].format(where=' AND '.join(conditions))
+    params = {'since': since, 'model': model, 'tool': tool, 'limit': limit, 'slip_threshold': slip_threshold}
+    cursor = conn.execute(sql, params)
+    return [column[0] for column in cursor.description], cursor.fetchall()
+
+
+def print_rows(columns: list, rows: list, output_format: str) -> None:
+    if output_format == 'json':
+        print(json.dumps([dict(zip(columns, row)) for row in rows], indent=2))
+    elif output_format == 'csv':
+        writer = csv.writer(sys.stdout, lineterminator='\n')
+        writer.writerow(columns)
+        writer.writerows(rows)
+    else:
+        cells = [[str(value) if value is not None else '-' for value in row] for row in rows]
+        widths = [max([len(column)] + [len(row[i]) for row in cells]) for i, column in enumerate(columns)]
+        print('  '.join(column.ljust(width) for column, width in zip(columns, widths)).rstrip())
+        print('  '.join('-' * width for width in widths))
+        for row in cells:
+            print('  '.join(cell.ljust(width) for cell, width in zip(row, widths)).rstrip())
+        if not rows:
+            print('(no rows)')
+
+
+def cmd_ingest(args) -> int:
+    files = analyze_chat.find_chat_exports(args.paths)
+    if not files:
+        print(f"No chat exports found in: {', '.join(args.paths)}", file=sys.stderr)
+        return 2
+    conn = connect(args.db)
+    counts = {'ingested': 0, 'touched': 0, 'unchanged': 0}
+    failed = 0
+    started = time.perf_counter()
+    for file_path in files:
+        try:
+            counts[ingest_file(conn, file_path, stream=args.stream, force=args.force)] += 1
+        except Exception as e:
+            # The file's transaction is rolled back; one malformed export must not abort the batch.
+            print(f"Error ingesting {file_path}: {type(e).__name__}: {e}", file=sys.stderr)
+            failed += 1
+    pruned = prune_missing(conn)
+    requests = conn.execute('SELECT COUNT(*) FROM requests').fetchone()[0]
+    conn.close()
+    print(f"Ingested {counts['ingested']} file(s), {counts['unchanged'] + counts['touched']} unchanged, "
+          f"{failed} failed, {pruned} pruned in {time.perf_counter() - started:.2f}s; {requests} requests in {args.db}")
+    return 2 if failed else 0
+
+
+def cmd_query(args) -> int:
+    if not Path(args.db).exists():
+        print(f"No database at {args.db}; run 'ingest' first", file=sys.stderr)
+        return 2
+    try:
+        since = parse_since(args.since) if args.since else None
+    except ValueError:
+        print(f"Invalid --since value: {args.since} (use e.g. 30d, 12h or 2026-01-31)", file=sys.stderr)
+        return 2
+    if args.tool and args.report not in TOOL_REPORTS:
+        print(f"--tool only applies to: {', '.join(TOOL_REPORTS)}", file=sys.stderr)
+        return 2
+    if args.slip_threshold < 1:
+        print('--slip-threshold must be at least 1', file=sys.stderr)
+        return 2
+    conn = connect(args.db)
+    started = time.perf_counter()
+    columns, rows = run_report(conn, args.report, since=since, model=args.model, tool=args.tool, limit=args.limit,
+                               slip_threshold=args.slip_threshold)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    conn.close()
+    print_rows(columns, rows, args.format)
+    if args.format == 'text':
+        print(f"\n{len(rows)} row(s) in {elapsed_ms:.1f} ms")
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog='scripts/chat-store.py',
+        description='Load VS Code chat exports into SQLite and run cross-session reports.'
+    )
+    parser.add_argument(
+        '--db',
+        default=str(DEFAULT_DB),
+        help='SQLite database path (default: .tmp/chat-store/chat-analytics.sqlite)'
+    )
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    ingest = subparsers.add_parser('ingest', help='Load or refresh exports; unchanged files are skipped')
+    ingest.add_argument('paths', nargs='+', help='Chat exports, directories or glob patterns')
+    ingest.add_argument('--stream', action='store_true', help='Parse requests[] incrementally to bound memory')
+    ingest.add_argument('--force', action='store_true', help='Re-ingest files even if unchanged')
+    ingest.set_defaults(handler=cmd_ingest)
+
+    query = subparsers.add_parser(
+        'query',
+        help='Run a canned report',
+        description='Reports: ' + '; '.join(f"{name}: {description}" for name, (description, _) in REPORTS.items())
+    )
+    query.add_argument('report', choices=sorted(REPORTS), help='Report to run')
+    query.add_argument('--since', help='Only requests after this point: 30d, 12h or YYYY-MM-DD (UTC)')
+    query.add_argument('--model', help='Only requests answered by this model')
+    query.add_argument('--tool', help='Only this tool (tool reports)')
+    query.add_argument('--limit', type=int, default=DEFAULT_LIMIT, help=f'Maximum rows (default: {DEFAULT_LIMIT})')
+    query.add_argument(
+        '--slip-threshold',
+        type=int,
+        default=analyze_chat.DEFAULT_SLIP_THRESHOLD,
+        help=f'Edits to one file within one request that count as a detail slip (default: {analyze_chat.DEFAULT_SLIP_THRESHOLD})'
+    )
+    query.add_argument('--format', choices=OUTPUT_FORMATS, default='text', help='Output format')
+    query.set_defaults(handler=cmd_query)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
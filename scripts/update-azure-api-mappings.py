@@ -9,75 +9,212 @@ The script scrapes the Azure SDK Specs Inventory page to discover all Azure reso
 and their corresponding documentation links.
 
 Usage:
-    python scripts/update-azure-api-mappings.py [--output OUTPUT_FILE] [--validate]
+    python scripts/update-azure-api-mappings.py [--output OUTPUT_FILE] [--incremental] [--compact-output PATH] [--discover] [--validate] [--workers N] [--retries N]
 
 Options:
     --output OUTPUT_FILE    Output JSON file path (default: src/Oocx.TfPlan2Md/Providers/AzApi/Data/AzureApiDocumentationMappings.json)
-    --validate             Validate URLs by making HTTP HEAD requests (slow, not recommended)
+    --incremental          Diff against the existing output, print a JSON diff to stdout, and rewrite only on changes
+    --compact-output PATH  Also write the compact, pre-sorted binary artifact (URL prefix table + resource type trie)
+    --discover             Scrape the Specs Inventory (and its paginated/per-service pages) and merge with the curated list
+    --inventory-url URL    Specs Inventory page to start discovery from (http(s):// or file://)
+    --max-pages N          Maximum number of inventory pages to fetch during discovery (default: 200)
+    --validate             Validate URLs by making HTTP HEAD requests in parallel
+    --workers N            Maximum number of concurrent page fetches and validation requests (default: 8)
+    --retries N            Retries per URL for connection errors, 429 and 5xx responses (default: 3)
+    --cache-file PATH      Validation results cache (default: .tmp/azure-api-mappings-cache/validation.json)
+    --cache-ttl HOURS      Re-check cached results older than this (default: 168)
+    --no-cache             Check every URL over the network
+    --record FIXTURE       Record the HEAD responses seen during validation to a fixture file
+    --replay FIXTURE       Validate against recorded HEAD responses instead of the network
+    --validate-against URL Send validation requests to this server (e.g. scripts/azure-docs-stub-server.py)
     --help                 Show this help message
 
 Related feature: docs/features/048-azure-api-doc-mapping/specification.md
 """
 
 import argparse
+import codecs
+import http.client
 import json
+import os
 import re
 import sys
-from datetime import datetime
-from typing import Dict, Set
-from urllib.parse import urljoin, urlparse
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urldefrag, urljoin, urlparse, urlsplit, urlunsplit
 import urllib.request
 import urllib.error
 from html.parser import HTMLParser
 
 
+# URL validation settings. Validation runs on a bounded worker pool that shares keep-alive
+# connections per host; connection errors and transient statuses are retried with exponential
+# backoff (VALIDATE_BACKOFF, then twice that, ...) before a URL is reported as unreachable.
+USER_AGENT = 'tfplan2md-azure-api-mapping-generator/1.0'
+VALIDATE_WORKERS = 8
+VALIDATE_RETRIES = 3
+VALIDATE_BACKOFF = 0.5
+VALIDATE_TIMEOUT = 10
+VALIDATE_MAX_REDIRECTS = 5
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+# Validation results cache. Results younger than the TTL are trusted without any request;
+# older reachable URLs are revalidated with If-None-Match/If-Modified-Since so an unchanged
+# page costs a bodiless 304. Bump VALIDATION_CACHE_VERSION whenever the entry format changes.
+VALIDATION_CACHE_VERSION = 1
+DEFAULT_VALIDATION_CACHE = Path(__file__).resolve().parent.parent / '.tmp' / 'azure-api-mappings-cache' / 'validation.json'
+DEFAULT_VALIDATION_CACHE_TTL_HOURS = 168
+
+# Recorded HEAD responses (--record/--replay), keyed by URL. Bump FIXTURE_VERSION whenever
+# the fixture format changes.
+FIXTURE_VERSION = 1
+
+# Discovery settings. Inventory pages are decoded and parsed chunk by chunk as they arrive;
+# paginated pages (rel="next") are always followed, per-service pages (.html pages in the
+# inventory's directory linked from a table row) only from the start page. Navigation links
+# outside the inventory table (languages, release notes, ...) are not followed.
+SPECS_INVENTORY_URL = 'https://azure.github.io/azure-sdk/releases/latest/specs.html'
+DISCOVERY_CHUNK_SIZE = 64 * 1024
+DISCOVERY_MAX_PAGES = 200
+RESOURCE_TYPE_PATTERN = re.compile(r'Microsoft\.\w+/\w+')
+
+
 class AzureSpecsParser(HTMLParser):
-    """Parse the Azure SDK Specs Inventory HTML page to extract resource types and documentation URLs."""
+    """
+    Parse the Azure SDK Specs Inventory HTML page to extract resource types and documentation URLs.
+
+    The parser can be fed the page incrementally; link text split across chunks is joined
+    before it is matched. With a base URL it also collects links to further inventory pages:
+    rel="next" links and, from table rows, links to per-service pages.
+    """
     
-    def __init__(self):
+    def __init__(self, base_url: str = ''):
         super().__init__()
+        self.base_url = base_url
         self.mappings: Dict[str, str] = {}
+        self.next_pages: List[str] = []
+        self.service_pages: List[str] = []
         self.current_href = None
         self.in_link = False
+        self.in_row = False
+        self._link_text: List[str] = []
         
     def handle_starttag(self, tag, attrs):
+        if tag == 'tr':
+            self.in_row = True
+        if tag not in ('a', 'link'):
+            return
+        attributes = dict(attrs)
+        href = attributes.get('href')
+        if href and 'next' in (attributes.get('rel') or '').lower().split():
+            self._add_page(self.next_pages, href)
         if tag == 'a':
             self.in_link = True
-            for attr_name, attr_value in attrs:
-                if attr_name == 'href' and attr_value:
-                    self.current_href = attr_value
+            self._link_text = []
+            if href:
+                self.current_href = href
                     
     def handle_endtag(self, tag):
+        if tag == 'tr':
+            self.in_row = False
         if tag == 'a':
+            if self.current_href:
+                self._handle_link(self.current_href, ''.join(self._link_text))
             self.in_link = False
             self.current_href = None
+            self._link_text = []
             
     def handle_data(self, data):
-        # We're looking for links that contain resource provider patterns
         if self.in_link and self.current_href:
-            # Check if this looks like a Microsoft resource type
-            if 'Microsoft.' in data:
-                # Extract resource type (e.g., "Microsoft.Compute/virtualMachines")
-                resource_match = re.search(r'Microsoft\.\w+/\w+', data)
-                if resource_match:
-                    resource_type = resource_match.group(0)
-                    
-                    # Check if the href is a learn.microsoft.com link
-                    if 'learn.microsoft.com' in self.current_href and '/rest/api/' in self.current_href:
-                        # Ensure the URL doesn't have version parameters
-                        clean_url = self.current_href.split('?')[0]
-                        self.mappings[resource_type] = clean_url
+            self._link_text.append(data)
 
+    def _handle_link(self, href: str, text: str):
+        # We're looking for links whose text names a Microsoft resource type
+        # (e.g., "Microsoft.Compute/virtualMachines") and that point to the REST API docs
+        resource_match = RESOURCE_TYPE_PATTERN.search(text) if 'Microsoft.' in text else None
+        if resource_match:
+            if 'learn.microsoft.com' in href and '/rest/api/' in href:
+                # Ensure the URL doesn't have version parameters
+                self.mappings[resource_match.group(0)] = href.split('?')[0]
+            return
+        if self.base_url and self.in_row:
+            self._add_page(self.service_pages, href, same_directory=True)
 
-def fetch_page(url: str) -> str:
-    """Fetch a web page and return its HTML content."""
-    try:
-        req = urllib.request.Request(url, headers={'User-Agent': 'tfplan2md-azure-api-mapping-generator/1.0'})
-        with urllib.request.urlopen(req, timeout=30) as response:
-            return response.read().decode('utf-8')
-    except urllib.error.URLError as e:
-        print(f"Error fetching {url}: {e}", file=sys.stderr)
-        sys.exit(1)
+    def _add_page(self, pages: List[str], href: str, same_directory: bool = False):
+        if not self.base_url:
+            return
+        url = urldefrag(urljoin(self.base_url, href))[0]
+        base = urlsplit(self.base_url)
+        target = urlsplit(url)
+        if (target.scheme, target.netloc) != (base.scheme, base.netloc) or url == self.base_url:
+            return
+        if same_directory and not (
+            target.path.startswith(base.path.rsplit('/', 1)[0] + '/') and target.path.endswith('.html')
+        ):
+            return
+        if url not in pages:
+            pages.append(url)
+
+
+def parse_inventory_page(url: str, chunk_size: int = DISCOVERY_CHUNK_SIZE, timeout: float = 30) -> AzureSpecsParser:
+    """Stream an inventory page into an AzureSpecsParser without holding the decoded page in memory."""
+    parser = AzureSpecsParser(base_url=url)
+    req = urllib.request.Request(url, headers={'User-Agent': USER_AGENT})
+    with urllib.request.urlopen(req, timeout=timeout) as response:
+        charset = response.headers.get_content_charset() or 'utf-8'
+        decoder = codecs.getincrementaldecoder(charset)(errors='replace')
+        for chunk in iter(lambda: response.read(chunk_size), b''):
+            parser.feed(decoder.decode(chunk))
+        parser.feed(decoder.decode(b'', final=True))
+    parser.close()
+    return parser
+
+
+def discover_mappings(
+    start_url: str = SPECS_INVENTORY_URL,
+    workers: int = VALIDATE_WORKERS,
+    max_pages: int = DISCOVERY_MAX_PAGES,
+    chunk_size: int = DISCOVERY_CHUNK_SIZE,
+) -> Tuple[Dict[str, str], int]:
+    """
+    Discover mappings from the Specs Inventory, fetching follow-up pages concurrently.
+
+    Pages are fetched level by level; within a level, results are merged in link order so the
+    outcome does not depend on which response arrives first. Returns the mappings and the
+    number of pages parsed.
+    """
+    mappings: Dict[str, str] = {}
+    seen = {start_url}
+    frontier = [(start_url, True)]
+    parsed = 0
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        while frontier:
+            futures = [
+                (executor.submit(parse_inventory_page, url, chunk_size), url, is_start)
+                for url, is_start in frontier
+            ]
+            frontier = []
+            for future, url, is_start in futures:
+                try:
+                    page = future.result()
+                except (urllib.error.URLError, http.client.HTTPException, OSError, ValueError, LookupError) as e:
+                    print(f"  Warning: could not fetch {url}: {e}", file=sys.stderr)
+                    continue
+                parsed += 1
+                for resource_type, doc_url in page.mappings.items():
+                    mappings.setdefault(resource_type, doc_url)
+                links = page.next_pages + (page.service_pages if is_start else [])
+                for link in links:
+                    if link not in seen and len(seen) < max_pages:
+                        seen.add(link)
+                        frontier.append((link, False))
+    return mappings, parsed
 
 
 def generate_mappings_from_known_patterns() -> Dict[str, str]:
@@ -263,37 +400,394 @@ def generate_mappings_from_known_patterns() -> Dict[str, str]:
     return mappings
 
 
-def validate_url(url: str) -> bool:
+class ConnectionPool:
     """
-    Validate that a URL is reachable by making a HEAD request.
-    
-    Note: This is optional and slow. Not recommended for routine use.
+    Thread-safe pool of keep-alive HTTP(S) connections, keyed by scheme and host.
+
+    Each worker holds at most one connection at a time, so the pool never grows beyond the
+    number of workers per host.
     """
+
+    def __init__(self, timeout: float = VALIDATE_TIMEOUT):
+        self.timeout = timeout
+        self.opened = 0
+        self._idle: Dict[Tuple[str, str], List[http.client.HTTPConnection]] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, scheme: str, netloc: str) -> Tuple[http.client.HTTPConnection, bool]:
+        """Return an idle connection to the host, or a new one, and whether it was reused."""
+        with self._lock:
+            idle = self._idle.get((scheme, netloc))
+            if idle:
+                return idle.pop(), True
+            self.opened += 1
+        if scheme == 'https':
+            return http.client.HTTPSConnection(netloc, timeout=self.timeout), False
+        return http.client.HTTPConnection(netloc, timeout=self.timeout), False
+
+    def release(self, scheme: str, netloc: str, connection: http.client.HTTPConnection) -> None:
+        with self._lock:
+            self._idle.setdefault((scheme, netloc), []).append(connection)
+
+    def close(self) -> None:
+        with self._lock:
+            connections = [connection for idle in self._idle.values() for connection in idle]
+            self._idle.clear()
+        for connection in connections:
+            connection.close()
+
+
+class ValidationCache:
+    """
+    On-disk cache of URL validation results.
+
+    Each entry stores the final HTTP status, the ETag and Last-Modified validators, and the
+    time of the last check. Only definitive answers are cached; connection errors and
+    exhausted retries are checked again on the next run.
+    """
+
+    def __init__(self, path, ttl_seconds: float = DEFAULT_VALIDATION_CACHE_TTL_HOURS * 3600):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+        self._entries: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') == VALIDATION_CACHE_VERSION:
+                self._entries = data.get('entries', {})
+        except (OSError, ValueError, AttributeError):
+            pass
+
+    def get(self, url: str) -> Optional[dict]:
+        with self._lock:
+            return self._entries.get(url)
+
+    def is_fresh(self, entry: dict, now: Optional[datetime] = None) -> bool:
+        try:
+            checked_at = datetime.fromisoformat(entry['checkedAt'])
+            # Hand-edited or older cache files may omit the offset; entries are written in UTC
+            if checked_at.tzinfo is None:
+                checked_at = checked_at.replace(tzinfo=timezone.utc)
+            age = ((now or datetime.now(timezone.utc)) - checked_at).total_seconds()
+        except (KeyError, TypeError, ValueError):
+            return False
+        return 0 <= age < self.ttl_seconds
+
+    def put(self, url: str, status: int, etag: Optional[str], last_modified: Optional[str]) -> None:
+        entry = {'status': status, 'checkedAt': datetime.now(timezone.utc).isoformat(timespec='seconds')}
+        if etag:
+            entry['etag'] = etag
+        if last_modified:
+            entry['lastModified'] = last_modified
+        with self._lock:
+            self._entries[url] = entry
+
+    def save(self) -> None:
+        with self._lock:
+            data = {'version': VALIDATION_CACHE_VERSION, 'entries': dict(sorted(self._entries.items()))}
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            ignore_file = self.path.parent / '.gitignore'
+            if not ignore_file.exists():
+                ignore_file.write_text('*\n', encoding='utf-8')
+            fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix='.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f"Warning: could not write validation cache {self.path}: {e}", file=sys.stderr)
+
+
+def head_request(pool: ConnectionPool, url: str, headers: Optional[Dict[str, str]] = None) -> http.client.HTTPResponse:
+    """Send a HEAD request over a pooled connection, following redirects, and return the final response."""
+    request_headers = {'User-Agent': USER_AGENT}
+    request_headers.update(headers or {})
+    for _ in range(VALIDATE_MAX_REDIRECTS + 1):
+        parts = urlsplit(url)
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+
+        while True:
+            connection, reused = pool.acquire(parts.scheme, parts.netloc)
+            try:
+                connection.request('HEAD', path, headers=request_headers)
+                response = connection.getresponse()
+                response.read()
+            except (http.client.HTTPException, OSError) as error:
+                connection.close()
+                # The server may have dropped an idle keep-alive connection; retry on a fresh one
+                # without spending one of the caller's retries.
+                if reused and isinstance(error, (ConnectionResetError, BrokenPipeError)):
+                    continue
+                raise
+            break
+
+        if response.will_close:
+            connection.close()
+        else:
+            pool.release(parts.scheme, parts.netloc, connection)
+
+        location = response.getheader('Location')
+        if response.status not in REDIRECT_STATUSES or not location:
+            return response
+        url = urljoin(url, location)
+
+    return response
+
+
+class HeadResponse:
+    """Status and headers of a HEAD response, as returned by every transport."""
+
+    __slots__ = ('status', 'headers')
+
+    def __init__(self, status: int, headers: Optional[Dict[str, str]] = None):
+        self.status = status
+        self.headers = {name.lower(): value for name, value in (headers or {}).items()}
+
+    def getheader(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        return self.headers.get(name.lower(), default)
+
+
+class HttpTransport:
+    """
+    Send HEAD requests over pooled keep-alive connections.
+
+    With a base URL, requests go to that server instead of each URL's own host (keeping the
+    path), which lets a local stub server stand in for learn.microsoft.com.
+    """
+
+    def __init__(self, timeout: float = VALIDATE_TIMEOUT, base_url: Optional[str] = None):
+        self.pool = ConnectionPool(timeout=timeout)
+        self.base_url = base_url
+
+    def head(self, url: str, headers: Optional[Dict[str, str]] = None) -> HeadResponse:
+        if self.base_url:
+            parts = urlsplit(url)
+            base = urlsplit(self.base_url)
+            url = urlunsplit((base.scheme, base.netloc, base.path.rstrip('/') + parts.path, parts.query, ''))
+        response = head_request(self.pool, url, headers)
+        return HeadResponse(response.status, dict(response.getheaders()))
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+class RecordingTransport:
+    """Pass requests through to another transport and record the final response per URL to a fixture file."""
+
+    def __init__(self, inner, path):
+        self.inner = inner
+        self.path = Path(path)
+        self.responses: Dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    def head(self, url: str, headers: Optional[Dict[str, str]] = None) -> HeadResponse:
+        response = self.inner.head(url, headers)
+        if response.status == 304 and headers:
+            # A 304 confirms the validators we sent, so record the full response they stand for
+            entry = {'status': 200, 'etag': headers.get('If-None-Match'), 'lastModified': headers.get('If-Modified-Since')}
+        else:
+            entry = {'status': response.status, 'etag': response.getheader('ETag'), 'lastModified': response.getheader('Last-Modified')}
+        with self._lock:
+            self.responses[url] = {key: value for key, value in entry.items() if value is not None}
+        return response
+
+    def close(self) -> None:
+        self.inner.close()
+        with self._lock:
+            data = {'version': FIXTURE_VERSION, 'responses': dict(sorted(self.responses.items()))}
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(str(self.path), (json.dumps(data, indent=2) + '\n').encode('utf-8'))
+
+
+class ReplayTransport:
+    """
+    Answer HEAD requests from a recorded fixture file without any network access.
+
+    Conditional requests whose validators match the recording get a 304; URLs missing from
+    the fixture answer 404 and are listed in `missing`.
+    """
+
+    def __init__(self, path):
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if data.get('version') != FIXTURE_VERSION:
+            raise ValueError(f"Unsupported HEAD fixture version in {path}: {data.get('version')}")
+        self.responses: Dict[str, dict] = data['responses']
+        self.missing: List[str] = []
+        self._lock = threading.Lock()
+
+    def head(self, url: str, headers: Optional[Dict[str, str]] = None) -> HeadResponse:
+        entry = self.responses.get(url)
+        if entry is None:
+            with self._lock:
+                self.missing.append(url)
+            return HeadResponse(404)
+        response_headers = {}
+        if entry.get('etag'):
+            response_headers['ETag'] = entry['etag']
+        if entry.get('lastModified'):
+            response_headers['Last-Modified'] = entry['lastModified']
+        headers = headers or {}
+        if entry['status'] == 200 and (
+            (entry.get('etag') and headers.get('If-None-Match') == entry['etag'])
+            or (entry.get('lastModified') and headers.get('If-Modified-Since') == entry['lastModified'])
+        ):
+            return HeadResponse(304, response_headers)
+        return HeadResponse(entry['status'], response_headers)
+
+    def close(self) -> None:
+        pass
+
+
+def check_url(
+    transport,
+    url: str,
+    retries: int = VALIDATE_RETRIES,
+    backoff: float = VALIDATE_BACKOFF,
+    cache: Optional[ValidationCache] = None,
+) -> bool:
+    """Return True if the URL answers 200, retrying connection errors, 429 and 5xx with exponential backoff."""
+    entry = cache.get(url) if cache else None
+    headers = {}
+    if entry and entry.get('status') == 200:
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('lastModified'):
+            headers['If-Modified-Since'] = entry['lastModified']
+
+    for attempt in range(retries + 1):
+        try:
+            response: Optional[HeadResponse] = transport.head(url, headers)
+        except (http.client.HTTPException, OSError):
+            response = None
+        if response is not None and response.status not in RETRYABLE_STATUSES:
+            status = response.status
+            if cache:
+                etag = response.getheader('ETag')
+                last_modified = response.getheader('Last-Modified')
+                if status == 304 and headers:
+                    # Unchanged since the last successful check; a 304 may omit the validators
+                    status = 200
+                    cache.revalidated += 1
+                    etag = etag or entry.get('etag')
+                    last_modified = last_modified or entry.get('lastModified')
+                cache.put(url, status, etag, last_modified)
+            return status == 200
+        if attempt < retries:
+            time.sleep(backoff * 2 ** attempt)
+    return False
+
+
+def validate_urls(
+    urls: Iterable[str],
+    workers: int = VALIDATE_WORKERS,
+    retries: int = VALIDATE_RETRIES,
+    backoff: float = VALIDATE_BACKOFF,
+    timeout: float = VALIDATE_TIMEOUT,
+    progress: bool = False,
+    cache: Optional[ValidationCache] = None,
+    transport=None,
+) -> Dict[str, bool]:
+    """
+    Validate URLs concurrently with HEAD requests.
+
+    At most `workers` requests are in flight at once. Requests go through the given
+    transport (HttpTransport, RecordingTransport or ReplayTransport, closed when validation
+    finishes), or over pooled keep-alive connections to each URL's host. With a cache, URLs
+    checked within its TTL are answered without any request, and the cache is saved when
+    validation finishes. Returns a mapping of each distinct URL to whether it is reachable.
+    """
+    unique_urls = list(dict.fromkeys(urls))
+    results: Dict[str, bool] = {}
+    pending = []
+    now = datetime.now(timezone.utc)
+    for url in unique_urls:
+        entry = cache.get(url) if cache else None
+        if entry and cache.is_fresh(entry, now):
+            results[url] = entry.get('status') == 200
+            cache.hits += 1
+        else:
+            pending.append(url)
+    if cache:
+        cache.misses += len(pending)
+        if progress:
+            print(f"  {len(results)} cached, {len(pending)} to check", file=sys.stderr)
+    if transport is None:
+        transport = HttpTransport(timeout=timeout)
+    if not pending:
+        transport.close()
+        return results
+
     try:
-        req = urllib.request.Request(url, method='HEAD', headers={'User-Agent': 'tfplan2md-azure-api-mapping-generator/1.0'})
-        with urllib.request.urlopen(req, timeout=10) as response:
-            return response.status == 200
-    except (urllib.error.URLError, urllib.error.HTTPError):
-        return False
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            futures = {executor.submit(check_url, transport, url, retries, backoff, cache): url for url in pending}
+            for i, future in enumerate(as_completed(futures), 1):
+                results[futures[future]] = future.result()
+                if progress and i % 10 == 0:
+                    print(f"  Validated {i}/{len(pending)}...", file=sys.stderr)
+    finally:
+        transport.close()
+        if cache:
+            cache.save()
+    return results
+
 
+def validate_url(url: str) -> bool:
+    """Validate that a single URL is reachable by making a HEAD request."""
+    return validate_urls([url], workers=1)[url]
+
+
+def filter_reachable_mappings(
+    mappings: Dict[str, str],
+    workers: int = VALIDATE_WORKERS,
+    retries: int = VALIDATE_RETRIES,
+    cache: Optional[ValidationCache] = None,
+    transport=None,
+    backoff: float = VALIDATE_BACKOFF,
+) -> Dict[str, str]:
+    """Validate all mapping URLs and return only the mappings whose URL is reachable."""
+    print(f"Validating {len(mappings)} URLs with {workers} workers...", file=sys.stderr)
+    reachable = validate_urls(
+        mappings.values(),
+        workers=workers,
+        retries=retries,
+        backoff=backoff,
+        progress=True,
+        cache=cache,
+        transport=transport,
+    )
+    validated_mappings = {}
+    for resource_type, url in sorted(mappings.items()):
+        if reachable[url]:
+            validated_mappings[resource_type] = url
+        else:
+            print(f"  Warning: URL not reachable: {url} (for {resource_type})", file=sys.stderr)
+    
+    print(f"Validation complete: {len(validated_mappings)}/{len(mappings)} URLs valid", file=sys.stderr)
+    return validated_mappings
 
-def generate_output_json(mappings: Dict[str, str], validate: bool = False) -> str:
+
+def generate_output_json(
+    mappings: Dict[str, str],
+    validate: bool = False,
+    workers: int = VALIDATE_WORKERS,
+    retries: int = VALIDATE_RETRIES,
+    cache: Optional[ValidationCache] = None,
+    source: str = "Microsoft Learn REST API Documentation (manually curated)",
+    last_updated: Optional[str] = None,
+) -> str:
     """Generate the output JSON structure with mappings and metadata."""
     
-    # Optionally validate URLs (slow)
+    # Optionally validate URLs
     validated_mappings = mappings
     if validate:
-        print(f"Validating {len(mappings)} URLs (this may take several minutes)...", file=sys.stderr)
-        validated_mappings = {}
-        for i, (resource_type, url) in enumerate(mappings.items(), 1):
-            if i % 10 == 0:
-                print(f"  Validated {i}/{len(mappings)}...", file=sys.stderr)
-            if validate_url(url):
-                validated_mappings[resource_type] = url
-            else:
-                print(f"  Warning: URL not reachable: {url} (for {resource_type})", file=sys.stderr)
-        
-        print(f"Validation complete: {len(validated_mappings)}/{len(mappings)} URLs valid", file=sys.stderr)
+        validated_mappings = filter_reachable_mappings(mappings, workers=workers, retries=retries, cache=cache)
     
     output = {
         "mappings": {
@@ -302,8 +796,8 @@ def generate_output_json(mappings: Dict[str, str], validate: bool = False) -> st
         },
         "metadata": {
             "version": "1.0.0",
-            "lastUpdated": datetime.now().strftime("%Y-%m-%d"),
-            "source": "Microsoft Learn REST API Documentation (manually curated)",
+            "lastUpdated": last_updated or datetime.now().strftime("%Y-%m-%d"),
+            "source": source,
             "generatedBy": "scripts/update-azure-api-mappings.py",
             "totalMappings": len(validated_mappings)
         }
@@ -311,6 +805,234 @@ def generate_output_json(mappings: Dict[str, str], validate: bool = False) -> st
     
     return json.dumps(output, indent=2)
 
+def load_existing_mappings(path: str) -> Tuple[Dict[str, str], Optional[dict]]:
+    """Load a previously generated mappings file; returns empty mappings if it is missing or invalid."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        mappings = {
+            resource_type: entry['url']
+            for resource_type, entry in data['mappings'].items()
+            if entry.get('url')
+        }
+        return mappings, data.get('metadata')
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return {}, None
+
+
+def diff_mappings(old: Dict[str, str], new: Dict[str, str]) -> dict:
+    """Return the added, removed and changed resource types between two mapping sets."""
+    return {
+        "added": {resource_type: new[resource_type] for resource_type in sorted(new.keys() - old.keys())},
+        "removed": {resource_type: old[resource_type] for resource_type in sorted(old.keys() - new.keys())},
+        "changed": {
+            resource_type: {"from": old[resource_type], "to": new[resource_type]}
+            for resource_type in sorted(old.keys() & new.keys())
+            if old[resource_type] != new[resource_type]
+        },
+    }
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    """Write a file through a temporary file in the same directory so readers never see a partial file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.' + os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        if os.path.exists(path):
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o777)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp_path, 0o666 & ~umask)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def file_matches(path: str, data: bytes) -> bool:
+    """Return True if the file exists and holds exactly these bytes."""
+    try:
+        if os.path.getsize(path) != len(data):
+            return False
+        with open(path, 'rb') as f:
+            return f.read() == data
+    except OSError:
+        return False
+
+
+def write_if_changed(path: str, data: bytes) -> bool:
+    """Atomically write data unless the file already holds exactly these bytes."""
+    if file_matches(path, data):
+        return False
+    write_atomic(path, data)
+    return True
+
+
+# Compact mapping artifact (--compact-output). Layout, all integers unsigned LEB128 varints
+# and all strings UTF-8 prefixed with their byte length:
+#
+#   magic b'AZDM', version byte
+#   prefix table: count, then each URL prefix (sorted)
+#   trie: root node, where a node is
+#       segment, url (0 = none, else prefix index + 1 followed by the URL suffix),
+#       child count, then the children sorted by lowercased segment
+#
+# Resource types become provider -> type -> child paths (split on '/'), so lookups walk one
+# segment at a time and can fall back to the longest mapped prefix of a nested child type.
+COMPACT_MAGIC = b'AZDM'
+COMPACT_VERSION = 1
+
+
+class ResourceTypeTrie:
+    """Trie node for one resource type segment; children are keyed by lowercased segment."""
+
+    __slots__ = ('segment', 'url', 'children')
+
+    def __init__(self, segment: str = '', url: Optional[str] = None):
+        self.segment = segment
+        self.url = url
+        self.children: Dict[str, 'ResourceTypeTrie'] = {}
+
+    def insert(self, resource_type: str, url: str) -> None:
+        node = self
+        for segment in resource_type.split('/'):
+            child = node.children.get(segment.lower())
+            if child is None:
+                child = node.children[segment.lower()] = ResourceTypeTrie(segment)
+            node = child
+        node.url = url
+
+    def lookup(self, resource_type: str) -> Optional[str]:
+        """Return the URL of the longest mapped prefix of the resource type (API version ignored)."""
+        node = self
+        best = None
+        for segment in resource_type.split('@', 1)[0].split('/'):
+            node = node.children.get(segment.lower())
+            if node is None:
+                break
+            if node.url:
+                best = node.url
+        return best
+
+    def mappings(self) -> Dict[str, str]:
+        """Flatten the trie back into a resource type -> URL dictionary."""
+        result: Dict[str, str] = {}
+        stack = [(child, child.segment) for child in self.children.values()]
+        while stack:
+            node, path = stack.pop()
+            if node.url:
+                result[path] = node.url
+            stack.extend((child, f"{path}/{child.segment}") for child in node.children.values())
+        return result
+
+
+def _url_prefix(url: str) -> Tuple[str, str]:
+    # Everything up to the last '/' is shared between URLs of the same service
+    prefix, _, suffix = url.rpartition('/')
+    return (prefix + '/', suffix) if prefix else ('', url)
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _write_string(out: bytearray, text: str) -> None:
+    data = text.encode('utf-8')
+    _write_varint(out, len(data))
+    out += data
+
+
+def _read_varint(data: bytes, pos: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+def _read_string(data: bytes, pos: int) -> Tuple[str, int]:
+    length, pos = _read_varint(data, pos)
+    return data[pos:pos + length].decode('utf-8'), pos + length
+
+
+def encode_compact_mappings(mappings: Dict[str, str]) -> bytes:
+    """Encode mappings as the compact, pre-sorted prefix-table + trie artifact."""
+    root = ResourceTypeTrie()
+    for resource_type, url in sorted(mappings.items()):
+        root.insert(resource_type, url)
+    prefixes = sorted({_url_prefix(url)[0] for url in mappings.values()})
+    prefix_index = {prefix: i for i, prefix in enumerate(prefixes)}
+
+    out = bytearray(COMPACT_MAGIC)
+    out.append(COMPACT_VERSION)
+    _write_varint(out, len(prefixes))
+    for prefix in prefixes:
+        _write_string(out, prefix)
+
+    stack = [root]
+    while stack:
+        node = stack.pop()
+        _write_string(out, node.segment)
+        if node.url:
+            prefix, suffix = _url_prefix(node.url)
+            _write_varint(out, prefix_index[prefix] + 1)
+            _write_string(out, suffix)
+        else:
+            _write_varint(out, 0)
+        children = [node.children[key] for key in sorted(node.children)]
+        _write_varint(out, len(children))
+        # Pushed in reverse so children are written in sorted order (pre-order traversal)
+        stack.extend(reversed(children))
+    return bytes(out)
+
+
+def decode_compact_mappings(data: bytes) -> ResourceTypeTrie:
+    """Decode a compact mapping artifact into a ResourceTypeTrie."""
+    if data[:len(COMPACT_MAGIC)] != COMPACT_MAGIC or data[len(COMPACT_MAGIC)] != COMPACT_VERSION:
+        raise ValueError('Not a compact Azure API documentation mapping artifact (or unsupported version)')
+    pos = len(COMPACT_MAGIC) + 1
+    count, pos = _read_varint(data, pos)
+    prefixes = []
+    for _ in range(count):
+        prefix, pos = _read_string(data, pos)
+        prefixes.append(prefix)
+
+    root = None
+    # Each entry is a parent and how many of its children are still to be read
+    pending: List[List] = []
+    while root is None or pending:
+        segment, pos = _read_string(data, pos)
+        index, pos = _read_varint(data, pos)
+        url = None
+        if index:
+            suffix, pos = _read_string(data, pos)
+            url = prefixes[index - 1] + suffix
+        child_count, pos = _read_varint(data, pos)
+        node = ResourceTypeTrie(segment, url)
+        if root is None:
+            root = node
+        else:
+            parent = pending[-1]
+            parent[0].children[segment.lower()] = node
+            parent[1] -= 1
+            if not parent[1]:
+                pending.pop()
+        if child_count:
+            pending.append([node, child_count])
+    return root
+
 
 def main():
     parser = argparse.ArgumentParser(
@@ -323,13 +1045,90 @@ def main():
         default='src/Oocx.TfPlan2Md/Providers/AzApi/Data/AzureApiDocumentationMappings.json',
         help='Output JSON file path'
     )
+    parser.add_argument(
+        '--incremental',
+        action='store_true',
+        help='Compare with the existing output file, print an added/removed/changed diff as JSON, and rewrite it only when content changes'
+    )
+    parser.add_argument(
+        '--compact-output',
+        help='Also write the compact prefix-table + trie artifact to this path'
+    )
+    parser.add_argument(
+        '--discover',
+        action='store_true',
+        help='Discover mappings from the Azure SDK Specs Inventory and merge them with the curated list'
+    )
+    parser.add_argument(
+        '--inventory-url',
+        default=SPECS_INVENTORY_URL,
+        help='Specs Inventory page to start discovery from (http(s):// or file://)'
+    )
+    parser.add_argument(
+        '--max-pages',
+        type=int,
+        default=DISCOVERY_MAX_PAGES,
+        help=f'Maximum number of inventory pages to fetch during discovery (default: {DISCOVERY_MAX_PAGES})'
+    )
     parser.add_argument(
         '--validate',
         action='store_true',
-        help='Validate URLs by making HTTP HEAD requests (slow, not recommended for routine use)'
+        help='Validate URLs by making HTTP HEAD requests in parallel'
+    )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=VALIDATE_WORKERS,
+        help=f'Maximum number of concurrent page fetches and validation requests (default: {VALIDATE_WORKERS})'
+    )
+    parser.add_argument(
+        '--retries',
+        type=int,
+        default=VALIDATE_RETRIES,
+        help=f'Retries per URL for connection errors, 429 and 5xx responses (default: {VALIDATE_RETRIES})'
+    )
+    parser.add_argument(
+        '--cache-file',
+        help='Validation results cache (default: .tmp/azure-api-mappings-cache/validation.json; '
+             'not used with --replay or --validate-against unless given)'
+    )
+    parser.add_argument(
+        '--cache-ttl',
+        type=float,
+        default=DEFAULT_VALIDATION_CACHE_TTL_HOURS,
+        help=f'Re-check cached validation results older than this many hours (default: {DEFAULT_VALIDATION_CACHE_TTL_HOURS})'
+    )
+    parser.add_argument('--no-cache', action='store_true', help='Check every URL over the network')
+    transport_group = parser.add_mutually_exclusive_group()
+    transport_group.add_argument(
+        '--record',
+        metavar='FIXTURE',
+        help='Record the HEAD responses seen during validation to this fixture file (bypasses the validation cache)'
+    )
+    transport_group.add_argument(
+        '--replay',
+        metavar='FIXTURE',
+        help='Validate against HEAD responses recorded with --record instead of the network'
+    )
+    parser.add_argument(
+        '--validate-against',
+        metavar='BASE_URL',
+        help='Send validation requests to this server (e.g. a local stub) instead of each URL\'s own host'
     )
     
     args = parser.parse_args()
+    if args.workers < 1:
+        parser.error('--workers must be at least 1')
+    if args.max_pages < 1:
+        parser.error('--max-pages must be at least 1')
+    if args.retries < 0:
+        parser.error('--retries must not be negative')
+    if args.cache_ttl < 0:
+        parser.error('--cache-ttl must not be negative')
+    if (args.record or args.replay or args.validate_against) and not args.validate:
+        parser.error('--record, --replay and --validate-against require --validate')
+    if args.replay and args.validate_against:
+        parser.error('--replay cannot be combined with --validate-against')
     
     print("Generating Azure API documentation mappings...", file=sys.stderr)
     print("Using manually curated mappings for common Azure services", file=sys.stderr)
@@ -340,14 +1139,103 @@ def main():
     print(f"Generated {len(mappings)} mappings", file=sys.stderr)
     print(f"Coverage: Compute, Storage, Network, KeyVault, Web, SQL, CosmosDB, Container, Automation, Monitor, and more", file=sys.stderr)
     
+    source = "Microsoft Learn REST API Documentation (manually curated)"
+    if args.discover:
+        print(f"Discovering mappings from {args.inventory_url}...", file=sys.stderr)
+        discovered, pages = discover_mappings(args.inventory_url, workers=args.workers, max_pages=args.max_pages)
+        # Curated entries are verified by hand, so they win over discovered URLs
+        added = len(discovered.keys() - mappings.keys())
+        mappings = {**discovered, **mappings}
+        source = "Azure SDK Specs Inventory and Microsoft Learn REST API Documentation (manually curated)"
+        print(f"Discovered {len(discovered)} mappings on {pages} page(s), {added} not in the curated list", file=sys.stderr)
+    
+    # Diff against the previous output. Entries neither curated nor discovered in this run are
+    # removed, except that a run without --discover keeps those of a previously discovered file,
+    # since it has no way to tell whether they are still current.
+    existing: Dict[str, str] = {}
+    existing_metadata = None
+    if args.incremental:
+        existing, existing_metadata = load_existing_mappings(args.output)
+        if not args.discover and existing_metadata and 'Specs Inventory' in str(existing_metadata.get('source', '')):
+            source = "Azure SDK Specs Inventory and Microsoft Learn REST API Documentation (manually curated)"
+            mappings = {**existing, **mappings}
+            print(f"Kept {len(existing)} existing mappings from {args.output} (rerun with --discover to prune them)", file=sys.stderr)
+        else:
+            print(f"Compared with {len(existing)} existing mappings from {args.output}", file=sys.stderr)
+    
+    # Optionally validate URLs
+    if args.validate:
+        # Offline runs must not mix their answers into the real validation cache, and a
+        # recording must send every URL through the transport, so it never uses the cache
+        offline = bool(args.replay or args.validate_against)
+        cache_file = args.cache_file or (None if offline else DEFAULT_VALIDATION_CACHE)
+        cache = None
+        if cache_file and not args.no_cache and not args.record:
+            cache = ValidationCache(cache_file, ttl_seconds=args.cache_ttl * 3600)
+        if args.replay:
+            try:
+                transport = ReplayTransport(args.replay)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Error: could not load HEAD fixture {args.replay}: {e}", file=sys.stderr)
+                sys.exit(1)
+        else:
+            transport = HttpTransport(base_url=args.validate_against)
+            if args.record:
+                transport = RecordingTransport(transport, args.record)
+        mappings = filter_reachable_mappings(
+            mappings,
+            workers=args.workers,
+            retries=args.retries,
+            cache=cache,
+            transport=transport,
+            # Recorded answers do not change between attempts, so retrying them needs no delay
+            backoff=0 if args.replay else VALIDATE_BACKOFF,
+        )
+        if args.replay and transport.missing:
+            print(f"  Warning: {len(transport.missing)} URL(s) not in {args.replay} were treated as unreachable", file=sys.stderr)
+        if args.record:
+            print(f"✓ HEAD responses recorded to {args.record}", file=sys.stderr)
+        if cache:
+            print(
+                f"Validation cache: {cache.hits} fresh, {cache.misses} checked "
+                f"({cache.revalidated} unchanged since the last check)",
+                file=sys.stderr,
+            )
+    
     # Generate output JSON
-    output_json = generate_output_json(mappings, validate=args.validate)
+    output_json = generate_output_json(mappings, source=source)
+    
+    # Write to output file. In incremental mode the file (and its lastUpdated date) is only
+    # rewritten when something other than the date would change.
+    unchanged = False
+    if args.incremental and existing_metadata:
+        previous_json = generate_output_json(mappings, source=source, last_updated=existing_metadata.get('lastUpdated'))
+        unchanged = file_matches(args.output, previous_json.encode('utf-8'))
+    if unchanged:
+        print(f"✓ Mappings unchanged, {args.output} left as is", file=sys.stderr)
+    else:
+        write_atomic(args.output, output_json.encode('utf-8'))
+        print(f"✓ Mappings written to {args.output}", file=sys.stderr)
     
-    # Write to output file
-    with open(args.output, 'w', encoding='utf-8') as f:
-        f.write(output_json)
+    if args.compact_output:
+        compact = encode_compact_mappings(mappings)
+        if write_if_changed(args.compact_output, compact):
+            print(
+                f"✓ Compact mappings written to {args.compact_output} "
+                f"({len(compact):,} bytes vs {len(output_json.encode('utf-8')):,} bytes JSON)",
+                file=sys.stderr,
+            )
+        else:
+            print(f"✓ Compact mappings unchanged, {args.compact_output} left as is", file=sys.stderr)
+    # Structured diff for scheduled jobs, printed last so it is complete once files are written
+    if args.incremental:
+        diff = diff_mappings(existing, mappings)
+        print(
+            f"Changes: {len(diff['added'])} added, {len(diff['removed'])} removed, {len(diff['changed'])} changed",
+            file=sys.stderr,
+        )
+        print(json.dumps(diff, indent=2))
     
-    print(f"✓ Mappings written to {args.output}", file=sys.stderr)
     print(f"✓ Total mappings: {len(mappings)}", file=sys.stderr)
     
     # Print summary statistics
@@ -1,4 +1,7 @@
 #!/usr/bin/env python3
+import argparse
+import hashlib
+import json
 import os
 import re
 import sys
@@ -8,6 +11,13 @@ from pathlib import Path
 AGENTS_DIR = Path(".github/agents")
 MODEL_REF_FILE = Path("docs/ai-model-reference.md")
 
+# Parsed-agent cache. Entries are reused while a file's mtime and size are unchanged, or while
+# its content hash matches (e.g. after a checkout touched it). Bump CACHE_VERSION whenever
+# parse_agent() or parse_model_reference() output changes; REQUIRED_SECTIONS is part of the key automatically.
+CACHE_VERSION = 3
+DEFAULT_CACHE_FILE = Path(".tmp/validate-agents-cache/agents.json")
+PARSE_WORKERS = 8
+
 # Regex patterns
 FRONTMATTER_PATTERN = re.compile(r"^---\s*\n(.*?)\n---\s*\n", re.DOTALL)
 NAME_PATTERN = re.compile(r"^name:\s*(.*)$", re.MULTILINE)
@@ -24,102 +34,255 @@ REQUIRED_SECTIONS = [
     r"🚫\s*(?:\*\*)?Never Do"
 ]
 
-def get_valid_models():
+# One alternation over all REQUIRED_SECTIONS, so each agent is scanned once
+SECTION_SCANNER = re.compile("|".join(f"(?P<s{i}>{pattern})" for i, pattern in enumerate(REQUIRED_SECTIONS)))
+
+# Model reference table cells
+SCORE_CELL = re.compile(r"\s*[\d.]+\s*")
+STATUS_CELLS = ("GA", "Public Preview")
+
+
+def parse_model_reference(content):
+    # Extract models from tables. Look for columns that look like Copilot Model IDs.
+    # They are usually in the second column of the benchmark tables:
+    #   | Name | ID | Score | ... |   -> the cell before a numeric score
+    # The "Available Models" tables have no scores:
+    #   | Model | GA | ... |         -> the cell before a GA/Public Preview status
+    # Both rules are applied in a single walk over the '|'-separated cells of the whole
+    # document, matching the cells (including line breaks between rows) exactly as
+    # separate findall sweeps over the text would.
+    models = set()
+    cells = content.split("|")
+    last = len(cells) - 1
+    next_scored = next_available = 1
+    for i in range(1, last):
+        if (i >= next_scored and i + 2 < last and cells[i]
+                and cells[i + 1] and SCORE_CELL.fullmatch(cells[i + 2])):
+            next_scored = i + 4
+            model_id = cells[i + 1].strip()
+            if model_id and model_id != "Copilot Model ID":
+                models.add(model_id)
+        if i >= next_available and i + 1 < last and cells[i] and cells[i + 1].strip() in STATUS_CELLS:
+            next_available = i + 3
+            model_id = cells[i].strip()
+            if model_id and model_id != "Model":
+                models.add(model_id)
+    return models
+
+
+def get_valid_models(cache=None):
     if not MODEL_REF_FILE.exists():
         print(f"Warning: {MODEL_REF_FILE} not found. Skipping model validation.")
         return None
     
-    content = MODEL_REF_FILE.read_text()
-    # Extract models from tables. Look for columns that look like Copilot Model IDs.
-    # They are usually in the second column of the benchmark tables.
-    models = set()
-    
-    # Match table rows: | Name | ID | Score | ... |
-    # We want the ID column.
-    table_rows = re.findall(r"\|\s*[^|]+\s*\|\s*([^|]+)\s*\|\s*[\d.]+\s*\|", content)
-    for row in table_rows:
-        model_id = row.strip()
-        if model_id and model_id != "Copilot Model ID":
-            models.add(model_id)
-            
-    # Also check the "Available Models" tables which might not have scores
-    available_rows = re.findall(r"\|\s*([^|]+)\s*\|\s*(?:GA|Public Preview)\s*\|", content)
-    for row in available_rows:
-        model_id = row.strip()
-        if model_id and model_id != "Model":
-            models.add(model_id)
-            
-    return models
+    stat = MODEL_REF_FILE.stat()
+    models = cache.get(MODEL_REF_FILE, stat) if cache else None
+    if models is None:
+        raw = MODEL_REF_FILE.read_bytes()
+        models = sorted(parse_model_reference(raw.decode("utf-8")))
+        if cache:
+            cache.put(MODEL_REF_FILE, stat, models, hashlib.sha256(raw).hexdigest())
+    return set(models)
+
+
+def scan_sections(content):
+    """Return whether each REQUIRED_SECTIONS pattern occurs in content."""
+    found = [False] * len(REQUIRED_SECTIONS)
+    remaining = len(found)
+    for match in SECTION_SCANNER.finditer(content):
+        index = int(match.lastgroup[1:])
+        if not found[index]:
+            found[index] = True
+            remaining -= 1
+            if not remaining:
+                break
+    return found
+
+
+def parse_agent(agent_file):
+    """Parse one agent file into the fields validation needs; returns (entry, sha256)."""
+    raw = agent_file.read_bytes()
+    content = raw.decode("utf-8")
+    entry = {"name": None, "frontmatter": False}
+    match = FRONTMATTER_PATTERN.search(content)
+    if match:
+        frontmatter = match.group(1)
+        start = match.start(1)
+
+        def line_of(pos):
+            return content.count("\n", 0, start + pos) + 1
+
+        name_match = NAME_PATTERN.search(frontmatter)
+        model_match = MODEL_PATTERN.search(frontmatter)
+        tools_match = TOOLS_PATTERN.search(frontmatter)
+        entry.update({
+            "frontmatter": True,
+            "name": name_match.group(1).strip() if name_match else None,
+            "model": model_match.group(1).strip() if model_match else None,
+            "model_line": line_of(model_match.start()) if model_match else None,
+            "handoffs": [
+                [handoff.group(1), line_of(handoff.start())]
+                for handoff in HANDOFF_AGENT_PATTERN.finditer(frontmatter)
+            ],
+            "tools": tools_match.group(1) if tools_match else None,
+            "tools_line": line_of(tools_match.start()) if tools_match else None,
+            "sections": scan_sections(content),
+        })
+    return entry, hashlib.sha256(raw).hexdigest()
 
-def validate_agents():
-    valid_models = get_valid_models()
+
+class AgentCache:
+    # On-disk cache of parse_agent() results (and the parsed model reference table), one JSON
+    # file for the whole agents directory.
+
+    def __init__(self, cache_file):
+        self.cache_file = Path(cache_file)
+        self.salt = f"v{CACHE_VERSION}:" + "\0".join(REQUIRED_SECTIONS)
+        self.entries = {}
+        self.dirty = False
+        try:
+            data = json.loads(self.cache_file.read_text(encoding="utf-8"))
+            if data.get("salt") == self.salt:
+                self.entries = data["entries"]
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass
+
+    def get(self, file_path, stat):
+        cached = self.entries.get(str(file_path))
+        if not cached:
+            return None
+        if cached["mtime_ns"] == stat.st_mtime_ns and cached["size"] == stat.st_size:
+            return cached["entry"]
+        # Same content under a new mtime: keep the parse, refresh the stat key
+        try:
+            digest = hashlib.sha256(file_path.read_bytes()).hexdigest()
+        except OSError:
+            return None
+        if digest != cached["sha256"]:
+            return None
+        cached["mtime_ns"] = stat.st_mtime_ns
+        cached["size"] = stat.st_size
+        self.dirty = True
+        return cached["entry"]
+
+    def put(self, file_path, stat, entry, digest):
+        self.entries[str(file_path)] = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "sha256": digest,
+            "entry": entry,
+        }
+        self.dirty = True
+
+    def save(self, agent_files):
+        # Forget agents that no longer exist
+        keep = {str(agent_file) for agent_file in agent_files} | {str(MODEL_REF_FILE)}
+        if keep != self.entries.keys():
+            self.entries = {key: value for key, value in self.entries.items() if key in keep}
+            self.dirty = True
+        if not self.dirty:
+            return
+        try:
+            self.cache_file.parent.mkdir(parents=True, exist_ok=True)
+            ignore_file = self.cache_file.parent / ".gitignore"
+            if not ignore_file.exists():
+                ignore_file.write_text("*\n", encoding="utf-8")
+            import tempfile  # only needed when the cache changed; keeps warm runs cheap
+
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_file.parent, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"salt": self.salt, "entries": self.entries}, f)
+            os.replace(tmp_path, self.cache_file)
+        except OSError as e:
+            print(f"Warning: could not write agent cache {self.cache_file}: {e}")
+
+
+def load_agents(agent_files, cache=None):
+    """Return parsed entries for all agent files, re-parsing only files the cache cannot answer."""
+    entries = {}
+    stale = []
+    for agent_file in agent_files:
+        stat = agent_file.stat()
+        entry = cache.get(agent_file, stat) if cache else None
+        if entry is None:
+            stale.append((agent_file, stat))
+        else:
+            entries[agent_file] = entry
+
+    if len(stale) > 1:
+        from concurrent.futures import ThreadPoolExecutor  # imported lazily: warm runs parse nothing
+
+        with ThreadPoolExecutor(max_workers=min(PARSE_WORKERS, len(stale))) as executor:
+            parsed = list(executor.map(lambda item: parse_agent(item[0]), stale))
+    else:
+        parsed = [parse_agent(agent_file) for agent_file, _ in stale]
+    for (agent_file, stat), (entry, digest) in zip(stale, parsed):
+        entries[agent_file] = entry
+        if cache:
+            cache.put(agent_file, stat, entry, digest)
+
+    if cache:
+        cache.save(agent_files)
+    return entries
+
+
+def validate_agents(cache=None):
+    valid_models = get_valid_models(cache)
     agent_files = list(AGENTS_DIR.glob("*.agent.md"))
+    entries = load_agents(agent_files, cache)
     
-    # First pass: collect all agent names
+    # Collect all agent names for the handoff checks
     agent_names = set()
     agent_data = {}
     
     for agent_file in agent_files:
-        content = agent_file.read_text()
-        match = FRONTMATTER_PATTERN.search(content)
-        if not match:
+        entry = entries[agent_file]
+        if not entry["frontmatter"]:
             print(f"Error: {agent_file.name} has no frontmatter.")
             continue
-            
-        frontmatter = match.group(1)
-        name_match = NAME_PATTERN.search(frontmatter)
-        if not name_match:
+        if not entry["name"]:
             print(f"Error: {agent_file.name} has no name in frontmatter.")
             continue
-            
-        name = name_match.group(1).strip()
-        agent_names.add(name)
-        agent_data[agent_file.name] = {
-            "name": name,
-            "content": content,
-            "frontmatter": frontmatter
-        }
+        agent_names.add(entry["name"])
+        agent_data[agent_file.name] = entry
 
     errors = 0
     
-    # Second pass: validate each agent
+    # Validate each agent
     for filename, data in agent_data.items():
         print(f"Validating {filename}...")
         file_errors = 0
         
         # 1. Validate Model
-        model_match = MODEL_PATTERN.search(data["frontmatter"])
-        if model_match:
-            model = model_match.group(1).strip()
+        model = data["model"]
+        if model is not None:
             if valid_models and model not in valid_models:
-                print(f"  - Invalid model: '{model}' (not found in {MODEL_REF_FILE.name})")
+                print(f"  - Invalid model: '{model}' (not found in {MODEL_REF_FILE.name}) (line {data['model_line']})")
                 file_errors += 1
         else:
             print(f"  - Missing model in frontmatter")
             file_errors += 1
             
         # 2. Validate Handoffs
-        handoff_agents = HANDOFF_AGENT_PATTERN.findall(data["frontmatter"])
-        for target in handoff_agents:
+        for target, line in data["handoffs"]:
             if target not in agent_names:
-                print(f"  - Invalid handoff target: '{target}' (agent not found)")
+                print(f"  - Invalid handoff target: '{target}' (agent not found) (line {line})")
                 file_errors += 1
                 
         # 3. Validate Sections
-        for section_pattern in REQUIRED_SECTIONS:
-            if not re.search(section_pattern, data["content"]):
+        for section_pattern, found in zip(REQUIRED_SECTIONS, data["sections"]):
+            if not found:
                 # Clean up pattern for display
                 display_name = section_pattern.replace(r"\s*(?:\*\*)?", " ").replace(r"\\", "")
                 print(f"  - Missing required section: '{display_name}'")
                 file_errors += 1
                 
         # 4. Validate Tools (basic format check)
-        tools_match = TOOLS_PATTERN.search(data["frontmatter"])
-        if not tools_match:
+        tools_str = data["tools"]
+        if tools_str is None:
             print(f"  - Missing or invalid tools format in frontmatter")
             file_errors += 1
         else:
-            tools_str = tools_match.group(1)
             # Check for snake_case tools which are often a sign of error
             if "_" in tools_str:
                 # Some tools might legitimately have underscores, but most VS Code ones use camelCase or slashes
@@ -127,7 +290,7 @@ def validate_agents():
                 # Actually, the instructions say "Never use snake_case names like read_file".
                 snake_case_tools = re.findall(r"['\"](\w+_\w+)['\"]", tools_str)
                 for tool in snake_case_tools:
-                    print(f"  - Potential invalid tool name (snake_case): '{tool}'")
+                    print(f"  - Potential invalid tool name (snake_case): '{tool}' (line {data['tools_line']})")
                     file_errors += 1
 
         if file_errors > 0:
@@ -139,11 +302,20 @@ def validate_agents():
     return errors
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validate agent definitions in .github/agents")
+    parser.add_argument(
+        "--cache-file",
+        default=str(DEFAULT_CACHE_FILE),
+        help="Cache of parsed agent files (default: .tmp/validate-agents-cache/agents.json)"
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Re-parse every agent file")
+    args = parser.parse_args()
+
     if not AGENTS_DIR.exists():
         print(f"Error: {AGENTS_DIR} directory not found.")
         sys.exit(1)
         
-    total_errors = validate_agents()
+    total_errors = validate_agents(None if args.no_cache else AgentCache(args.cache_file))
     if total_errors > 0:
         print(f"Total errors found: {total_errors}")
         sys.exit(1)
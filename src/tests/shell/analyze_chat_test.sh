@@ -6,7 +6,7 @@ cd "$REPO_ROOT"
 
 chmod +x scripts/analyze-chat.py
 
-output="$(scripts/analyze-chat.py src/tests/shell/testdata/chat-minimal.json)"
+output="$(scripts/analyze-chat.py --no-cache src/tests/shell/testdata/chat-minimal.json)"
 
 echo "$output" | grep -q "Agent Attribution:" || {
   echo "ERROR: expected Agent Attribution section" >&2
@@ -28,9 +28,336 @@ echo "$output" | grep -q "note for retro" || {
   exit 1
 }
 
+grep -q "Agent Work Time (totalElapsed): n=2, p50=0.50s, p90=1.00s, p99=1.00s" <<<"$output" || {
+  echo "ERROR: expected work time percentiles in the latency distribution" >&2
+  exit 1
+}
+
+grep -q "run_in_terminal: 1 calls, 1 failed (100.0%), 0 rejected" <<<"$output" || {
+  echo "ERROR: expected failed terminal command in the tool profile" >&2
+  exit 1
+}
+
+grep -q "Error (1x): error: pathspec did not match any files" <<<"$output" || {
+  echo "ERROR: expected tool error message in the tool profile" >&2
+  exit 1
+}
+
+threshold_output="$(scripts/analyze-chat.py --no-cache --context-threshold 40 src/tests/shell/testdata/chat-minimal.json)"
+
+grep -q "Requests above 40 prompt chars: 1" <<<"$threshold_output" || {
+  echo "ERROR: expected --context-threshold to flag the oversized request" >&2
+  exit 1
+}
+
+timeline_csv="$(mktemp --suffix=.csv)"
+timeline_output="$(scripts/analyze-chat.py --no-cache --idle-gap 0.05 --timeline-window 0.05 --timeline "$timeline_csv" \
+  src/tests/shell/testdata/chat-minimal.json)"
+
+grep -q "Agent Busy: 1.50s (0.00h), User Wait: 2.00s (0.00h), Idle: 4.00s (0.00h)" <<<"$timeline_output" || {
+  echo "ERROR: expected merged busy/wait/idle timeline totals" >&2
+  exit 1
+}
+
+grep -q "\[1; 1700000005000\] 4.00s (0.00h) idle before this request" <<<"$timeline_output" || {
+  echo "ERROR: expected the idle gap before the second request" >&2
+  exit 1
+}
+
+[[ "$(head -n 1 "$timeline_csv")" == "window_start,window_start_ms,window_ms,busy_ms,wait_ms,idle_ms,requests" ]] \
+  && [[ "$(awk -F, 'NR > 1 { total += $4 + $5 + $6 } END { print total }' "$timeline_csv")" == "7500" ]] || {
+  echo "ERROR: expected the timeline CSV to cover the whole session" >&2
+  exit 1
+}
+rm -f "$timeline_csv"
+
+grep -q "Slip: \[1; 1700000005000\] /workspace/docs/spec.md: 2 edits" <<<"$output" \
+  && grep -q "Undone: /workspace/README.md: 1 undo event(s) after 1 edits" <<<"$output" || {
+  echo "ERROR: expected Edit Churn to report the detail slip and the undone edit" >&2
+  exit 1
+}
+
+keyword_output="$(scripts/analyze-chat.py --no-cache --feedback-keyword postmortem src/tests/shell/testdata/chat-minimal.json)"
+
+echo "$keyword_output" | grep -A1 "Retrospective Feedback (verbatim):" | grep -q "(none detected)" || {
+  echo "ERROR: expected --feedback-keyword to replace the default retro keywords" >&2
+  exit 1
+}
+
 echo "$output" | grep -q "Plausibility Warnings:" || {
   echo "ERROR: expected Plausibility Warnings section" >&2
   exit 1
 }
 
+stream_output="$(scripts/analyze-chat.py --stream --no-cache src/tests/shell/testdata/chat-minimal.json)"
+
+[ "$stream_output" = "$output" ] || {
+  echo "ERROR: expected --stream output to match the default parser output" >&2
+  exit 1
+}
+
+mmap_json="$(scripts/analyze-chat.py --mmap --no-cache --format json src/tests/shell/testdata/chat-minimal.json)"
+default_json="$(scripts/analyze-chat.py --no-cache --format json src/tests/shell/testdata/chat-minimal.json)"
+
+[ "$mmap_json" = "$default_json" ] || {
+  echo "ERROR: expected --mmap metrics to match the default parser output" >&2
+  exit 1
+}
+
+stdlib_json="$(scripts/analyze-chat.py --json-backend json --no-cache --format json src/tests/shell/testdata/chat-minimal.json)"
+
+[ "$stdlib_json" = "$default_json" ] || {
+  echo "ERROR: expected the stdlib JSON backend to match the default backend output" >&2
+  exit 1
+}
+
+decoder_report="$(scripts/analyze-chat.py --json-backend json --verbose --no-cache src/tests/shell/testdata/chat-minimal.json 2>&1 >/dev/null)"
+
+[ "$decoder_report" = "JSON decoder: json" ] || {
+  echo "ERROR: expected --verbose to report the JSON decoder" >&2
+  exit 1
+}
+
+corpus_output="$(scripts/analyze-chat.py --no-cache 'src/tests/shell/testdata/chat-*.json')"
+
+grep -q "Files Analyzed: 1" <<<"$corpus_output" || {
+  echo "ERROR: expected glob input to produce a corpus report" >&2
+  exit 1
+}
+
+grep -q "chat-minimal.json; 0;" <<<"$corpus_output" || {
+  echo "ERROR: expected corpus retro feedback to name its source file" >&2
+  exit 1
+}
+
+ndjson_output="$(scripts/analyze-chat.py --no-cache --format ndjson src/tests/shell/testdata/chat-minimal.json)"
+
+[ "$(echo "$ndjson_output" | grep -c '^{"type": "request"')" -eq 2 ] || {
+  echo "ERROR: expected one NDJSON request record per chat request" >&2
+  exit 1
+}
+
+echo "$ndjson_output" | tail -n 1 | grep -q '^{"type": "summary"' || {
+  echo "ERROR: expected NDJSON output to end with a summary record" >&2
+  exit 1
+}
+
+corpus_ndjson_output="$(scripts/analyze-chat.py --no-cache --format ndjson 'src/tests/shell/testdata/chat-*.json')"
+
+[ "$(echo "$corpus_ndjson_output" | grep -c '^{"type": "request", "file": "src/tests/shell/testdata/chat-minimal.json"')" -eq 2 ] \
+  && [ "$(echo "$corpus_ndjson_output" | grep -c '^{"type": "file"')" -eq 1 ] || {
+  echo "ERROR: expected corpus NDJSON output to stream one record per request and one per file" >&2
+  exit 1
+}
+
+bench_dir="$(mktemp -d)"
+trap 'rm -rf "$bench_dir"' EXIT
+scripts/benchmark-analyze-chat.py --sizes 256KB --modes load,mmap --json-backends json --repeat 1 --real src/tests/shell/testdata/chat-minimal.json \
+  --text-passes 2 --text-baseline scripts/analyze-chat.py --work-dir "$bench_dir" >/dev/null
+python3 - "$bench_dir/results.json" <<'PY' || {
+import json, sys
+cases = {case['name']: case for case in json.load(open(sys.argv[1]))['cases']}
+assert set(cases) == {'synthetic-256KB/load', 'synthetic-256KB/mmap', 'real-exports/load', 'real-exports/mmap',
+                      'real-exports/user-request-text', 'real-exports/user-request-text-baseline'}, cases
+assert cases['real-exports/load']['requests'] == 2
+assert cases['real-exports/user-request-text']['requests'] == 2 and cases['real-exports/user-request-text']['passes'] == 2
+assert all(case['requests'] > 0 and case['wall_seconds_best'] > 0 and not case['failures'] for case in cases.values())
+PY
+  echo "ERROR: expected benchmark-analyze-chat.py to record synthetic, real and userRequest text cases" >&2
+  exit 1
+}
+
+watch_export="$bench_dir/watch.chat.json"
+write_export() {
+  python3 -c 'import json, sys; d = json.load(open(sys.argv[1])); d["requests"] = d["requests"][:int(sys.argv[3])]; json.dump(d, open(sys.argv[2], "w"))' \
+    src/tests/shell/testdata/chat-minimal.json "$watch_export" "$1"
+}
+# Polls (up to 10 s) until the file contains the pattern.
+wait_for() {
+  for _ in $(seq 100); do
+    grep -q "$2" "$1" && return 0
+    sleep 0.1
+  done
+  return 1
+}
+write_export 1
+scripts/analyze-chat.py --watch --watch-interval 0.1 "$watch_export" >"$bench_dir/watch.out" 2>"$bench_dir/watch.err" &
+watch_pid=$!
+trap 'kill "$watch_pid" 2>/dev/null || true; rm -rf "$bench_dir"' EXIT
+wait_for "$bench_dir/watch.out" "Total Requests: 1" || {
+  echo "ERROR: expected --watch to report the initial export" >&2
+  cat "$bench_dir/watch.err" >&2
+  exit 1
+}
+write_export 2
+wait_for "$bench_dir/watch.err" "+1 request(s), 2 total, updated in .* ms$" && grep -q "Total Requests: 2" "$bench_dir/watch.out" || {
+  echo "ERROR: expected --watch to pick up the appended request incrementally" >&2
+  cat "$bench_dir/watch.err" >&2
+  exit 1
+}
+
+# An export caught halfway through a rewrite keeps the last good report until it is complete
+python3 -c 'import sys; data = open(sys.argv[1], "rb").read(); open(sys.argv[1], "wb").write(data[:len(data) * 3 // 4])' "$watch_export"
+wait_for "$bench_dir/watch.err" "^Error reading $watch_export: " || {
+  echo "ERROR: expected --watch to report the incomplete export" >&2
+  cat "$bench_dir/watch.err" >&2
+  exit 1
+}
+write_export 2
+wait_for "$bench_dir/watch.err" "+0 request(s), 2 total" || {
+  echo "ERROR: expected --watch to recover once the export is complete again" >&2
+  cat "$bench_dir/watch.err" >&2
+  exit 1
+}
+kill "$watch_pid"
+wait "$watch_pid" 2>/dev/null || true
+
+[ "$(grep "Total Requests:" "$bench_dir/watch.out" | tr '\n' ' ')" = "Total Requests: 1 Total Requests: 2 Total Requests: 2 " ] || {
+  echo "ERROR: expected --watch not to print a regressed report for an incomplete export" >&2
+  grep "Total Requests:" "$bench_dir/watch.out" >&2
+  exit 1
+}
+
+# CRLF exports: offsets must count both bytes of each line ending
+crlf_export="$bench_dir/watch-crlf.chat.json"
+write_crlf_export() {
+  python3 -c 'import json, sys; d = json.load(open(sys.argv[1])); d["requests"] = d["requests"][:int(sys.argv[3])]; open(sys.argv[2], "w", newline="\r\n").write(json.dumps(d, indent=2) + "\n")' \
+    src/tests/shell/testdata/chat-minimal.json "$crlf_export" "$1"
+}
+write_crlf_export 1
+scripts/analyze-chat.py --watch --watch-interval 0.1 "$crlf_export" >"$bench_dir/watch-crlf.out" 2>"$bench_dir/watch-crlf.err" &
+watch_pid=$!
+wait_for "$bench_dir/watch-crlf.out" "Total Requests: 1" || {
+  echo "ERROR: expected --watch to report the initial CRLF export" >&2
+  cat "$bench_dir/watch-crlf.err" >&2
+  exit 1
+}
+write_crlf_export 2
+wait_for "$bench_dir/watch-crlf.err" "+1 request(s), 2 total, updated in .* ms$" && grep -q "Total Requests: 2" "$bench_dir/watch-crlf.out" || {
+  echo "ERROR: expected --watch to pick up a request appended to a CRLF export incrementally" >&2
+  cat "$bench_dir/watch-crlf.err" >&2
+  exit 1
+}
+kill "$watch_pid"
+wait "$watch_pid" 2>/dev/null || true
+
+cache_dir="$bench_dir/cache"
+cached_export="$bench_dir/cached.chat.json"
+cp src/tests/shell/testdata/chat-minimal.json "$cached_export"
+# Marks every cache entry so a report served from the cache is distinguishable from a fresh parse
+mark_cache_entries() {
+  python3 -c 'import json, pathlib, sys
+for entry in pathlib.Path(sys.argv[1]).glob("*.json"):
+    metrics = json.loads(entry.read_text()); metrics["total_requests"] = 999; entry.write_text(json.dumps(metrics))' "$cache_dir"
+}
+
+for cache_key in stat hash; do
+  rm -rf "$cache_dir"
+  scripts/analyze-chat.py --cache-dir "$cache_dir" --cache-key "$cache_key" "$cached_export" >/dev/null
+  mark_cache_entries
+  cached_output="$(scripts/analyze-chat.py --cache-dir "$cache_dir" --cache-key "$cache_key" "$cached_export")"
+  grep -q "Total Requests: 999" <<<"$cached_output" || {
+    echo "ERROR: expected the second $cache_key-keyed run to be served from the cache" >&2
+    exit 1
+  }
+
+  touch -d '+1 minute' "$cached_export"
+  touched_output="$(scripts/analyze-chat.py --cache-dir "$cache_dir" --cache-key "$cache_key" "$cached_export")"
+  if [ "$cache_key" = stat ]; then
+    grep -q "Total Requests: 2" <<<"$touched_output" || {
+      echo "ERROR: expected a touched export to be parsed again with --cache-key stat" >&2
+      exit 1
+    }
+  else
+    grep -q "Total Requests: 999" <<<"$touched_output" || {
+      echo "ERROR: expected a touched but unchanged export to stay cached with --cache-key hash" >&2
+      exit 1
+    }
+  fi
+
+  mark_cache_entries
+  python3 -c 'import json, sys; d = json.load(open(sys.argv[1])); d["requests"] = d["requests"][:1]; json.dump(d, open(sys.argv[1], "w"))' \
+    "$cached_export"
+  changed_output="$(scripts/analyze-chat.py --cache-dir "$cache_dir" --cache-key "$cache_key" "$cached_export")"
+  grep -q "Total Requests: 1" <<<"$changed_output" || {
+    echo "ERROR: expected a changed export to be parsed again with --cache-key $cache_key" >&2
+    exit 1
+  }
+  cp src/tests/shell/testdata/chat-minimal.json "$cached_export"
+done
+
+# Entries are keyed on the script source, so an edited analyzer never serves them
+rm -rf "$cache_dir"
+cp scripts/analyze-chat.py "$bench_dir/analyze-chat.py"
+"$bench_dir/analyze-chat.py" --cache-dir "$cache_dir" "$cached_export" >/dev/null
+mark_cache_entries
+echo "# edited" >>"$bench_dir/analyze-chat.py"
+edited_output="$("$bench_dir/analyze-chat.py" --cache-dir "$cache_dir" "$cached_export")"
+grep -q "Total Requests: 2" <<<"$edited_output" || {
+  echo "ERROR: expected a change to the analyzer source to invalidate cached metrics" >&2
+  exit 1
+}
+
+# Three exports with identical metrics give equally sized entries; room for two evicts the least recently used
+rm -rf "$cache_dir"
+for name in a b c; do
+  cp src/tests/shell/testdata/chat-minimal.json "$bench_dir/lru-$name.chat.json"
+done
+scripts/analyze-chat.py --cache-dir "$cache_dir" "$bench_dir/lru-a.chat.json" >/dev/null
+entry_a="$(ls "$cache_dir"/*.json)"
+touch -d '-2 minutes' "$entry_a"
+scripts/analyze-chat.py --cache-dir "$cache_dir" "$bench_dir/lru-b.chat.json" >/dev/null
+entry_b="$(ls "$cache_dir"/*.json | grep -v "$entry_a")"
+touch -d '-1 minute' "$entry_b"
+scripts/analyze-chat.py --cache-dir "$cache_dir" "$bench_dir/lru-a.chat.json" >/dev/null
+entry_size="$(stat -c %s "$entry_a")"
+scripts/analyze-chat.py --cache-dir "$cache_dir" --cache-max-bytes "$((entry_size * 2))" "$bench_dir/lru-c.chat.json" >/dev/null
+
+[ -f "$entry_a" ] && [ ! -f "$entry_b" ] && [ "$(ls "$cache_dir"/*.json | wc -l)" -eq 2 ] || {
+  echo "ERROR: expected --cache-max-bytes to evict the least recently used cache entry" >&2
+  exit 1
+}
+
+set +e
+missing_output="$(scripts/analyze-chat.py --cache-dir "$cache_dir" "$bench_dir/missing.chat.json")"
+missing_status=$?
+set -e
+
+[ "$missing_status" -eq 2 ] && grep -q "^Error reading $bench_dir/missing.chat.json: " <<<"$missing_output" || {
+  echo "ERROR: expected a missing export to report 'Error reading' and exit 2 with the cache enabled" >&2
+  exit 1
+}
+
+set +e
+failed_corpus_output="$(scripts/analyze-chat.py --no-cache "$bench_dir/missing-a.chat.json" "$bench_dir/missing-b.chat.json" 2>&1)"
+failed_corpus_status=$?
+set -e
+
+[ "$failed_corpus_status" -eq 2 ] && [ "$(echo "$failed_corpus_output" | grep -c "^Error reading ")" -eq 2 ] \
+  && grep -q "Files Analyzed: 0" <<<"$failed_corpus_output" && ! grep -q "Traceback" <<<"$failed_corpus_output" || {
+  echo "ERROR: expected a corpus run where every export fails to report the errors and exit 2" >&2
+  echo "$failed_corpus_output" >&2
+  exit 1
+}
+
+# Response text is sized in UTF-8 bytes, for raw and \u-escaped non-ASCII text alike:
+# 20 bytes in the first request, 5 + 2 in the second
+context_export="$bench_dir/context.chat.json"
+for ensure_ascii in True False; do
+  python3 -c 'import json, sys
+d = json.load(open(sys.argv[1]))
+d["requests"][0]["response"].append({"value": "héllo ☃ \U0001F600 \"q\"\n"})
+d["requests"][1]["response"].append({"value": [{"text": "café"}, "ok"]})
+json.dump(d, open(sys.argv[2], "w"), ensure_ascii=sys.argv[3] == "True")' \
+    src/tests/shell/testdata/chat-minimal.json "$context_export" "$ensure_ascii"
+  for mode in --stream --mmap ""; do
+    context_output="$(scripts/analyze-chat.py --no-cache $mode "$context_export")"
+    grep -q "Response Text (UTF-8 bytes): total 27 bytes, max 20 bytes" <<<"$context_output" || {
+      echo "ERROR: expected response text sizes in UTF-8 bytes (ensure_ascii=$ensure_ascii, mode '$mode')" >&2
+      echo "$context_output" | grep "Response Text" >&2
+      exit 1
+    }
+  done
+done
+
 echo "OK: analyze-chat.py outputs attribution note, feedback, and warnings"
@@ -0,0 +1,92 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+REPO_ROOT="$(cd "$(dirname "$0")/../../.." && pwd)"
+cd "$REPO_ROOT"
+
+chmod +x scripts/chat-store.py
+
+work_dir="$(mktemp -d)"
+trap 'rm -rf "$work_dir"' EXIT
+db="$work_dir/chat.sqlite"
+cp src/tests/shell/testdata/chat-minimal.json "$work_dir/session.chat.json"
+
+output="$(scripts/chat-store.py --db "$db" ingest "$work_dir")"
+grep -q "Ingested 1 file(s), 0 unchanged, 0 failed, 0 pruned .* 2 requests" <<<"$output" || {
+  echo "ERROR: expected the first ingest to load both requests" >&2
+  echo "$output" >&2
+  exit 1
+}
+
+output="$(scripts/chat-store.py --db "$db" ingest "$work_dir")"
+grep -q "Ingested 0 file(s), 1 unchanged, 0 failed, 0 pruned .* 2 requests" <<<"$output" || {
+  echo "ERROR: expected re-ingesting an unchanged export to be a no-op" >&2
+  echo "$output" >&2
+  exit 1
+}
+
+output="$(scripts/chat-store.py --db "$db" query tool-failures --format csv)"
+grep -qx "run_in_terminal,copilot/gemini-3-flash-preview,1,1,0,100.0" <<<"$output" || {
+  echo "ERROR: expected the tool failure rate per model" >&2
+  echo "$output" >&2
+  exit 1
+}
+
+output="$(scripts/chat-store.py --db "$db" query churn --format csv)"
+grep -qx "/workspace/docs/spec.md,2,1,2,1,0" <<<"$output" && grep -qx "/workspace/README.md,1,1,1,0,1" <<<"$output" || {
+  echo "ERROR: expected edit churn with slips and undo events" >&2
+  echo "$output" >&2
+  exit 1
+}
+
+output="$(scripts/chat-store.py --db "$db" query churn --slip-threshold 3 --format csv)"
+grep -qx "/workspace/docs/spec.md,2,1,2,0,0" <<<"$output" || {
+  echo "ERROR: expected --slip-threshold to change which edits count as detail slips" >&2
+  echo "$output" >&2
+  exit 1
+}
+
+# The README undo arrives with the gemini request but reverts the edit of the gpt request
+output="$(scripts/chat-store.py --db "$db" query churn --model copilot/gpt-5.1-codex-max --format csv)"
+grep -qx "/workspace/README.md,1,1,1,0,1" <<<"$output" || {
+  echo "ERROR: expected churn to attribute undo events to the request whose edits they revert" >&2
+  echo "$output" >&2
+  exit 1
+}
+
+output="$(scripts/chat-store.py --db "$db" query models --since 2030-01-01 --format json)"
+[[ "$output" == "[]" ]] || {
+  echo "ERROR: expected --since to filter out older requests" >&2
+  exit 1
+}
+
+# A malformed export fails on its own without aborting the batch or leaving partial rows
+printf '{"requests": [{"requestId": "x", "timestamp": 1700000000000, "response": [5]}]}' > "$work_dir/broken.chat.json"
+cp src/tests/shell/testdata/chat-minimal.json "$work_dir/copy.chat.json"
+set +e
+output="$(scripts/chat-store.py --db "$db" ingest "$work_dir" 2>&1)"
+status=$?
+set -e
+[[ $status -eq 2 ]] && grep -q "Error ingesting .*broken.chat.json" <<<"$output" \
+  && grep -q "Ingested 1 file(s), 1 unchanged, 1 failed, 0 pruned .* 4 requests" <<<"$output" || {
+  echo "ERROR: expected a malformed export to be reported and skipped (exit $status)" >&2
+  echo "$output" >&2
+  exit 1
+}
+
+# Exports deleted from disk are pruned together with their requests and events
+rm "$work_dir/broken.chat.json" "$work_dir/copy.chat.json"
+output="$(scripts/chat-store.py --db "$db" ingest "$work_dir")"
+grep -q "Ingested 0 file(s), 1 unchanged, 0 failed, 1 pruned .* 2 requests" <<<"$output" || {
+  echo "ERROR: expected the deleted export to be pruned" >&2
+  echo "$output" >&2
+  exit 1
+}
+output="$(scripts/chat-store.py --db "$db" query churn --format csv)"
+grep -qx "/workspace/docs/spec.md,2,1,2,1,0" <<<"$output" || {
+  echo "ERROR: expected pruning to drop the deleted export's file events" >&2
+  echo "$output" >&2
+  exit 1
+}
+
+echo "OK: chat-store.py ingests exports incrementally and answers canned reports"
@@ -0,0 +1,337 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+REPO_ROOT="$(cd "$(dirname "$0")/../../.." && pwd)"
+cd "$REPO_ROOT"
+
+# Validate URLs against a local stub server: requests run concurrently up to the worker limit,
+# reuse keep-alive connections, follow redirects and retry transient failures. Cached results
+# skip the network until they expire, then are revalidated with conditional requests.
+output="$(python3 - <<'PY' 2>&1
+import importlib.util
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+spec = importlib.util.spec_from_file_location('mappings', 'scripts/update-azure-api-mappings.py')
+mappings = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(mappings)
+
+lock = threading.Lock()
+stats = {'connections': 0, 'in_flight': 0, 'max_in_flight': 0, 'hits': {}, 'not_modified': 0}
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with lock:
+            stats['connections'] += 1
+
+    def do_HEAD(self):
+        with lock:
+            hits = stats['hits'][self.path] = stats['hits'].get(self.path, 0) + 1
+            stats['in_flight'] += 1
+            stats['max_in_flight'] = max(stats['max_in_flight'], stats['in_flight'])
+        try:
+            if self.path.startswith('/slow/'):
+                time.sleep(0.05)
+                status = 200
+            elif self.path.startswith('/page/'):
+                status = 304 if self.headers.get('If-None-Match') == '"v1"' else 200
+            elif self.path == '/flaky':
+                status = 503 if hits == 1 else 200
+            elif self.path == '/down':
+                status = 503
+            elif self.path == '/missing':
+                status = 404
+            elif self.path == '/moved':
+                status = 301
+            else:
+                status = 200
+            self.send_response(status)
+            if status == 301:
+                self.send_header('Location', '/slow/target')
+            # Like many servers, the 304 leaves out the validators confirmed by the request
+            if status == 200 and self.path.startswith('/page/'):
+                self.send_header('ETag', '"v1"')
+            if status == 304:
+                with lock:
+                    stats['not_modified'] += 1
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        finally:
+            with lock:
+                stats['in_flight'] -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+server.daemon_threads = True
+threading.Thread(target=server.serve_forever, daemon=True).start()
+base = f'http://127.0.0.1:{server.server_address[1]}'
+
+slow = [f'{base}/slow/{i}' for i in range(24)]
+urls = slow + [f'{base}/flaky', f'{base}/down', f'{base}/missing', f'{base}/moved']
+results = mappings.validate_urls(urls, workers=4, retries=2, backoff=0.01)
+
+assert all(results[url] for url in slow), results
+assert results[f'{base}/flaky'] is True, results
+assert results[f'{base}/down'] is False, results
+assert results[f'{base}/missing'] is False, results
+assert results[f'{base}/moved'] is True, results
+assert stats['hits']['/flaky'] == 2, stats
+assert stats['hits']['/down'] == 3, stats
+assert stats['hits']['/missing'] == 1, stats
+assert 1 < stats['max_in_flight'] <= 4, stats
+assert stats['connections'] <= 4, stats
+
+pages = [f'{base}/page/{i}' for i in range(5)] + [f'{base}/missing']
+with tempfile.TemporaryDirectory() as cache_dir:
+    cache_file = f'{cache_dir}/validation.json'
+    cache = mappings.ValidationCache(cache_file)
+    first = mappings.validate_urls(pages, workers=4, cache=cache)
+    assert cache.misses == 6 and cache.hits == 0, vars(cache)
+
+    stats['hits'].clear()
+    cache = mappings.ValidationCache(cache_file)
+    second = mappings.validate_urls(pages, workers=4, cache=cache)
+    assert second == first, (first, second)
+    assert cache.hits == 6 and not stats['hits'], (vars(cache), stats)
+
+    cache = mappings.ValidationCache(cache_file, ttl_seconds=0)
+    third = mappings.validate_urls(pages, workers=4, cache=cache)
+    assert third == first, (first, third)
+    assert cache.misses == 6 and cache.revalidated == 5, vars(cache)
+    assert stats['not_modified'] == 5 and stats['hits']['/missing'] == 1, stats
+
+    cache = mappings.ValidationCache(cache_file, ttl_seconds=0)
+    fourth = mappings.validate_urls(pages, workers=4, cache=cache)
+    assert fourth == first and cache.revalidated == 5, (fourth, vars(cache))
+    assert stats['not_modified'] == 10, stats
+assert first[f'{base}/missing'] is False and sum(first.values()) == 5, first
+
+cache = mappings.ValidationCache(cache_file, ttl_seconds=3600)
+now = mappings.datetime(2026, 1, 1, 12, tzinfo=mappings.timezone.utc)
+assert cache.is_fresh({'checkedAt': '2026-01-01T11:30:00'}, now), 'a checkedAt without offset is UTC'
+assert cache.is_fresh({'checkedAt': '2026-01-01T13:30:00+02:00'}, now)
+assert not cache.is_fresh({'checkedAt': '2026-01-01T10:00:00'}, now)
+assert not cache.is_fresh({'checkedAt': 'yesterday'}, now) and not cache.is_fresh({}, now)
+server.shutdown()
+print('validated', len(results), 'urls over', stats['connections'], 'connections')
+PY
+)" || {
+  echo "ERROR: expected parallel URL validation to pass against the stub server" >&2
+  echo "$output" >&2
+  exit 1
+}
+
+# Discover mappings offline from saved inventory pages: the start page, its rel="next" page
+# and the per-service pages it links to, fed to the parser in tiny chunks.
+work_dir="$(mktemp -d)"
+trap 'rm -rf "$work_dir"' EXIT
+inventory_url="file://$REPO_ROOT/src/tests/shell/testdata/azure-specs/specs.html"
+
+discovered="$(python3 - "$inventory_url" <<'PY' 2>&1
+import contextlib
+import importlib.util
+import io
+import sys
+
+spec = importlib.util.spec_from_file_location('mappings', 'scripts/update-azure-api-mappings.py')
+mappings = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(mappings)
+
+expected = mappings.discover_mappings(sys.argv[1])
+chunked = mappings.discover_mappings(sys.argv[1], chunk_size=7)
+assert chunked == expected, (expected, chunked)
+assert expected[1] == 4, expected
+
+# A truncated body or an unknown charset on one page is a warning, not a failed run.
+parse_page = mappings.parse_inventory_page
+errors = [mappings.http.client.IncompleteRead(b''), LookupError('unknown encoding: x-bogus')]
+def failing_parse(url, chunk_size):
+    if url != sys.argv[1] and errors:
+        raise errors.pop()
+    return parse_page(url, chunk_size)
+mappings.parse_inventory_page = failing_parse
+warnings = io.StringIO()
+with contextlib.redirect_stderr(warnings):
+    partial = mappings.discover_mappings(sys.argv[1], workers=1)
+mappings.parse_inventory_page = parse_page
+assert partial[1] == 2 and not errors, partial
+assert warnings.getvalue().count('Warning: could not fetch') == 2, warnings.getvalue()
+print(' '.join(sorted(expected[0])))
+PY
+)" || {
+  echo "ERROR: expected chunked discovery to match whole-page discovery" >&2
+  echo "$discovered" >&2
+  exit 1
+}
+[[ "$discovered" == "Microsoft.Compute/galleries Microsoft.Compute/virtualMachines Microsoft.DocumentDB/cassandraClusters Microsoft.HealthcareApis/services Microsoft.Network/natGateways Microsoft.Web/staticSites" ]] || {
+  echo "ERROR: unexpected discovered resource types: $discovered" >&2
+  exit 1
+}
+
+python3 scripts/update-azure-api-mappings.py --discover --inventory-url "$inventory_url" --output "$work_dir/mappings.json" 2>/dev/null
+python3 - "$work_dir/mappings.json" <<'PY' || {
+import json
+import sys
+
+data = json.load(open(sys.argv[1]))
+urls = {resource_type: entry['url'] for resource_type, entry in data['mappings'].items()}
+assert urls['Microsoft.Web/staticSites'] == 'https://learn.microsoft.com/rest/api/appservice/static-sites', urls
+assert urls['Microsoft.Compute/virtualMachines'] == 'https://learn.microsoft.com/rest/api/compute/virtual-machines', urls
+assert 'Microsoft.Compute/unreached' not in urls and 'Microsoft.Web/containerApps' not in urls, urls
+assert data['metadata']['totalMappings'] == len(urls) and 'Specs Inventory' in data['metadata']['source'], data['metadata']
+PY
+  echo "ERROR: expected discovered mappings merged with the curated list, curated URLs winning" >&2
+  exit 1
+}
+
+# The compact artifact round-trips to the JSON mappings and resolves nested child types
+# without a mapping of their own to their longest mapped prefix.
+python3 scripts/update-azure-api-mappings.py --output "$work_dir/curated.json" --compact-output "$work_dir/curated.bin" 2>/dev/null
+python3 - "$work_dir/curated.json" "$work_dir/curated.bin" <<'PY' || {
+import importlib.util
+import json
+import os
+import sys
+
+spec = importlib.util.spec_from_file_location('mappings', 'scripts/update-azure-api-mappings.py')
+mappings = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(mappings)
+
+expected = {resource_type: entry['url'] for resource_type, entry in json.load(open(sys.argv[1]))['mappings'].items()}
+trie = mappings.decode_compact_mappings(open(sys.argv[2], 'rb').read())
+assert trie.mappings() == expected
+assert os.path.getsize(sys.argv[2]) < os.path.getsize(sys.argv[1]) / 2
+assert trie.lookup('microsoft.storage/STORAGEACCOUNTS@2023-01-01') == expected['Microsoft.Storage/storageAccounts']
+assert trie.lookup('Microsoft.Storage/storageAccounts/blobServices/containers/immutabilityPolicies') == expected['Microsoft.Storage/storageAccounts/blobServices/containers']
+assert trie.lookup('Microsoft.Storage/storageAccounts/managementPolicies') == expected['Microsoft.Storage/storageAccounts']
+assert trie.lookup('Microsoft.Storage') is None and trie.lookup('Microsoft.Unknown/things') is None
+assert mappings.decode_compact_mappings(mappings.encode_compact_mappings({})).mappings() == {}
+PY
+  echo "ERROR: expected the compact artifact to round-trip and support longest-prefix lookup" >&2
+  exit 1
+}
+
+# Incremental regeneration diffs against the previous output, removes entries that are no
+# longer curated or discovered, and leaves the file (including its lastUpdated date) alone
+# when nothing changed.
+incremental="$work_dir/incremental.json"
+python3 - "$work_dir/curated.json" "$incremental" <<'PY'
+import json
+import sys
+
+data = json.load(open(sys.argv[1]))
+data['metadata']['lastUpdated'] = '2020-01-01'
+data['mappings']['Microsoft.Web/sites']['url'] = 'https://learn.microsoft.com/rest/api/appservice/outdated'
+del data['mappings']['Microsoft.Cache/redis']
+data['mappings']['Microsoft.Legacy/things'] = {'url': 'https://learn.microsoft.com/rest/api/legacy/things'}
+open(sys.argv[2], 'w').write(json.dumps(data, indent=2))
+PY
+
+diff_json="$(python3 scripts/update-azure-api-mappings.py --incremental --discover --inventory-url "$inventory_url" --output "$incremental" 2>/dev/null)"
+python3 - "$incremental" "$diff_json" <<'PY' || {
+import json
+import sys
+
+diff = json.loads(sys.argv[2])
+assert sorted(diff['added']) == [
+    'Microsoft.Cache/redis',
+    'Microsoft.Compute/galleries',
+    'Microsoft.DocumentDB/cassandraClusters',
+    'Microsoft.HealthcareApis/services',
+    'Microsoft.Network/natGateways',
+    'Microsoft.Web/staticSites',
+], diff
+assert diff['removed'] == {'Microsoft.Legacy/things': 'https://learn.microsoft.com/rest/api/legacy/things'}, diff
+assert list(diff['changed']) == ['Microsoft.Web/sites'], diff
+data = json.load(open(sys.argv[1]))
+assert 'Microsoft.Legacy/things' not in data['mappings'], 'stale entries are removed'
+assert data['metadata']['lastUpdated'] != '2020-01-01', data['metadata']
+PY
+  echo "ERROR: expected an incremental run to prune, rewrite and report the diff" >&2
+  echo "$diff_json" >&2
+  exit 1
+}
+
+touch -d '2020-01-01' "$incremental"
+before="$(stat -c '%Y' "$incremental")"
+diff_json="$(python3 scripts/update-azure-api-mappings.py --incremental --discover --inventory-url "$inventory_url" --output "$incremental" 2>/dev/null)"
+[[ "$(echo "$diff_json" | tr -d ' \n')" == '{"added":{},"removed":{},"changed":{}}' && "$(stat -c '%Y' "$incremental")" == "$before" ]] || {
+  echo "ERROR: expected an unchanged incremental run to leave the output file untouched" >&2
+  echo "$diff_json" >&2
+  exit 1
+}
+# Without --discover the entries of a discovered file cannot be rechecked, so they are kept
+diff_json="$(python3 scripts/update-azure-api-mappings.py --incremental --output "$incremental" 2>/dev/null)"
+[[ "$(echo "$diff_json" | tr -d ' \n')" == '{"added":{},"removed":{},"changed":{}}' ]] || {
+  echo "ERROR: expected an incremental run without --discover to keep previously discovered entries" >&2
+  echo "$diff_json" >&2
+  exit 1
+}
+ls -A "$work_dir" | grep -q '\.tmp$' && {
+  echo "ERROR: expected no temporary files left behind by atomic writes" >&2
+  exit 1
+}
+
+# Record HEAD responses from the bundled stub server (with latency and failures), then
+# replay them with the server gone: both runs must keep the same mappings. A warm validation
+# cache must not keep URLs out of the recording.
+python3 scripts/azure-docs-stub-server.py --latency 5 --jitter 10 --failure-rate 0.05 --reset-rate 0.02 \
+  --missing '^/rest/api/(relay|media)/' --seed 7 >"$work_dir/stub.log" 2>&1 &
+stub_pid=$!
+trap 'kill "$stub_pid" 2>/dev/null || true; rm -rf "$work_dir"' EXIT
+for _ in $(seq 50); do
+  grep -q '^Listening on ' "$work_dir/stub.log" && break
+  sleep 0.1
+done
+stub_url="$(sed -n 's/^Listening on //p' "$work_dir/stub.log")"
+[[ -n "$stub_url" ]] || {
+  echo "ERROR: expected the stub server to start" >&2
+  cat "$work_dir/stub.log" >&2
+  exit 1
+}
+
+python3 scripts/update-azure-api-mappings.py --validate --retries 5 --validate-against "$stub_url" \
+  --cache-file "$work_dir/validation-cache.json" --output "$work_dir/warm.json" 2>"$work_dir/warm.log" || {
+  echo "ERROR: expected validation against the stub server to warm the cache" >&2
+  cat "$work_dir/warm.log" >&2
+  exit 1
+}
+python3 scripts/update-azure-api-mappings.py --validate --retries 5 --validate-against "$stub_url" --record "$work_dir/heads.json" \
+  --cache-file "$work_dir/validation-cache.json" --output "$work_dir/recorded.json" 2>"$work_dir/record.log" || {
+  echo "ERROR: expected validation against the stub server to succeed" >&2
+  cat "$work_dir/record.log" >&2
+  exit 1
+}
+kill "$stub_pid"
+wait "$stub_pid" 2>/dev/null || true
+
+python3 scripts/update-azure-api-mappings.py --validate --replay "$work_dir/heads.json" \
+  --output "$work_dir/replayed.json" 2>"$work_dir/replay.log"
+python3 - "$work_dir/recorded.json" "$work_dir/replayed.json" "$work_dir/heads.json" <<'PY' || {
+import json
+import sys
+
+recorded = json.load(open(sys.argv[1]))['mappings']
+replayed = json.load(open(sys.argv[2]))['mappings']
+heads = json.load(open(sys.argv[3]))['responses']
+assert replayed == recorded, (recorded.keys() ^ replayed.keys())
+assert 'Microsoft.Relay/namespaces' not in recorded and 'Microsoft.Media/mediaServices' not in recorded, recorded.keys()
+assert len(recorded) == 90, len(recorded)
+assert heads['https://learn.microsoft.com/rest/api/relay/namespaces']['status'] == 404, heads
+assert all('etag' in entry for entry in heads.values() if entry['status'] == 200), heads
+PY
+  echo "ERROR: expected replayed validation to match the recorded run" >&2
+  cat "$work_dir/record.log" "$work_dir/replay.log" >&2
+  exit 1
+}
+
+echo "OK: update-azure-api-mappings.py validates URLs in parallel over pooled connections and caches results ($output), discovers mappings from saved inventory pages, writes a compact trie artifact, regenerates incrementally and records/replays validation offline"
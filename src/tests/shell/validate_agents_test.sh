@@ -0,0 +1,122 @@
+#!/usr/bin/env bash
+set -euo pipefail
+
+REPO_ROOT="$(cd "$(dirname "$0")/../../.." && pwd)"
+cd "$REPO_ROOT"
+
+validate="$REPO_ROOT/scripts/validate-agents.py"
+chmod +x "$validate"
+
+work_dir="$(mktemp -d)"
+trap 'rm -rf "$work_dir"' EXIT
+mkdir -p "$work_dir/.github/agents" "$work_dir/docs"
+cat >"$work_dir/docs/ai-model-reference.md" <<'MD'
+| Model | Status | Premium Multiplier |
+|-------|--------|--------------------|
+| GPT-5.2 | GA | 1x |
+MD
+
+write_agent() {
+  local file="$1" name="$2" handoff="$3" model="${4:-GPT-5.2}"
+  cat >"$work_dir/.github/agents/$file.agent.md" <<MD
+---
+name: $name
+model: $model
+tools: ['search', 'edit']
+handoffs:
+  - label: Continue
+    agent: "$handoff"
+---
+
+## Your Goal
+
+Do the work.
+
+## Boundaries
+
+### ✅ Always Do
+- Check the docs
+
+### ⚠️ Ask First
+- Before deleting files
+
+### 🚫 Never Do
+- Skip the tests
+MD
+}
+
+write_agent developer Developer Reviewer
+write_agent reviewer Reviewer Developer
+cd "$work_dir"
+
+output="$("$validate")" || {
+  echo "ERROR: expected valid fixture agents to pass" >&2
+  echo "$output" >&2
+  exit 1
+}
+[[ -f .tmp/validate-agents-cache/agents.json && "$(cat .tmp/validate-agents-cache/.gitignore)" == "*" ]] || {
+  echo "ERROR: expected parsed agents to be cached" >&2
+  exit 1
+}
+
+# A changed agent is re-parsed, and the handoff check sees the renamed agent
+write_agent reviewer "Code Reviewer" Developer
+output="$("$validate")" && {
+  echo "ERROR: expected a handoff to a renamed agent to fail" >&2
+  exit 1
+}
+grep -qF "Invalid handoff target: 'Reviewer' (agent not found) (line 7)" <<<"$output" || {
+  echo "ERROR: expected the stale handoff target to be reported" >&2
+  echo "$output" >&2
+  exit 1
+}
+
+# Restoring the content under a new mtime is answered by the content hash
+write_agent reviewer Reviewer Developer
+touch -d '2020-01-01' .github/agents/developer.agent.md
+cached="$("$validate")"
+uncached="$("$validate" --no-cache)"
+[[ "$cached" == "$uncached" ]] || {
+  echo "ERROR: expected cached and uncached validation to print the same report" >&2
+  diff <(echo "$cached") <(echo "$uncached") >&2 || true
+  exit 1
+}
+
+# Models are read from the cached model reference table until the reference changes
+write_agent reviewer Reviewer Developer "GPT-6"
+output="$("$validate")" && {
+  echo "ERROR: expected a model missing from the reference to fail" >&2
+  exit 1
+}
+grep -qF "Invalid model: 'GPT-6' (not found in ai-model-reference.md) (line 3)" <<<"$output" || {
+  echo "ERROR: expected the invalid model to be reported with its line" >&2
+  echo "$output" >&2
+  exit 1
+}
+echo "| GPT-6 | Public Preview | 1x |" >>docs/ai-model-reference.md
+output="$("$validate")" || {
+  echo "ERROR: expected a model added to the reference to be accepted" >&2
+  echo "$output" >&2
+  exit 1
+}
+
+# Missing sections are found by the single-pass scanner
+sed -i '/Ask First/d' .github/agents/developer.agent.md
+output="$("$validate")" && {
+  echo "ERROR: expected a missing required section to fail" >&2
+  exit 1
+}
+grep -qF "Missing required section: '⚠️ Ask First'" <<<"$output" || {
+  echo "ERROR: expected the missing section to be reported" >&2
+  echo "$output" >&2
+  exit 1
+}
+python3 - <<'PY'
+import json
+
+entries = json.load(open(".tmp/validate-agents-cache/agents.json", encoding="utf-8"))["entries"]
+sections = entries[".github/agents/developer.agent.md"]["entry"]["sections"]
+assert sections == [True, True, True, False, True], sections
+PY
+
+echo "OK: validate-agents.py caches parsed agents and re-parses only changed files"